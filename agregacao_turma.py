@@ -0,0 +1,499 @@
+"""
+Agregação em tempo real da turma (Painel do Professor).
+
+As páginas publicam amostras conforme elas são produzidas:
+
+- IA Emocional (01) e Modo Sala: o dict `estado_cognitivo`
+  (estado, ear, piscadas_min, perclos, confianca);
+- Avaliação IA (7): a emoção predominante de cada pergunta;
+- Lanches da turma (05): a classificação nutricional do lanche.
+
+Cada amostra atualiza em O(1) as estatísticas do aluno (médias móveis
+de foco e fadiga em janelas de tempo com memória fixa) e as da turma
+(contagem de estados, médias e correlação nutrição × foco, mantidas por
+somas correntes). O painel lê um instantâneo em O(alunos), sem
+reprocessar o histórico a cada rerun.
+
+As mesmas amostras seguem para `estatisticas` (acumuladores do ano
+letivo, gravados no banco), mas em cadência fixa: uma amostra por aluno
+a cada balde de `BALDE_S` segundos (a média do balde), e não uma por
+quadro. Assim uma aula ao vivo não pesa milhares de vezes mais que uma
+gravação processada em lote. A turma vem do cadastro (`usuarios.turma`)
+e a disciplina, da página que publica a amostra.
+"""
+
+import atexit
+import math
+import threading
+import time
+from collections import Counter, deque
+
+from database import conectar, inicializar
+from estado_cognitivo import estado_painel, indices_atencao
+from estatisticas import obter_estatisticas
+
+JANELA_S = 15 * 60
+BALDE_S = 10.0
+TURMA_PADRAO = "Turma"
+
+# classificação do lanche (nutri_ai) -> valor numérico
+VALOR_NUTRICAO = {
+    "Saudável": 1.0,
+    "Moderado": 0.5,
+    "Não recomendado": 0.0,
+    "Adequada": 1.0,
+    "Inadequada": 0.0,
+}
+
+
+# =====================================================
+# JANELA MÓVEL EM BALDES (MEMÓRIA FIXA)
+# =====================================================
+class JanelaMovel:
+    """
+    Média dos valores dos últimos `janela_s` segundos. As amostras são
+    somadas em baldes de `balde_s` segundos: a memória não depende de
+    quantas amostras por segundo chegam.
+    """
+
+    def __init__(self, janela_s=JANELA_S, balde_s=BALDE_S):
+        self.janela_s = janela_s
+        self.balde_s = balde_s
+        self._baldes = deque()  # [início, soma, n]
+        self.soma = 0.0
+        self.n = 0
+
+    def adicionar(self, valor, t):
+        inicio = t - t % self.balde_s
+        if self._baldes and self._baldes[-1][0] == inicio:
+            balde = self._baldes[-1]
+            balde[1] += valor
+            balde[2] += 1
+        else:
+            self._baldes.append([inicio, valor, 1])
+        self.soma += valor
+        self.n += 1
+        self.descartar(t)
+
+    def descartar(self, t):
+        limite = t - self.janela_s
+        while self._baldes and self._baldes[0][0] + self.balde_s <= limite:
+            _, soma, n = self._baldes.popleft()
+            self.soma -= soma
+            self.n -= n
+        if not self._baldes:
+            self.soma, self.n = 0.0, 0
+
+    @property
+    def media(self):
+        return self.soma / self.n if self.n else None
+
+
+# =====================================================
+# CORRELAÇÃO POR SOMAS CORRENTES
+# =====================================================
+class CorrelacaoIncremental:
+    """
+    Pearson de pares (x, y) que podem entrar e sair: cada aluno
+    contribui com um par e, quando o seu par muda, sai o antigo e
+    entra o novo.
+    """
+
+    def __init__(self):
+        self.n = 0
+        self.sx = self.sy = self.sxx = self.syy = self.sxy = 0.0
+
+    def adicionar(self, x, y, peso=1):
+        self.n += peso
+        self.sx += peso * x
+        self.sy += peso * y
+        self.sxx += peso * x * x
+        self.syy += peso * y * y
+        self.sxy += peso * x * y
+
+    def remover(self, x, y):
+        self.adicionar(x, y, -1)
+
+    def trocar(self, antigo, novo):
+        if antigo is not None:
+            self.remover(*antigo)
+        if novo is not None:
+            self.adicionar(*novo)
+
+    @property
+    def valor(self):
+        if self.n < 2:
+            return None
+        cov = self.sxy - self.sx * self.sy / self.n
+        var_x = self.sxx - self.sx * self.sx / self.n
+        var_y = self.syy - self.sy * self.sy / self.n
+        # tolerância para o resíduo das subtrações
+        if var_x <= 1e-9 or var_y <= 1e-9:
+            return None
+        return max(-1.0, min(1.0, cov / math.sqrt(var_x * var_y)))
+
+
+# =====================================================
+# ESTATÍSTICAS POR ALUNO E POR TURMA
+# =====================================================
+class EstatisticasAluno:
+    def __init__(self, aluno_id, nome=None, turma=None):
+        self.aluno_id = aluno_id
+        self.nome = nome or f"Aluno {aluno_id}"
+        # turma do cadastro (None se não houver) e o grupo no painel
+        self.turma_cadastrada = turma
+        self.turma = turma or TURMA_PADRAO
+        self.foco = JanelaMovel()
+        self.fadiga = JanelaMovel()
+        self.estado = None
+        self.confianca = None
+        self.estados = Counter()
+        self.emocoes = Counter()
+        self.nutricao = None
+        self.atualizado_em = None
+        # o que este aluno soma hoje nas estatísticas da turma
+        self._contribuicao = (None, None, None, None)
+        # balde em formação para o ano letivo:
+        # [início, disciplina, soma_foco, soma_fadiga, n, último t]
+        self._balde = None
+
+    def acumular(self, foco, fadiga, t, disciplina, balde_s):
+        """Soma ao balde atual; devolve o balde anterior, se fechou"""
+        inicio = t - t % balde_s
+        fechado = None
+        balde = self._balde
+        if balde is not None and (
+            balde[0] != inicio or balde[1] != disciplina
+        ):
+            fechado, balde = balde, None
+        if balde is None:
+            balde = self._balde = [inicio, disciplina, 0.0, 0.0, 0, t]
+        balde[2] += foco
+        balde[3] += fadiga
+        balde[4] += 1
+        balde[5] = t
+        return fechado
+
+    def fechar_balde(self, t=None, balde_s=BALDE_S):
+        """Entrega o balde em formação se já passou do fim (ou sempre)"""
+        balde = self._balde
+        if balde is None or (t is not None and t < balde[0] + balde_s):
+            return None
+        self._balde = None
+        return balde
+
+    def contribuicao(self):
+        """(estado, foco, fadiga, par nutrição × foco) atuais"""
+        foco, fadiga = self.foco.media, self.fadiga.media
+        par = (
+            (self.nutricao, foco)
+            if self.nutricao is not None and foco is not None
+            else None
+        )
+        return self.estado, foco, fadiga, par
+
+    def linha(self):
+        emocao = self.emocoes.most_common(1)
+        return {
+            "ID": self.aluno_id,
+            "Aluno": self.nome,
+            "Estado_Cognitivo": self.estado,
+            "Nivel_Foco": self.foco.media,
+            "Fadiga": self.fadiga.media,
+            "Confianca": self.confianca,
+            "Emocao_Predominante": emocao[0][0] if emocao else None,
+            "Nutricao": self.nutricao,
+            "Atualizado_Em": self.atualizado_em,
+        }
+
+
+class EstatisticasTurma:
+    def __init__(self, nome):
+        self.nome = nome
+        self.alunos = 0
+        self.estados = Counter()
+        self.soma_foco = self.soma_fadiga = 0.0
+        self.com_foco = self.com_fadiga = 0
+        self.correlacao = CorrelacaoIncremental()
+
+    def aplicar(self, antiga, nova):
+        """Troca a contribuição de um aluno (O(1))"""
+        estado_a, foco_a, fadiga_a, par_a = antiga
+        estado_n, foco_n, fadiga_n, par_n = nova
+
+        if estado_a is not None:
+            self.estados[estado_a] -= 1
+        if estado_n is not None:
+            self.estados[estado_n] += 1
+        if foco_a is not None:
+            self.soma_foco -= foco_a
+            self.com_foco -= 1
+        if foco_n is not None:
+            self.soma_foco += foco_n
+            self.com_foco += 1
+        if fadiga_a is not None:
+            self.soma_fadiga -= fadiga_a
+            self.com_fadiga -= 1
+        if fadiga_n is not None:
+            self.soma_fadiga += fadiga_n
+            self.com_fadiga += 1
+        if par_a != par_n:
+            self.correlacao.trocar(par_a, par_n)
+
+    def resumo(self):
+        return {
+            "turma": self.nome,
+            "alunos": self.alunos,
+            "estados": {k: v for k, v in self.estados.items() if v},
+            "foco_medio": (
+                self.soma_foco / self.com_foco if self.com_foco else None
+            ),
+            "fadiga_media": (
+                self.soma_fadiga / self.com_fadiga
+                if self.com_fadiga
+                else None
+            ),
+            "correlacao_nutricao_foco": self.correlacao.valor,
+        }
+
+
+# =====================================================
+# SERVIÇO DE AGREGAÇÃO (UM POR PROCESSO)
+# =====================================================
+class AgregacaoTurma:
+    """
+    Recebe amostras de qualquer thread (páginas, threads de vídeo) e
+    serve instantâneos ao painel. Um lock protege todo o estado.
+    """
+
+    def __init__(
+        self,
+        relogio=time.time,
+        estatisticas=None,
+        buscar_turma=None,
+        balde_s=BALDE_S,
+    ):
+        self.relogio = relogio
+        # acumuladores persistentes do ano letivo (opcional)
+        self.estatisticas = estatisticas
+        # aluno_id -> turma do cadastro (opcional, consultado uma vez)
+        self.buscar_turma = buscar_turma
+        self.balde_s = balde_s
+        self.alunos = {}
+        self.turmas = {}
+        self._lock = threading.Lock()
+
+    def _turma(self, aluno_id, turma):
+        """Turma informada ou, para aluno novo, a do cadastro (fora do lock)"""
+        if turma is not None or aluno_id in self.alunos:
+            return turma
+        if self.buscar_turma is None:
+            return None
+        try:
+            return self.buscar_turma(aluno_id)
+        except Exception:
+            return None
+
+    def _aluno(self, aluno_id, nome=None, turma=None):
+        aluno = self.alunos.get(aluno_id)
+        if aluno is None:
+            aluno = self.alunos[aluno_id] = EstatisticasAluno(
+                aluno_id, nome, turma
+            )
+            if aluno.turma not in self.turmas:
+                self.turmas[aluno.turma] = EstatisticasTurma(aluno.turma)
+            self.turmas[aluno.turma].alunos += 1
+        elif nome:
+            aluno.nome = nome
+        return aluno
+
+    def _sincronizar(self, aluno):
+        nova = aluno.contribuicao()
+        if nova != aluno._contribuicao:
+            self.turmas[aluno.turma].aplicar(aluno._contribuicao, nova)
+            aluno._contribuicao = nova
+
+    # -----------------------------------------------------
+    # entrada de amostras
+    # -----------------------------------------------------
+    def registrar_cognitivo(
+        self, aluno_id, amostra, nome=None, turma=None, disciplina=None
+    ):
+        """`amostra` no formato do `estado_cognitivo` da página 01"""
+        t = self.relogio()
+        turma = self._turma(aluno_id, turma)
+        estado = estado_painel(amostra.get("estado"))
+        foco, fadiga = indices_atencao(
+            amostra["ear"],
+            amostra.get("perclos") or 0.0,
+            amostra.get("piscadas_min") or 0,
+        )
+        with self._lock:
+            aluno = self._aluno(aluno_id, nome, turma)
+            aluno.foco.adicionar(foco, t)
+            aluno.fadiga.adicionar(fadiga, t)
+            if estado is not None:
+                aluno.estado = estado
+                aluno.estados[estado] += 1
+            aluno.confianca = amostra.get("confianca")
+            aluno.atualizado_em = t
+            self._sincronizar(aluno)
+            fechado = aluno.acumular(
+                foco, fadiga, t, disciplina, self.balde_s
+            )
+            amostras = self._preparar([(aluno, fechado)] if fechado else [])
+
+        self._enviar(amostras)
+
+    # -----------------------------------------------------
+    # ano letivo: um balde fechado = uma amostra
+    # -----------------------------------------------------
+    def _preparar(self, fechados):
+        """(aluno, balde) -> argumentos de `registrar` (dentro do lock)"""
+        return [
+            (
+                balde[2] / balde[4],
+                balde[3] / balde[4],
+                aluno.nutricao,
+                balde[5],
+                {
+                    "aluno": aluno.aluno_id,
+                    "turma": aluno.turma_cadastrada,
+                    "disciplina": balde[1],
+                },
+            )
+            for aluno, balde in fechados
+        ]
+
+    def _enviar(self, amostras):
+        if self.estatisticas is None:
+            return
+        for foco, fadiga, nutricao, t, grupos in amostras:
+            self.estatisticas.registrar(foco, fadiga, nutricao, t, **grupos)
+
+    def descarregar(self, todos=True):
+        """
+        Envia às estatísticas os baldes fechados (ou, com `todos`, também
+        os em formação, ex.: ao encerrar o processo).
+        """
+        t = None if todos else self.relogio()
+        with self._lock:
+            fechados = []
+            for aluno in self.alunos.values():
+                balde = aluno.fechar_balde(t, self.balde_s)
+                if balde is not None:
+                    fechados.append((aluno, balde))
+            amostras = self._preparar(fechados)
+        self._enviar(amostras)
+
+    def registrar_resposta(self, aluno_id, emocao, confianca=None):
+        """Emoção predominante de uma pergunta (página 7)"""
+        if not emocao:
+            return
+        turma = self._turma(aluno_id, None)
+        with self._lock:
+            aluno = self._aluno(aluno_id, turma=turma)
+            aluno.emocoes[emocao] += 1
+            aluno.atualizado_em = self.relogio()
+
+    def registrar_nutricao(self, aluno_id, classificacao):
+        """Classificação do lanche pré-aula (nutri_ai ou Adequada/Inadequada)"""
+        valor = VALOR_NUTRICAO.get(classificacao)
+        if valor is None:
+            return
+        turma = self._turma(aluno_id, None)
+        with self._lock:
+            aluno = self._aluno(aluno_id, turma=turma)
+            aluno.nutricao = valor
+            aluno.atualizado_em = self.relogio()
+            self._sincronizar(aluno)
+
+    # -----------------------------------------------------
+    # leitura
+    # -----------------------------------------------------
+    def instantaneo(self, turma=None):
+        """
+        {"alunos": [linha por aluno], "turma": resumo} em O(alunos).
+        Descarta aqui os baldes que saíram da janela e envia ao ano
+        letivo os que já fecharam (aluno que parou de mandar amostras).
+        """
+        self.descarregar(todos=False)
+        t = self.relogio()
+        with self._lock:
+            linhas = []
+            for aluno in self.alunos.values():
+                if turma is not None and aluno.turma != turma:
+                    continue
+                aluno.foco.descartar(t)
+                aluno.fadiga.descartar(t)
+                if not aluno.foco.n:
+                    # sem leituras recentes: estado desconhecido
+                    aluno.estado = None
+                self._sincronizar(aluno)
+                linhas.append(aluno.linha())
+
+            if turma is not None:
+                resumo = (
+                    self.turmas[turma].resumo()
+                    if turma in self.turmas
+                    else EstatisticasTurma(turma).resumo()
+                )
+            elif len(self.turmas) == 1:
+                resumo = next(iter(self.turmas.values())).resumo()
+            else:
+                resumo = self._resumo_geral()
+        return {"alunos": linhas, "turma": resumo}
+
+    def _resumo_geral(self):
+        geral = EstatisticasTurma("Todas")
+        for estatisticas in self.turmas.values():
+            geral.alunos += estatisticas.alunos
+            geral.estados.update(estatisticas.estados)
+            geral.soma_foco += estatisticas.soma_foco
+            geral.com_foco += estatisticas.com_foco
+            geral.soma_fadiga += estatisticas.soma_fadiga
+            geral.com_fadiga += estatisticas.com_fadiga
+            c, g = estatisticas.correlacao, geral.correlacao
+            g.n += c.n
+            g.sx += c.sx
+            g.sy += c.sy
+            g.sxx += c.sxx
+            g.syy += c.syy
+            g.sxy += c.sxy
+        return geral.resumo()
+
+    def __len__(self):
+        return len(self.alunos)
+
+    def zerar(self):
+        with self._lock:
+            self.alunos.clear()
+            self.turmas.clear()
+
+
+def turma_cadastrada(aluno_id):
+    """`usuarios.turma` do aluno (None se não houver)"""
+    inicializar()
+    with conectar() as conn:
+        row = conn.execute(
+            "SELECT turma FROM usuarios WHERE id = ?", (aluno_id,)
+        ).fetchone()
+    return row[0] if row and row[0] else None
+
+
+_agregacao = None
+_agregacao_lock = threading.Lock()
+
+
+def obter_agregacao():
+    """Agregação do processo, compartilhada por todas as sessões"""
+    global _agregacao
+    with _agregacao_lock:
+        if _agregacao is None:
+            _agregacao = AgregacaoTurma(
+                estatisticas=obter_estatisticas(),
+                buscar_turma=turma_cadastrada,
+            )
+            # registrado depois do atexit das estatísticas: roda antes
+            atexit.register(_agregacao.descarregar)
+        return _agregacao
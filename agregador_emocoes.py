@@ -0,0 +1,165 @@
+import math
+import threading
+import time
+from collections import defaultdict
+
+from metricas_faciais import classificar_emocao
+
+# =====================================================
+# SUAVIZAÇÃO TEMPORAL DOS RÓTULOS
+# =====================================================
+# Os pesos dependem do tempo entre amostras, não do número de quadros:
+# analisar menos quadros por segundo não muda o comportamento.
+
+CARACTERISTICAS = (
+    "dist_entre_olhos",
+    "abertura_olhos",
+    "abertura_boca",
+    "largura_boca",
+    "sobrancelhas",
+)
+
+
+def _peso(dt, tau):
+    """Fração do valor novo numa média exponencial com constante `tau`"""
+    if dt is None or tau <= 0:
+        return 1.0
+    return 1.0 - math.exp(-max(dt, 0.0) / tau)
+
+
+class SuavizadorEMA:
+    """Média móvel exponencial de um vetor de métricas (dict)"""
+
+    def __init__(self, tau_s=0.5, chaves=CARACTERISTICAS):
+        self.tau_s = tau_s
+        self.chaves = chaves
+        self.valor = None
+        self._t = None
+
+    def atualizar(self, metricas, t):
+        if self.valor is None:
+            self.valor = {k: metricas[k] for k in self.chaves}
+        else:
+            a = _peso(t - self._t, self.tau_s)
+            for k in self.chaves:
+                self.valor[k] += a * (metricas[k] - self.valor[k])
+        self._t = t
+        return self.valor
+
+
+class Histerese:
+    """
+    Rótulo estável: só troca quando o candidato novo se mantém por
+    `persistencia_s` segundos seguidos.
+    """
+
+    def __init__(self, persistencia_s=0.6, inicial=None):
+        self.persistencia_s = persistencia_s
+        self.rotulo = inicial
+        self._candidato = None
+        self._desde = None
+
+    def atualizar(self, candidato, t):
+        if self.rotulo is None:
+            self.rotulo = candidato
+        elif candidato == self.rotulo:
+            self._candidato = None
+        elif candidato != self._candidato:
+            self._candidato, self._desde = candidato, t
+        elif t - self._desde >= self.persistencia_s:
+            self.rotulo, self._candidato = candidato, None
+        return self.rotulo
+
+
+class HistogramaRotulos:
+    """
+    Tempo passado em cada rótulo. Com `janela_s`, os pesos antigos
+    decaem exponencialmente (histograma "recente"); sem, acumula.
+    """
+
+    def __init__(self, janela_s=None):
+        self.janela_s = janela_s
+        self.pesos = defaultdict(float)
+        self._t = None
+        self._rotulo = None
+
+    def atualizar(self, rotulo, t):
+        # o rótulo anterior vale até agora
+        if self._t is not None and self._rotulo is not None:
+            dt = max(t - self._t, 0.0)
+            if self.janela_s:
+                fator = math.exp(-dt / self.janela_s)
+                for k in self.pesos:
+                    self.pesos[k] *= fator
+                self.pesos[self._rotulo] += 1.0 - fator
+            else:
+                self.pesos[self._rotulo] += dt
+        elif rotulo is not None and not self.pesos:
+            # primeira amostra: peso mínimo para já ter um dominante
+            self.pesos[rotulo] += 1e-9
+        self._t, self._rotulo = t, rotulo
+
+    def dominante(self):
+        """(rótulo, confiança 0-1) ou (None, 0.0) sem amostras"""
+        total = sum(self.pesos.values())
+        if not total:
+            return None, 0.0
+        rotulo = max(self.pesos, key=self.pesos.get)
+        return rotulo, self.pesos[rotulo] / total
+
+    def distribuicao(self):
+        total = sum(self.pesos.values())
+        if not total:
+            return {}
+        return {k: v / total for k, v in self.pesos.items() if v}
+
+    def zerar(self):
+        self.pesos.clear()
+        self._t = self._rotulo = None
+
+
+# =====================================================
+# AGREGADOR DE EMOÇÕES POR FLUXO DE VÍDEO
+# =====================================================
+class AgregadorEmocoes:
+    """
+    Métricas por quadro -> EMA -> regras de emoção -> histerese.
+    Acumula, por pergunta, quanto tempo cada emoção estável durou.
+
+    `atualizar` roda na thread do vídeo e `fechar_pergunta` na do
+    script; o lock protege o estado compartilhado.
+    """
+
+    def __init__(self, tau_s=0.5, persistencia_s=0.6):
+        self.suavizador = SuavizadorEMA(tau_s)
+        self.histerese = Histerese(persistencia_s)
+        self.pergunta = HistogramaRotulos()
+        self._lock = threading.Lock()
+
+    def atualizar(self, metricas, t=None):
+        """Registra as métricas de um quadro; devolve a emoção estável"""
+        t = time.monotonic() if t is None else t
+        with self._lock:
+            if metricas and metricas["dist_entre_olhos"]:
+                media = self.suavizador.atualizar(metricas, t)
+                self.histerese.atualizar(classificar_emocao(media), t)
+            self.pergunta.atualizar(self.histerese.rotulo, t)
+            return self.histerese.rotulo
+
+    @property
+    def atual(self):
+        return self.histerese.rotulo
+
+    def fechar_pergunta(self, t=None):
+        """
+        Emoção dominante desde a última chamada, com a confiança (fração
+        do tempo nela) e a distribuição; recomeça a contagem.
+        """
+        t = time.monotonic() if t is None else t
+        with self._lock:
+            self.pergunta.atualizar(self.histerese.rotulo, t)
+            emocao, confianca = self.pergunta.dominante()
+            distribuicao = self.pergunta.distribuicao()
+            self.pergunta.zerar()
+            self.pergunta.atualizar(self.histerese.rotulo, t)
+        return emocao, confianca, distribuicao
@@ -1,5 +1,11 @@
+import os
+
 import streamlit as st
 
+from arquivo_parquet import agendar_compactacao
+from carregamento import cv2, mp, pre_carregar
+from instrumentacao import metricas
+
 # =====================================================
 # CONFIGURAÇÃO GLOBAL DO APP
 # =====================================================
@@ -39,4 +45,45 @@ with st.expander("ℹ️ Informações do Sistema"):
     st.write("🔹 Streamlit Cloud limita acesso à câmera")
     st.write("🔹 Arquitetura modular baseada em páginas")
 
+# Métricas do processo: só para quem administra o servidor
+if os.getenv("NUTRIEDU_ADMIN") == "1":
+    with st.expander("⏱️ Desempenho (admin)"):
+        resumo = metricas.resumo()
+
+        if resumo["latencias"]:
+            st.dataframe(
+                [
+                    {"métrica": nome, **valores}
+                    for nome, valores in resumo["latencias"].items()
+                ],
+                hide_index=True,
+            )
+        else:
+            st.caption("Nenhuma medição registrada ainda.")
+
+        col_cont, col_imp = st.columns(2)
+        col_cont.write("**Contadores**")
+        col_cont.json(resumo["contadores"])
+        col_imp.write("**Importações (ms)**")
+        col_imp.json(resumo["importacoes_ms"])
+
+        col_exp, col_zerar = st.columns(2)
+        col_exp.download_button(
+            "📥 Exportar JSON",
+            metricas.exportar_json(),
+            file_name="nutriedu_metricas.json",
+            mime="application/json",
+        )
+        if col_zerar.button("🔄 Zerar métricas"):
+            metricas.zerar()
+            st.rerun()
+
 st.success("✅ Sistema carregado com sucesso")
+
+# Enquanto o usuário lê a home, as dependências de visão computacional
+# são importadas em segundo plano para a primeira página com câmera.
+pre_carregar(cv2, mp)
+
+# Histórico antigo vai para Parquet em segundo plano (uma vez por dia),
+# mantendo o banco ao vivo pequeno; sem pyarrow nada é agendado.
+agendar_compactacao()
@@ -0,0 +1,577 @@
+"""
+Arquivo frio do histórico em Parquet.
+
+As linhas de desempenho_cognitivo, avaliacoes_pergunta e
+historico_avaliacoes com mais de `IDADE_DIAS` dias saem do SQLite e vão
+para arquivos Parquet particionados por turma e mês:
+
+    arquivo/desempenho_cognitivo/turma=7A/mes=2024-03/1201-1893.parquet
+
+Cada arquivo entra no manifesto (`arquivos_parquet`) na MESMA transação
+que apaga as linhas do banco. Quem lê o manifesto e as tabelas dentro de
+uma transação de leitura (ver consultas.py) enxerga cada linha uma única
+vez, no banco ou no arquivo. Arquivos fora do manifesto (compactação
+interrompida) são ignorados na leitura e apagados na próxima compactação.
+
+Cada compactação cria arquivos novos; quando o mês de uma partição já
+fechou (anterior ao corte), os arquivos dela são fundidos em um só,
+trocando as linhas do manifesto na mesma transação. Os arquivos
+substituídos viram órfãos e só são apagados na compactação seguinte:
+quem leu o manifesto antigo ainda consegue abri-los.
+
+Na leitura, o manifesto descarta arquivos por turma e período; o filtro
+e as colunas pedidas descem até o Parquet (estatísticas dos row groups
+e leitura apenas das colunas usadas).
+
+    python arquivo_parquet.py                     # linhas com mais de 180 dias
+    python arquivo_parquet.py --idade-dias 365 --vacuum
+"""
+
+import argparse
+import functools
+import operator
+import os
+import threading
+import time
+from urllib.parse import quote
+
+from carregamento import disponivel, ds, pa, pc, pq
+from database import conectar, inicializar
+from instrumentacao import contar, cronometrar
+
+ARQUIVO_DIR = os.getenv("NUTRIEDU_ARQUIVO", "arquivo")
+IDADE_DIAS = 180
+LINHAS_LOTE = 20_000
+LINHAS_ROW_GROUP = 8_192
+INTERVALO_COMPACTAR_S = 24 * 3600
+SEM_TURMA = "sem_turma"
+
+# tabela -> (coluna de data em epoch, coluna do aluno)
+TABELAS = {
+    "desempenho_cognitivo": ("data_avaliacao", "aluno_id"),
+    "avaliacoes_pergunta": ("timestamp", "usuario_id"),
+    "historico_avaliacoes": ("data", "usuario_id"),
+}
+
+
+# =====================================================
+# ESQUEMA
+# =====================================================
+def _tipo_arrow(declarado):
+    """Afinidade do tipo declarado no SQLite -> tipo Arrow"""
+    declarado = (declarado or "").upper()
+    if "INT" in declarado:
+        return pa.int64()
+    if any(t in declarado for t in ("REAL", "FLOA", "DOUB")):
+        return pa.float64()
+    return pa.string()
+
+
+def esquema(conn, tabela):
+    """Esquema Arrow das colunas atuais da tabela, na ordem do banco"""
+    colunas = conn.execute(f"PRAGMA table_info({tabela})").fetchall()
+    return pa.schema([(c[1], _tipo_arrow(c[2])) for c in colunas])
+
+
+def _particoes():
+    return pa.schema([("turma", pa.string()), ("mes", pa.string())])
+
+
+def tabela_arrow(esquema_arrow, linhas):
+    """Linhas do sqlite3 (tuplas) -> pyarrow.Table com o esquema dado"""
+    colunas = list(zip(*linhas)) or [()] * len(esquema_arrow)
+    return pa.Table.from_arrays(
+        [
+            pa.array(valores, type=campo.type)
+            for valores, campo in zip(colunas, esquema_arrow)
+        ],
+        schema=esquema_arrow,
+    )
+
+
+def para_parquet(dados):
+    """DataFrame ou pyarrow.Table -> bytes de um arquivo Parquet"""
+    if not isinstance(dados, pa.Table):
+        dados = pa.Table.from_pandas(dados, preserve_index=False)
+    saida = pa.BufferOutputStream()
+    pq.write_table(dados, saida, compression="zstd")
+    return saida.getvalue().to_pybytes()
+
+
+# =====================================================
+# COMPACTAÇÃO (SQLITE -> PARQUET)
+# =====================================================
+def _gravar_particoes(tabela, esquema_arrow, linhas, base):
+    """
+    Grava um lote (colunas da tabela + turma + mes) em um arquivo por
+    partição; devolve as linhas do manifesto.
+    """
+    nomes = esquema_arrow.names
+    n = len(nomes)
+    data_col, aluno_col = TABELAS[tabela]
+    i_id, i_data = nomes.index("id"), nomes.index(data_col)
+    i_aluno = nomes.index(aluno_col)
+
+    grupos = {}
+    for linha in linhas:
+        grupos.setdefault((linha[n], linha[n + 1]), []).append(linha[:n])
+
+    manifesto = []
+    agora = int(time.time())
+    for (turma, mes), grupo in grupos.items():
+        # por aluno e data: as estatísticas dos row groups descartam
+        # blocos inteiros nos filtros por aluno ou período
+        grupo.sort(
+            key=lambda l: (l[i_aluno] is None, l[i_aluno] or 0, l[i_data])
+        )
+        ids = [l[i_id] for l in grupo]
+        datas = [l[i_data] for l in grupo]
+        relativo = (
+            f"{tabela}/turma={quote(turma, safe='')}/mes={mes}/"
+            f"{min(ids)}-{max(ids)}.parquet"
+        )
+
+        destino = os.path.join(base, relativo)
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        temporario = destino + ".tmp"
+        pq.write_table(
+            tabela_arrow(esquema_arrow, grupo),
+            temporario,
+            row_group_size=LINHAS_ROW_GROUP,
+            compression="zstd",
+        )
+        os.replace(temporario, destino)
+
+        manifesto.append(
+            (
+                relativo,
+                tabela,
+                turma,
+                mes,
+                len(grupo),
+                min(datas),
+                max(datas),
+                agora,
+            )
+        )
+    return manifesto
+
+
+def _compactar_tabela(conn, tabela, corte, base, linhas_lote):
+    data_col, aluno_col = TABELAS[tabela]
+    esquema_arrow = esquema(conn, tabela)
+    colunas = ", ".join(f"t.{nome}" for nome in esquema_arrow.names)
+    movidas = 0
+    ultimo_id = 0
+
+    while True:
+        # lock de escrita durante o lote: a gravação dos arquivos, o
+        # manifesto e o DELETE valem juntos ou nada vale
+        conn.execute("BEGIN IMMEDIATE")
+        gravados = []
+        try:
+            linhas = conn.execute(
+                f"""
+                SELECT {colunas},
+                       COALESCE(u.turma, ?),
+                       strftime('%Y-%m', t.{data_col}, 'unixepoch')
+                FROM {tabela} t
+                LEFT JOIN usuarios u ON u.id = t.{aluno_col}
+                WHERE t.{data_col} < ? AND t.id > ?
+                ORDER BY t.id
+                LIMIT ?
+                """,
+                (SEM_TURMA, corte, ultimo_id, linhas_lote),
+            ).fetchall()
+            if not linhas:
+                conn.rollback()
+                return movidas
+
+            gravados = _gravar_particoes(tabela, esquema_arrow, linhas, base)
+            conn.executemany(
+                "INSERT OR REPLACE INTO arquivos_parquet "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                gravados,
+            )
+            maior_id = linhas[-1][0]
+            conn.execute(
+                f"""
+                DELETE FROM {tabela}
+                WHERE {data_col} < ? AND id > ? AND id <= ?
+                """,
+                (corte, ultimo_id, maior_id),
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            for arquivo, *_ in gravados:
+                _remover(os.path.join(base, arquivo))
+            raise
+
+        movidas += len(linhas)
+        ultimo_id = maior_id
+
+
+def _fundir_tabela(conn, tabela, mes_fechado, base):
+    """
+    Funde em um arquivo só cada partição (turma, mês) com mais de um
+    arquivo e mês anterior a `mes_fechado`; retorna quantas fundiu.
+    """
+    data_col, aluno_col = TABELAS[tabela]
+    particoes = conn.execute(
+        """
+        SELECT turma, mes FROM arquivos_parquet
+        WHERE tabela = ? AND mes < ?
+        GROUP BY turma, mes
+        HAVING COUNT(*) > 1
+        """,
+        (tabela, mes_fechado),
+    ).fetchall()
+
+    fundidas = 0
+    for turma, mes in particoes:
+        conn.execute("BEGIN IMMEDIATE")
+        novo = None
+        try:
+            entradas = conn.execute(
+                """
+                SELECT arquivo, data_min, data_max, linhas
+                FROM arquivos_parquet
+                WHERE tabela = ? AND turma = ? AND mes = ?
+                """,
+                (tabela, turma, mes),
+            ).fetchall()
+            if len(entradas) < 2:
+                conn.rollback()
+                continue
+
+            esquema_arrow = esquema(conn, tabela)
+            dados = (
+                _dataset(conn, tabela, entradas, base)
+                .to_table(columns=esquema_arrow.names)
+                .sort_by([(aluno_col, "ascending"), (data_col, "ascending")])
+            )
+            ids = dados["id"]
+            relativo = (
+                f"{tabela}/turma={quote(turma, safe='')}/mes={mes}/"
+                f"{pc.min(ids).as_py()}-{pc.max(ids).as_py()}"
+                f"-f{time.time_ns()}.parquet"
+            )
+            novo = os.path.join(base, relativo)
+            temporario = novo + ".tmp"
+            pq.write_table(
+                dados,
+                temporario,
+                row_group_size=LINHAS_ROW_GROUP,
+                compression="zstd",
+            )
+            os.replace(temporario, novo)
+
+            conn.executemany(
+                "DELETE FROM arquivos_parquet WHERE arquivo = ?",
+                [(e[0],) for e in entradas],
+            )
+            conn.execute(
+                "INSERT INTO arquivos_parquet VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    relativo,
+                    tabela,
+                    turma,
+                    mes,
+                    dados.num_rows,
+                    min(e[1] for e in entradas),
+                    max(e[2] for e in entradas),
+                    int(time.time()),
+                ),
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            if novo is not None:
+                _remover(novo)
+            raise
+        fundidas += 1
+    return fundidas
+
+
+def _remover(caminho):
+    try:
+        os.remove(caminho)
+    except FileNotFoundError:
+        pass
+
+
+def _limpar_orfaos(conn, base):
+    """Apaga arquivos que ficaram fora do manifesto (lote interrompido)"""
+    removidos = 0
+    # com o lock de escrita nenhuma compactação está no meio de um lote
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        registrados = {
+            r[0] for r in conn.execute("SELECT arquivo FROM arquivos_parquet")
+        }
+        for tabela in TABELAS:
+            for pasta, _, nomes in os.walk(os.path.join(base, tabela)):
+                for nome in nomes:
+                    if not nome.endswith((".parquet", ".tmp")):
+                        continue
+                    caminho = os.path.join(pasta, nome)
+                    relativo = os.path.relpath(caminho, base)
+                    if relativo.replace(os.sep, "/") not in registrados:
+                        _remover(caminho)
+                        removidos += 1
+    finally:
+        conn.rollback()
+    return removidos
+
+
+def compactar(
+    idade_dias=IDADE_DIAS,
+    caminho=None,
+    base=None,
+    tabelas=None,
+    linhas_lote=LINHAS_LOTE,
+    vacuum=False,
+    agora=None,
+):
+    """
+    Move para o Parquet as linhas mais velhas que `idade_dias`.
+    Retorna {tabela: linhas movidas}.
+    """
+    base = base or ARQUIVO_DIR
+    agora = time.time() if agora is None else agora
+    corte = int(agora - idade_dias * 24 * 3600)
+    inicializar(caminho)
+
+    mes_fechado = time.strftime("%Y-%m", time.gmtime(corte))
+
+    movidas = {}
+    with cronometrar("arquivo.compactar"), conectar(caminho) as conn:
+        if _limpar_orfaos(conn, base):
+            contar("arquivo.orfaos_removidos")
+        for tabela in tabelas or TABELAS:
+            movidas[tabela] = _compactar_tabela(
+                conn, tabela, corte, base, linhas_lote
+            )
+            contar(
+                "arquivo.particoes_fundidas",
+                _fundir_tabela(conn, tabela, mes_fechado, base),
+            )
+        # as páginas liberadas já são reaproveitadas; o VACUUM devolve o
+        # espaço ao disco, mas reescreve o banco inteiro
+        if vacuum and any(movidas.values()):
+            conn.execute("VACUUM")
+
+    contar("arquivo.linhas_movidas", sum(movidas.values()))
+    return movidas
+
+
+_agendada = False
+_agendada_lock = threading.Lock()
+
+
+def agendar_compactacao(
+    intervalo_s=INTERVALO_COMPACTAR_S, espera_inicial_s=60.0, **opcoes
+):
+    """
+    Compacta em uma thread de fundo a cada `intervalo_s` (uma thread por
+    processo). Sem pyarrow instalado não agenda nada e retorna False.
+    """
+    global _agendada
+    if not disponivel("pyarrow"):
+        return False
+    with _agendada_lock:
+        if _agendada:
+            return True
+        _agendada = True
+
+    def _executar():
+        time.sleep(espera_inicial_s)
+        while True:
+            try:
+                compactar(**opcoes)
+            except Exception:
+                # banco ocupado ou disco cheio: tenta no próximo ciclo
+                contar("arquivo.falhas")
+            time.sleep(intervalo_s)
+
+    threading.Thread(
+        target=_executar, name="arquivo_parquet", daemon=True
+    ).start()
+    return True
+
+
+# =====================================================
+# LEITURA (PARQUET -> PYARROW)
+# =====================================================
+def arquivos(conn, tabela, turma=None, inicio=None, fim=None, antes=None):
+    """
+    Arquivos do manifesto que podem ter linhas no período, do mais novo
+    para o mais antigo: [(arquivo, data_min, data_max)].
+    """
+    condicoes, params = ["tabela = ?"], [tabela]
+    if turma is not None:
+        condicoes.append("turma = ?")
+        params.append(turma)
+    if inicio is not None:
+        condicoes.append("data_max >= ?")
+        params.append(inicio)
+    if fim is not None:
+        condicoes.append("data_min < ?")
+        params.append(fim)
+    if antes is not None:
+        condicoes.append("data_min <= ?")
+        params.append(antes[0])
+
+    return conn.execute(
+        f"""
+        SELECT arquivo, data_min, data_max
+        FROM arquivos_parquet
+        WHERE {" AND ".join(condicoes)}
+        ORDER BY data_max DESC
+        """,
+        params,
+    ).fetchall()
+
+
+def filtro(
+    tabela,
+    aluno_id=None,
+    disciplina=None,
+    inicio=None,
+    fim=None,
+    turma=None,
+    antes=None,
+):
+    """
+    Os filtros das consultas do banco como expressão do pyarrow; `antes`
+    é o cursor (data, id) da paginação, exclusivo.
+    """
+    data_col, aluno_col = TABELAS[tabela]
+    data = ds.field(data_col)
+    partes = []
+    if aluno_id is not None:
+        partes.append(ds.field(aluno_col) == aluno_id)
+    if disciplina is not None:
+        partes.append(ds.field("disciplina") == disciplina)
+    if inicio is not None:
+        partes.append(data >= inicio)
+    if fim is not None:
+        partes.append(data < fim)
+    if turma is not None:
+        partes.append(ds.field("turma") == turma)
+    if antes is not None:
+        data_cursor, id_cursor = antes
+        partes.append(
+            (data < data_cursor)
+            | ((data == data_cursor) & (ds.field("id") < id_cursor))
+        )
+    return functools.reduce(operator.and_, partes) if partes else None
+
+
+def _dataset(conn, tabela, entradas, base):
+    base = base or ARQUIVO_DIR
+    esquema_arrow = esquema(conn, tabela)
+    # colunas criadas depois do arquivo vêm como nulas
+    for campo in _particoes():
+        esquema_arrow = esquema_arrow.append(campo)
+    return ds.dataset(
+        [os.path.join(base, e[0]) for e in entradas],
+        schema=esquema_arrow,
+        format="parquet",
+        partitioning=ds.partitioning(_particoes(), flavor="hive"),
+        partition_base_dir=os.path.join(base, tabela),
+    )
+
+
+def _pedido(filtros):
+    return {
+        k: filtros.get(k) for k in ("turma", "inicio", "fim", "antes")
+    }
+
+
+def ler(conn, tabela, colunas=None, base=None, **filtros):
+    """
+    Linhas arquivadas que passam nos filtros (pyarrow.Table), só com as
+    `colunas` pedidas; None se nenhum arquivo do manifesto serve.
+    """
+    entradas = arquivos(conn, tabela, **_pedido(filtros))
+    if not entradas:
+        return None
+    with cronometrar("arquivo.ler"):
+        return _dataset(conn, tabela, entradas, base).to_table(
+            columns=colunas, filter=filtro(tabela, **filtros)
+        )
+
+
+def mais_recentes(conn, tabela, n, colunas=None, base=None, **filtros):
+    """
+    As `n` linhas arquivadas mais recentes por (data, id), em ordem
+    decrescente. Lê os arquivos do mais novo para o mais antigo e para
+    quando nenhum dos restantes pode entrar no resultado.
+    """
+    entradas = arquivos(conn, tabela, **_pedido(filtros))
+    if not entradas:
+        return None
+
+    data_col = TABELAS[tabela][0]
+    if colunas is not None:
+        colunas = list(dict.fromkeys([*colunas, data_col, "id"]))
+    ordem = [(data_col, "descending"), ("id", "descending")]
+    expressao = filtro(tabela, **filtros)
+
+    melhores = None
+    with cronometrar("arquivo.mais_recentes"):
+        for i in range(0, len(entradas), 8):
+            grupo = entradas[i : i + 8]
+            if melhores is not None and melhores.num_rows >= n:
+                corte = melhores[data_col][n - 1].as_py()
+                if grupo[0][2] < corte:
+                    break
+            lidas = _dataset(conn, tabela, grupo, base).to_table(
+                columns=colunas, filter=expressao
+            )
+            if melhores is not None:
+                lidas = pa.concat_tables([melhores, lidas])
+            melhores = lidas.sort_by(ordem).slice(0, n)
+    return melhores
+
+
+# =====================================================
+# LINHA DE COMANDO
+# =====================================================
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Move o histórico antigo do banco para arquivos "
+        "Parquet particionados por turma e mês."
+    )
+    parser.add_argument("--idade-dias", type=int, default=IDADE_DIAS)
+    parser.add_argument("--banco", help="default: NUTRIEDU_DB")
+    parser.add_argument("--destino", help="default: NUTRIEDU_ARQUIVO")
+    parser.add_argument(
+        "--tabelas", nargs="+", choices=sorted(TABELAS),
+        help="default: todas",
+    )
+    parser.add_argument("--lote", type=int, default=LINHAS_LOTE)
+    parser.add_argument(
+        "--vacuum", action="store_true",
+        help="devolve ao disco o espaço liberado (reescreve o banco)",
+    )
+    args = parser.parse_args(argv)
+
+    inicio = time.perf_counter()
+    movidas = compactar(
+        idade_dias=args.idade_dias,
+        caminho=args.banco,
+        base=args.destino,
+        tabelas=args.tabelas,
+        linhas_lote=args.lote,
+        vacuum=args.vacuum,
+    )
+    for tabela, linhas in movidas.items():
+        print(f"{tabela}: {linhas} linhas arquivadas")
+    print(f"Concluído em {time.perf_counter() - inicio:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""
+Suíte de benchmarks do NutriEdu (offline, sem interface).
+
+    python -m benchmarks                       # tudo
+    python -m benchmarks --suites visao,ia
+    python -m benchmarks --tamanhos 10k --video aula.mp4
+    python -m benchmarks --comparar resultados_main.json
+
+Cada suíte roda em um processo próprio e devolve JSON. O resultado
+consolidado vai para --saida; latências acima de benchmarks/limites.json
+ou mais lentas que --comparar (além da tolerância) saem com código 1.
+Os limites são tetos folgados, independentes da máquina; regressões
+finas ficam a cargo de --comparar contra uma rodada da mesma máquina.
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.dados import DIR_DADOS, gerar_banco
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+AQUI = os.path.join(RAIZ, "benchmarks")
+
+SUITES = ("visao", "banco", "ia")
+TAMANHOS = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+
+
+# =====================================================
+# EXECUÇÃO DAS SUÍTES
+# =====================================================
+def _rodar(modulo, argumentos=(), env=None):
+    processo = subprocess.run(
+        [sys.executable, "-m", f"benchmarks.{modulo}", *argumentos],
+        cwd=RAIZ,
+        env={**os.environ, **(env or {})},
+        capture_output=True,
+        text=True,
+    )
+    if processo.returncode != 0:
+        sys.stderr.write(processo.stderr)
+        raise RuntimeError(f"suíte {modulo} falhou ({processo.returncode})")
+    return json.loads(processo.stdout)
+
+
+def executar(suites, tamanhos, videos, dir_dados):
+    resultados = {}
+
+    if "visao" in suites:
+        argumentos = [a for v in videos for a in ("--video", v)]
+        resultados.update(_rodar("visao", argumentos))
+
+    if "banco" in suites:
+        for rotulo in tamanhos:
+            print(f"… banco {rotulo}", file=sys.stderr)
+            caminho = gerar_banco(TAMANHOS[rotulo], dir_dados)
+            resultados.update(
+                _rodar(
+                    "banco",
+                    ["--rotulo", rotulo],
+                    env={"NUTRIEDU_DB": caminho},
+                )
+            )
+
+    if "ia" in suites:
+        with tempfile.TemporaryDirectory() as tmp:
+            resultados.update(
+                _rodar(
+                    "ia",
+                    env={"NUTRIEDU_DB": os.path.join(tmp, "ia.db")},
+                )
+            )
+
+    return resultados
+
+
+def _meta():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=RAIZ,
+            capture_output=True,
+            text=True,
+        ).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "data": datetime.datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "processador": platform.processor() or platform.machine(),
+        "cpus": os.cpu_count(),
+    }
+
+
+# =====================================================
+# LIMITES E COMPARAÇÃO
+# =====================================================
+def verificar_limites(resultados, limites):
+    """Lista de violações (nome, métrica, valor, limite)"""
+    violacoes = []
+    for nome, maximos in limites.items():
+        medido = resultados.get(nome)
+        if not medido or "erro" in medido:
+            continue
+        for metrica, maximo in maximos.items():
+            valor = medido.get(metrica)
+            if valor is not None and valor > maximo:
+                violacoes.append((nome, metrica, valor, maximo))
+    return violacoes
+
+
+def comparar(resultados, anteriores, tolerancia, metrica="p50_ms"):
+    """(nome, razão novo/anterior) para os casos medidos nas duas rodadas"""
+    razoes = []
+    for nome, medido in resultados.items():
+        antes = anteriores.get(nome, {}).get(metrica)
+        agora = medido.get(metrica)
+        if antes and agora is not None:
+            razoes.append((nome, agora / antes))
+    regressoes = [(n, r) for n, r in razoes if r > 1 + tolerancia]
+    return razoes, regressoes
+
+
+def _tabela(resultados):
+    largura = max((len(n) for n in resultados), default=10)
+    print(f"{'caso':<{largura}}  {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10}")
+    for nome, medido in resultados.items():
+        if "erro" in medido:
+            print(f"{nome:<{largura}}  pulado: {medido['erro']}")
+        elif "p50_ms" in medido:
+            print(
+                f"{nome:<{largura}}  {medido['p50_ms']:>10.4f} "
+                f"{medido['p95_ms']:>10.4f} {medido['p99_ms']:>10.4f}"
+            )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    parser.add_argument("--suites", default=",".join(SUITES))
+    parser.add_argument("--tamanhos", default=",".join(TAMANHOS))
+    parser.add_argument("--video", action="append", default=[])
+    parser.add_argument("--dados", default=DIR_DADOS)
+    parser.add_argument(
+        "--saida", default=os.path.join(AQUI, "resultados.json")
+    )
+    parser.add_argument(
+        "--limites", default=os.path.join(AQUI, "limites.json")
+    )
+    parser.add_argument("--comparar")
+    parser.add_argument("--tolerancia", type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    suites = [s for s in args.suites.split(",") if s]
+    tamanhos = [t.lower() for t in args.tamanhos.split(",") if t]
+    for s in suites:
+        if s not in SUITES:
+            parser.error(f"suíte desconhecida: {s}")
+    for t in tamanhos:
+        if t not in TAMANHOS:
+            parser.error(f"tamanho desconhecido: {t}")
+
+    resultados = executar(suites, tamanhos, args.video, args.dados)
+    _tabela(resultados)
+
+    relatorio = {"meta": _meta(), "resultados": resultados}
+    falhou = False
+
+    if args.limites and os.path.exists(args.limites):
+        with open(args.limites, encoding="utf-8") as f:
+            limites = json.load(f)
+        violacoes = verificar_limites(resultados, limites)
+        relatorio["limites_violados"] = [
+            {"caso": n, "metrica": m, "valor": v, "limite": lim}
+            for n, m, v, lim in violacoes
+        ]
+        for nome, metrica, valor, maximo in violacoes:
+            print(f"❌ {nome}: {metrica} {valor:.4f} > {maximo}")
+        falhou |= bool(violacoes)
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            anteriores = json.load(f)["resultados"]
+        razoes, regressoes = comparar(resultados, anteriores, args.tolerancia)
+        relatorio["comparacao"] = {
+            "base": args.comparar,
+            "tolerancia": args.tolerancia,
+            "razao_p50": dict(razoes),
+        }
+        for nome, razao in razoes:
+            sinal = "mais lento" if razao > 1 else "mais rápido"
+            print(f"{nome}: {razao:.2f}x ({sinal})")
+        for nome, razao in regressoes:
+            print(f"❌ regressão em {nome}: {razao:.2f}x")
+        falhou |= bool(regressoes)
+
+    with open(args.saida, "w", encoding="utf-8") as f:
+        json.dump(relatorio, f, ensure_ascii=False, indent=2)
+    print(f"resultados em {args.saida}")
+
+    return 1 if falhou else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
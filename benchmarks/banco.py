@@ -0,0 +1,84 @@
+import argparse
+import time
+
+from benchmarks.medicao import emitir, medir
+
+# =====================================================
+# SUÍTE: BANCO E AGREGAÇÕES DOS PAINÉIS
+# =====================================================
+# Roda em um processo próprio por tamanho de banco, com NUTRIEDU_DB
+# apontando para o banco gerado (ver benchmarks/dados.py).
+
+PAGINAS_PROFUNDAS = 20
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rotulo", required=True)
+    args = parser.parse_args(argv)
+
+    import consultas
+    from cache_dados import cache
+    from database import inicializar
+
+    inicializar()
+    prefixo = f"banco.{args.rotulo}"
+
+    # __wrapped__ pula o cache: mede a ida ao banco
+    resumo = consultas.resumo.__wrapped__
+    listar_alunos = consultas.listar_alunos.__wrapped__
+    listar_disciplinas = consultas.listar_disciplinas.__wrapped__
+    media_por_disciplina = consultas.media_por_disciplina.__wrapped__
+    contagem_emocoes = consultas.contagem_emocoes.__wrapped__
+    pagina_detalhes = consultas.pagina_detalhes.__wrapped__
+
+    def carregar_dados():
+        # mesmo trabalho do carregar_dados do Painel Cognitivo
+        return {
+            "resumo": resumo(),
+            "alunos": listar_alunos(),
+            "disciplinas": listar_disciplinas(),
+        }
+
+    def carregar_dados_cache():
+        return {
+            "resumo": consultas.resumo(),
+            "alunos": consultas.listar_alunos(),
+            "disciplinas": consultas.listar_disciplinas(),
+        }
+
+    aluno = listar_alunos()[0][0]
+    disciplina = listar_disciplinas()[0]
+    ultimo_mes = {"inicio": int(time.time()) - 30 * 24 * 3600}
+
+    cursor = None
+    for _ in range(PAGINAS_PROFUNDAS):
+        _, cursor = pagina_detalhes(apos=cursor)
+
+    casos = {
+        "carregar_dados": carregar_dados,
+        "carregar_dados_cache": carregar_dados_cache,
+        "resumo_aluno": lambda: resumo(aluno_id=aluno),
+        "resumo_ultimo_mes": lambda: resumo(**ultimo_mes),
+        "media_por_disciplina": media_por_disciplina,
+        "media_por_disciplina_ultimo_mes": (
+            lambda: media_por_disciplina(**ultimo_mes)
+        ),
+        "contagem_emocoes": contagem_emocoes,
+        "contagem_emocoes_disciplina": (
+            lambda: contagem_emocoes(disciplina=disciplina)
+        ),
+        "pagina_detalhes_primeira": pagina_detalhes,
+        "pagina_detalhes_profunda": lambda: pagina_detalhes(apos=cursor),
+    }
+
+    resultados = {}
+    for nome, func in casos.items():
+        resultados[f"{prefixo}.{nome}"] = medir(func, repeticoes=100)
+
+    cache.limpar()
+    emitir(resultados)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+import math
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+import numpy as np
+
+from metricas_faciais import OLHO_DIR, OLHO_ESQ
+
+# =====================================================
+# LANDMARKS SINTÉTICOS
+# =====================================================
+N_LANDMARKS = 478
+LARGURA_OLHO = 0.06
+
+
+def _olho(pts, idx, centro_x, centro_y, ear):
+    """Posiciona os 6 pontos do EAR para a abertura pedida"""
+    meia = LARGURA_OLHO / 2
+    altura = ear * LARGURA_OLHO / 2
+    canto_a, sup_1, sup_2, canto_b, inf_2, inf_1 = idx
+    pts[canto_a, :2] = (centro_x - meia, centro_y)
+    pts[canto_b, :2] = (centro_x + meia, centro_y)
+    pts[sup_1, :2] = (centro_x - meia / 3, centro_y - altura)
+    pts[sup_2, :2] = (centro_x + meia / 3, centro_y - altura)
+    pts[inf_1, :2] = (centro_x - meia / 3, centro_y + altura)
+    pts[inf_2, :2] = (centro_x + meia / 3, centro_y + altura)
+
+
+def rosto_sintetico(ear=0.3, boca=0.1, rng=None):
+    """Array (478, 3) float32 com olhos, boca e sobrancelhas coerentes"""
+    rng = rng or np.random.default_rng(0)
+    pts = rng.uniform(0.35, 0.65, size=(N_LANDMARKS, 3)).astype(np.float32)
+    pts[:, 2] = rng.normal(0, 0.01, N_LANDMARKS)
+
+    _olho(pts, OLHO_ESQ, 0.42, 0.45, ear)
+    _olho(pts, OLHO_DIR, 0.58, 0.45, ear)
+    # pálpebras usadas na abertura dos olhos
+    pts[159, :2], pts[145, :2] = pts[160, :2], pts[144, :2]
+    pts[386, :2], pts[374, :2] = pts[385, :2], pts[380, :2]
+    # lábios, cantos da boca e sobrancelhas
+    pts[13, :2] = (0.50, 0.60 - boca / 2)
+    pts[14, :2] = (0.50, 0.60 + boca / 2)
+    pts[61, :2] = (0.44, 0.60)
+    pts[291, :2] = (0.56, 0.60)
+    pts[70, :2] = (0.42, 0.40)
+    pts[300, :2] = (0.58, 0.40)
+    return pts
+
+
+def sequencia_ears(n, fps=30.0, piscadas_min=15, semente=0):
+    """EAR quadro a quadro com piscadas de ~150 ms em ritmo aleatório"""
+    rng = random.Random(semente)
+    ears = []
+    proxima = rng.expovariate(piscadas_min / 60)
+    t = 0.0
+    for _ in range(n):
+        if proxima <= t < proxima + 0.15:
+            fase = (t - proxima) / 0.15
+            ears.append(0.3 - 0.22 * math.sin(math.pi * fase))
+        else:
+            ears.append(0.3 + rng.gauss(0, 0.01))
+        if t >= proxima + 0.15:
+            proxima = t + rng.expovariate(piscadas_min / 60)
+        t += 1 / fps
+    return ears
+
+
+# =====================================================
+# BANCOS SINTÉTICOS
+# =====================================================
+DIR_DADOS = os.path.join(tempfile.gettempdir(), "nutriedu_bench")
+
+DISCIPLINAS = [
+    "Matemática", "Português", "Ciências", "História", "Geografia",
+    "Inglês", "Artes", "Educação Física",
+]
+ESTADOS = ["Focado", "Normal", "Distraído", "Fadiga"]
+AVALIACOES_POR_ALUNO = 50
+LOTE_INSERCAO = 50_000
+
+
+def caminho_banco(linhas, diretorio=DIR_DADOS):
+    return os.path.join(diretorio, f"desempenho_{linhas}.db")
+
+
+def _linhas_existentes(caminho):
+    try:
+        conn = sqlite3.connect(f"file:{caminho}?mode=ro", uri=True)
+    except sqlite3.Error:
+        return None
+    try:
+        return conn.execute(
+            "SELECT COUNT(*) FROM desempenho_cognitivo"
+        ).fetchone()[0]
+    except sqlite3.Error:
+        return None
+    finally:
+        conn.close()
+
+
+def gerar_banco(linhas, diretorio=DIR_DADOS, semente=42):
+    """
+    Cria (ou reaproveita) um banco com `linhas` avaliações em
+    desempenho_cognitivo, cobrindo o último ano. Determinístico.
+    """
+    caminho = caminho_banco(linhas, diretorio)
+    if _linhas_existentes(caminho) == linhas:
+        return caminho
+
+    os.makedirs(diretorio, exist_ok=True)
+    for sufixo in ("", "-wal", "-shm"):
+        if os.path.exists(caminho + sufixo):
+            os.remove(caminho + sufixo)
+
+    from database import criar_tabelas, obter_pool, transacao
+
+    criar_tabelas(caminho)
+    rng = random.Random(semente)
+    n_alunos = max(linhas // AVALIACOES_POR_ALUNO, 1)
+    agora = int(time.time())
+    ano = 365 * 24 * 3600
+
+    idades = [rng.randint(7, 18) for _ in range(n_alunos)]
+
+    with transacao(caminho) as conn:
+        conn.executemany(
+            "INSERT INTO usuarios (id, nome, idade) VALUES (?, ?, ?)",
+            (
+                (i + 1, f"Aluno {i + 1:07d}", idade)
+                for i, idade in enumerate(idades)
+            ),
+        )
+
+    def _avaliacao():
+        aluno = rng.randrange(n_alunos)
+        return (
+            aluno + 1,
+            f"Aluno {aluno + 1:07d}",
+            idades[aluno],
+            rng.choice(DISCIPLINAS),
+            round(rng.uniform(3, 10), 1),
+            rng.choice(ESTADOS),
+            agora - rng.randrange(ano),
+        )
+
+    for inicio in range(0, linhas, LOTE_INSERCAO):
+        fim = min(inicio + LOTE_INSERCAO, linhas)
+        with transacao(caminho) as conn:
+            conn.executemany(
+                """
+                INSERT INTO desempenho_cognitivo
+                (aluno_id, nome, idade, disciplina, nota, estado_emocional,
+                 data_avaliacao)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                (_avaliacao() for _ in range(fim - inicio)),
+            )
+
+    with transacao(caminho) as conn:
+        conn.execute("ANALYZE")
+    obter_pool(caminho).fechar()
+    return caminho
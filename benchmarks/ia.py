@@ -0,0 +1,79 @@
+import argparse
+import itertools
+import os
+import uuid
+
+from benchmarks.medicao import emitir, medir
+from benchmarks.openai_simulado import OpenAISimulado
+
+# =====================================================
+# SUÍTE: IA NUTRICIONAL CONTRA UM ENDPOINT SIMULADO
+# =====================================================
+# Mede o custo do nosso lado de avaliar_lanche: classificador local,
+# cache de respostas, gateway e parsing. O atraso do servidor simulado
+# é zero por padrão, então o tempo medido é só overhead.
+
+LANCHES_LOCAIS = [
+    "maçã e banana",
+    "bolacha recheada com refrigerante",
+    "pão integral com queijo branco",
+    "coxinha e suco de caixinha",
+]
+TAMANHO_TURMA = 30
+
+
+def _desconhecido():
+    # termos fora do léxico e sem parecença entre si: sempre vai à IA
+    return f"prato {uuid.uuid4().hex}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--atraso", type=float, default=0.0)
+    args = parser.parse_args(argv)
+
+    with OpenAISimulado(atraso=args.atraso) as servidor:
+        # antes de importar nutri_ai / criar o cliente
+        os.environ["OPENAI_API_KEY"] = "simulado"
+        os.environ["OPENAI_BASE_URL"] = servidor.base_url
+
+        import nutri_ai
+        from llm import obter_gateway
+
+        gateway = obter_gateway()
+        ciclo_locais = itertools.cycle(LANCHES_LOCAIS)
+        repetido = _desconhecido()
+        nutri_ai.avaliar_lanche(repetido)
+
+        casos = {
+            "ia.gateway_completar": lambda: gateway.completar_sync(
+                [{"role": "user", "content": "oi"}]
+            ),
+            "ia.avaliar_lanche_local": (
+                lambda: nutri_ai.avaliar_lanche(next(ciclo_locais))
+            ),
+            "ia.avaliar_lanche_cache": (
+                lambda: nutri_ai.avaliar_lanche(repetido)
+            ),
+            "ia.avaliar_lanche_openai": (
+                lambda: nutri_ai.avaliar_lanche(_desconhecido())
+            ),
+            "ia.avaliar_lanches_lote_turma": (
+                lambda: nutri_ai.avaliar_lanches_lote(
+                    [_desconhecido() for _ in range(TAMANHO_TURMA)]
+                )
+            ),
+        }
+
+        resultados = {}
+        for nome, func in casos.items():
+            resultados[nome] = medir(func, repeticoes=100, aquecimento=3)
+        resultados["ia.requisicoes_servidor"] = {
+            "contagem": servidor.requisicoes
+        }
+
+    emitir(resultados)
+
+
+if __name__ == "__main__":
+    main()
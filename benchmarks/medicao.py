@@ -0,0 +1,44 @@
+import json
+import sys
+import time
+
+from instrumentacao import Histograma
+
+# =====================================================
+# CRONOMETRAGEM DOS CASOS
+# =====================================================
+REPETICOES = 300
+AQUECIMENTO = 10
+ORCAMENTO_S = 3.0
+MIN_REPETICOES = 5
+
+
+def medir(func, repeticoes=REPETICOES, aquecimento=AQUECIMENTO,
+          orcamento_s=ORCAMENTO_S, lote=1):
+    """
+    Roda `func()` até `repeticoes` vezes (ou até estourar o orçamento
+    de tempo, com um mínimo de MIN_REPETICOES) e resume as latências.
+    Funções de microssegundos usam `lote` > 1: cada amostra é a média
+    de `lote` chamadas seguidas.
+    """
+    for _ in range(aquecimento):
+        func()
+
+    histograma = Histograma(janela=repeticoes)
+    limite = time.perf_counter() + orcamento_s
+    for i in range(repeticoes):
+        inicio = time.perf_counter()
+        for _ in range(lote):
+            func()
+        fim = time.perf_counter()
+        histograma.registrar((fim - inicio) * 1000 / lote)
+        if fim > limite and i + 1 >= MIN_REPETICOES:
+            break
+
+    return histograma.resumo()
+
+
+def emitir(resultados):
+    """Saída de um processo de suíte: JSON na stdout, lido pelo executor"""
+    json.dump(resultados, sys.stdout, ensure_ascii=False)
+    sys.stdout.flush()
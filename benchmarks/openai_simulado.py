@@ -0,0 +1,112 @@
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# =====================================================
+# ENDPOINT OPENAI SIMULADO (OFFLINE)
+# =====================================================
+# Responde /v1/chat/completions no formato da API, com atraso fixo,
+# para medir o custo do nosso lado (cache, gateway, parsing) sem rede.
+
+RESPOSTA_TEXTO = (
+    "Classificação: Moderado\n\n"
+    "Explicação:\nTem coisas boas, mas pode melhorar.\n\n"
+    "Sugestão:\nAcrescente uma fruta."
+)
+
+_ITEM_LOTE = re.compile(r'^\s*(\d+)\. "', re.MULTILINE)
+
+
+class _Tratador(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # cabeçalho e corpo saem em escritas separadas: sem isso o Nagle
+    # soma ~40 ms a cada resposta
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        corpo = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        servidor = self.server
+        servidor.requisicoes += 1
+        if servidor.atraso:
+            time.sleep(servidor.atraso)
+
+        if corpo.get("response_format", {}).get("type") == "json_object":
+            prompt = corpo["messages"][-1]["content"]
+            conteudo = json.dumps(
+                {
+                    "avaliacoes": [
+                        {
+                            "indice": int(i),
+                            "classificacao": "Moderado",
+                            "explicacao": "Tem coisas boas.",
+                            "sugestao": "Acrescente uma fruta.",
+                        }
+                        for i in _ITEM_LOTE.findall(prompt)
+                    ]
+                },
+                ensure_ascii=False,
+            )
+        else:
+            conteudo = RESPOSTA_TEXTO
+
+        dados = json.dumps(
+            {
+                "id": "chatcmpl-bench",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": corpo.get("model", "simulado"),
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": conteudo},
+                        "finish_reason": "stop",
+                    }
+                ],
+                "usage": {
+                    "prompt_tokens": 0,
+                    "completion_tokens": 0,
+                    "total_tokens": 0,
+                },
+            },
+            ensure_ascii=False,
+        ).encode()
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(dados)))
+        self.end_headers()
+        self.wfile.write(dados)
+
+    def log_message(self, *args):
+        pass
+
+
+class OpenAISimulado:
+    """Servidor local em thread; use como context manager"""
+
+    def __init__(self, atraso=0.0):
+        self.servidor = ThreadingHTTPServer(("127.0.0.1", 0), _Tratador)
+        self.servidor.atraso = atraso
+        self.servidor.requisicoes = 0
+        self.servidor.daemon_threads = True
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.servidor.server_port}/v1"
+
+    @property
+    def requisicoes(self):
+        return self.servidor.requisicoes
+
+    def __enter__(self):
+        threading.Thread(
+            target=self.servidor.serve_forever, name="openai_simulado",
+            daemon=True,
+        ).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.servidor.shutdown()
+        self.servidor.server_close()
@@ -0,0 +1,127 @@
+import argparse
+import itertools
+import os
+from types import SimpleNamespace
+
+import numpy as np
+
+from benchmarks.dados import rosto_sintetico, sequencia_ears
+from benchmarks.medicao import emitir, medir
+from estado_cognitivo import EstimadorPiscadas, classificar_estado
+from metricas_faciais import (
+    OLHO_ESQ,
+    calcular_ear,
+    calcular_metricas,
+    detectar_emocao_por_landmarks,
+    landmarks_para_array,
+)
+
+# =====================================================
+# SUÍTE: VISÃO (LANDMARKS SINTÉTICOS E VÍDEOS GRAVADOS)
+# =====================================================
+MAX_QUADROS_VIDEO = 300
+
+
+def _sinteticos():
+    rng = np.random.default_rng(7)
+    ears = sequencia_ears(3000)
+    rostos = [
+        rosto_sintetico(ear=ear, boca=0.05 + 0.3 * (i % 7) / 7, rng=rng)
+        for i, ear in enumerate(ears[:64])
+    ]
+    ciclo_rostos = itertools.cycle(rostos)
+    ciclo_ears = itertools.cycle(ears)
+
+    # objetos com .x/.y/.z, como `face.landmark` do MediaPipe
+    landmarks_mp = [
+        SimpleNamespace(x=float(x), y=float(y), z=float(z))
+        for x, y, z in rostos[0]
+    ]
+
+    estimador = EstimadorPiscadas()
+    relogio = itertools.count(0, 1 / 30)
+
+    return {
+        "visao.landmarks_para_array": (
+            lambda: landmarks_para_array(landmarks_mp), 1
+        ),
+        "visao.calcular_ear": (
+            lambda: calcular_ear(next(ciclo_rostos), OLHO_ESQ), 100
+        ),
+        "visao.calcular_metricas": (
+            lambda: calcular_metricas(next(ciclo_rostos)), 100
+        ),
+        "visao.detectar_emocao_por_landmarks": (
+            lambda: detectar_emocao_por_landmarks(next(ciclo_rostos)), 100
+        ),
+        "visao.classificar_estado": (
+            lambda: classificar_estado(next(ciclo_ears), 15.0), 1000
+        ),
+        "visao.estimador_piscadas": (
+            lambda: estimador.atualizar(next(ciclo_ears), next(relogio)), 1000
+        ),
+    }
+
+
+def _quadros(caminho, limite=MAX_QUADROS_VIDEO):
+    from carregamento import cv2
+
+    cap = cv2.VideoCapture(caminho)
+    quadros = []
+    try:
+        while len(quadros) < limite:
+            ok, frame = cap.read()
+            if not ok:
+                break
+            quadros.append(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+    finally:
+        cap.release()
+    return quadros
+
+
+def _video(caminho):
+    """Pipeline completo por quadro: FaceMesh + métricas + estimador"""
+    from motor_facial import SessaoFacial
+
+    quadros = _quadros(caminho)
+    if not quadros:
+        raise ValueError(f"nenhum quadro lido de {caminho}")
+
+    sessao = SessaoFacial()
+    estimador = EstimadorPiscadas()
+    ciclo = itertools.cycle(enumerate(quadros))
+
+    def quadro():
+        i, rgb = next(ciclo)
+        faces = sessao.processar(rgb)
+        if faces:
+            metricas = calcular_metricas(faces[0])
+            estimador.atualizar(metricas["ear"], i / 30)
+
+    return quadro
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--video", action="append", default=[])
+    args = parser.parse_args(argv)
+
+    resultados = {}
+    for nome, (func, lote) in _sinteticos().items():
+        resultados[nome] = medir(func, lote=lote)
+
+    for caminho in args.video:
+        clipe = os.path.splitext(os.path.basename(caminho))[0]
+        nome = f"visao.video.{clipe}.quadro"
+        try:
+            resultados[nome] = medir(
+                _video(caminho), repeticoes=MAX_QUADROS_VIDEO, aquecimento=5
+            )
+        except Exception as e:
+            resultados[nome] = {"erro": f"{type(e).__name__}: {e}"}
+
+    emitir(resultados)
+
+
+if __name__ == "__main__":
+    main()
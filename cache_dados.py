@@ -0,0 +1,145 @@
+import functools
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from database import DB
+from instrumentacao import cronometrar
+
+# =====================================================
+# VERSÃO DO BANCO (CHAVE BARATA DE INVALIDAÇÃO)
+# =====================================================
+# `PRAGMA data_version` muda sempre que OUTRA conexão faz commit.
+# Uma conexão dedicada, que nunca escreve, enxerga então qualquer
+# escrita do pool ou de outros processos por alguns microssegundos.
+
+_observadores = {}
+_observadores_lock = threading.Lock()
+
+
+def versao_banco(caminho=None):
+    caminho = caminho or DB
+    with _observadores_lock:
+        conn = _observadores.get(caminho)
+        if conn is None:
+            conn = sqlite3.connect(caminho, check_same_thread=False)
+            _observadores[caminho] = conn
+        return conn.execute("PRAGMA data_version").fetchone()[0]
+
+
+# =====================================================
+# CACHE COMPARTILHADO ENTRE SESSÕES
+# =====================================================
+class CacheConsultas:
+    """
+    Cache de resultados compartilhado por todas as sessões do processo.
+    Uma entrada vale enquanto não expirar (TTL) e enquanto a versão do
+    banco for a mesma de quando foi calculada. Chamadas simultâneas à
+    mesma chave esperam um único cálculo.
+    """
+
+    def __init__(self, max_itens=256):
+        self.max_itens = max_itens
+        self._itens = OrderedDict()
+        self._lock = threading.Lock()
+        self._calculando = {}
+
+        self.acertos = 0
+        self.falhas = 0
+        self.invalidacoes = 0
+        self.expiracoes = 0
+
+    def _valido(self, chave, versao, agora):
+        item = self._itens.get(chave)
+        if item is None:
+            return None
+        valor, versao_item, expira_em = item
+        if versao_item != versao:
+            self.invalidacoes += 1
+        elif expira_em < agora:
+            self.expiracoes += 1
+        else:
+            self._itens.move_to_end(chave)
+            return item
+        del self._itens[chave]
+        return None
+
+    def obter(self, chave, calcular, ttl, versao):
+        with self._lock:
+            item = self._valido(chave, versao, time.monotonic())
+            if item is not None:
+                self.acertos += 1
+                return item[0]
+            self.falhas += 1
+            calculo = self._calculando.get(chave)
+            if calculo is None:
+                calculo = self._calculando[chave] = threading.Lock()
+
+        with calculo:
+            # quem esperou o lock encontra o valor recém-calculado
+            with self._lock:
+                item = self._valido(chave, versao, time.monotonic())
+                if item is not None:
+                    return item[0]
+
+            try:
+                valor = calcular()
+            except BaseException:
+                with self._lock:
+                    self._calculando.pop(chave, None)
+                raise
+
+            # guarda o valor antes de soltar o lock de cálculo: quem chegar
+            # entre os dois passos acharia o cache vazio e recalcularia
+            with self._lock:
+                self._itens[chave] = (valor, versao, time.monotonic() + ttl)
+                self._itens.move_to_end(chave)
+                while len(self._itens) > self.max_itens:
+                    self._itens.popitem(last=False)
+                self._calculando.pop(chave, None)
+
+        return valor
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+
+    def estatisticas(self):
+        with self._lock:
+            total = self.acertos + self.falhas
+            return {
+                "itens": len(self._itens),
+                "acertos": self.acertos,
+                "falhas": self.falhas,
+                "taxa_acerto": self.acertos / total if total else 0.0,
+                "invalidacoes": self.invalidacoes,
+                "expiracoes": self.expiracoes,
+            }
+
+
+cache = CacheConsultas()
+
+
+def em_cache(nome, ttl=60.0, caminho=None):
+    """
+    Decorador: guarda o resultado por (nome, argumentos) no cache global.
+    `nome` identifica a função — as páginas rodam todas como __main__.
+    O valor devolvido é compartilhado: quem chama não deve alterá-lo.
+    """
+
+    def decorador(func):
+        @functools.wraps(func)
+        def envolvida(*args, **kwargs):
+            chave = (nome, args, tuple(sorted(kwargs.items())))
+
+            def calcular():
+                # só as idas ao banco, não os acertos do cache
+                with cronometrar(f"consulta.{nome}"):
+                    return func(*args, **kwargs)
+
+            return cache.obter(chave, calcular, ttl, versao_banco(caminho))
+
+        return envolvida
+
+    return decorador
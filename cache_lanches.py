@@ -0,0 +1,233 @@
+import difflib
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from database import conectar, inicializar
+from escrita_lote import obter_escrita
+
+
+# =====================================================
+# NORMALIZAÇÃO DA DESCRIÇÃO
+# =====================================================
+def normalizar_lanche(texto):
+    """
+    Chave canônica do lanche: minúsculas, sem acentos, sem pontuação
+    e com as palavras em ordem alfabética.
+    "Pão com Manteiga!" e "manteiga com pao" viram a mesma chave.
+    """
+    texto = unicodedata.normalize("NFKD", texto.lower())
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    return " ".join(sorted(re.findall(r"[a-z0-9]+", texto)))
+
+
+# palavras que mudam o veredito: "refrigerante" x "refrigerante zero",
+# "com açúcar" x "sem açúcar" ficam parecidas na razão do difflib
+PALAVRAS_DECISIVAS = frozenset(
+    {"sem", "com", "zero", "diet", "light", "integral", "nao", "pouco"}
+)
+
+
+def equivalentes(chave, outra):
+    """Se duas chaves parecidas podem compartilhar a mesma resposta"""
+    diferentes = set(chave.split()) ^ set(outra.split())
+    return not diferentes & PALAVRAS_DECISIVAS
+
+
+# =====================================================
+# CACHE DE RESPOSTAS (MEMÓRIA + SQLITE)
+# =====================================================
+class CacheRespostas:
+    """
+    Cache de respostas da IA por descrição normalizada.
+
+    - memória: LRU com `capacidade` itens;
+    - disco: tabela `cache_lanches`, que sobrevive a reinícios, com o
+      mesmo limite (remove os menos acessados);
+    - `ttl` em segundos para as duas camadas;
+    - `similaridade` (0-1) liga a busca aproximada entre as chaves em
+      memória (nunca entre chaves que diferem em sem/com/zero/diet...);
+      None (padrão) desliga;
+    - pedidos simultâneos para a mesma chave viram uma única chamada.
+    """
+
+    def __init__(
+        self,
+        capacidade=2000,
+        ttl=30 * 24 * 3600,
+        similaridade=None,
+        caminho=None,
+    ):
+        self.capacidade = capacidade
+        self.ttl = ttl
+        self.similaridade = similaridade
+        self.caminho = caminho
+
+        self._memoria = OrderedDict()
+        self._lock = threading.Lock()
+        self._em_voo = {}
+        self._insercoes = 0
+
+        self.acertos = 0
+        self.falhas = 0
+        self.coalescidos = 0
+
+    # ---------- camadas ----------
+    def _buscar_memoria(self, chave, agora):
+        item = self._memoria.get(chave)
+        if item is None and self.similaridade:
+            parecidas = difflib.get_close_matches(
+                chave, list(self._memoria), n=1, cutoff=self.similaridade
+            )
+            if parecidas and equivalentes(chave, parecidas[0]):
+                chave = parecidas[0]
+                item = self._memoria[chave]
+        if item is None:
+            return None
+
+        resposta, criado_em = item
+        if criado_em + self.ttl < agora:
+            del self._memoria[chave]
+            return None
+
+        self._memoria.move_to_end(chave)
+        return resposta
+
+    def _guardar_memoria(self, chave, resposta, criado_em):
+        self._memoria[chave] = (resposta, criado_em)
+        self._memoria.move_to_end(chave)
+        while len(self._memoria) > self.capacidade:
+            self._memoria.popitem(last=False)
+
+    # leitura direta; expiração, acesso e inserção vão para a escrita
+    # em lote (coalescidos por chave: vários acessos = um UPDATE)
+    def _buscar_disco(self, chave, agora):
+        inicializar(self.caminho)
+        with conectar(self.caminho) as conn:
+            row = conn.execute(
+                "SELECT resposta, criado_em FROM cache_lanches WHERE chave = ?",
+                (chave,),
+            ).fetchone()
+        if row is None:
+            return None
+
+        escrita = obter_escrita(self.caminho)
+        if row[1] + self.ttl < agora:
+            # só apaga se continuar vencida (pode ter sido regravada)
+            escrita.enfileirar(
+                "DELETE FROM cache_lanches WHERE chave = ? AND criado_em < ?",
+                (chave, agora - self.ttl),
+                chave=chave,
+            )
+            return None
+        escrita.enfileirar(
+            "UPDATE cache_lanches SET acessado_em = ? WHERE chave = ?",
+            (int(agora), chave),
+            chave=chave,
+        )
+        return row
+
+    def _guardar_disco(self, chave, descricao, resposta, agora):
+        escrita = obter_escrita(self.caminho)
+        escrita.enfileirar(
+            """
+            INSERT OR REPLACE INTO cache_lanches
+            (chave, descricao, resposta, criado_em, acessado_em)
+            VALUES (?, ?, ?, ?, ?)
+            """,
+            (chave, descricao, resposta, int(agora), int(agora)),
+            chave=chave,
+        )
+        self._insercoes += 1
+        # despejo LRU em lote, não a cada inserção
+        if self._insercoes % 100 == 0:
+            escrita.enfileirar(
+                """
+                DELETE FROM cache_lanches WHERE chave IN (
+                    SELECT chave FROM cache_lanches
+                    ORDER BY acessado_em DESC
+                    LIMIT -1 OFFSET ?
+                )
+                """,
+                (self.capacidade,),
+                chave="despejo",
+            )
+
+    # ---------- API ----------
+    def obter(self, descricao):
+        chave = normalizar_lanche(descricao)
+        agora = time.time()
+
+        with self._lock:
+            resposta = self._buscar_memoria(chave, agora)
+        if resposta is not None:
+            return resposta
+
+        row = self._buscar_disco(chave, agora)
+        if row is None:
+            return None
+
+        with self._lock:
+            self._guardar_memoria(chave, row[0], row[1])
+        return row[0]
+
+    def guardar(self, descricao, resposta):
+        chave = normalizar_lanche(descricao)
+        agora = time.time()
+        with self._lock:
+            self._guardar_memoria(chave, resposta, agora)
+        self._guardar_disco(chave, descricao, resposta, agora)
+
+    def obter_ou_calcular(self, descricao, calcular):
+        """
+        Retorna a resposta em cache ou chama `calcular()` uma única vez,
+        mesmo com vários pedidos iguais ao mesmo tempo. Respostas None
+        não são guardadas.
+        """
+        resposta = self.obter(descricao)
+        chave = normalizar_lanche(descricao)
+        with self._lock:
+            if resposta is None:
+                # o dono anterior pode ter guardado e saído de _em_voo
+                # enquanto `obter` lia o disco
+                resposta = self._buscar_memoria(chave, time.time())
+            if resposta is not None:
+                self.acertos += 1
+                return resposta
+            futuro = self._em_voo.get(chave)
+            dono = futuro is None
+            if dono:
+                futuro = self._em_voo[chave] = Future()
+                self.falhas += 1
+            else:
+                self.coalescidos += 1
+
+        if not dono:
+            return futuro.result()
+
+        try:
+            resposta = calcular()
+            if resposta is not None:
+                self.guardar(descricao, resposta)
+            futuro.set_result(resposta)
+            return resposta
+        except BaseException as e:
+            futuro.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._em_voo.pop(chave, None)
+
+    def estatisticas(self):
+        with self._lock:
+            total = self.acertos + self.falhas
+            return {
+                "itens_memoria": len(self._memoria),
+                "acertos": self.acertos,
+                "falhas": self.falhas,
+                "coalescidos": self.coalescidos,
+                "taxa_acerto": self.acertos / total if total else 0.0,
+            }
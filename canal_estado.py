@@ -0,0 +1,49 @@
+import threading
+import time
+
+# =====================================================
+# CANAL THREAD DO VÍDEO -> SCRIPT DO STREAMLIT
+# =====================================================
+# O `recv` do streamlit-webrtc roda em uma thread própria, fora do
+# contexto da sessão: escrever em st.session_state ali não é seguro e
+# muitas vezes nem chega ao script. O canal é criado pelo script (um
+# por sessão), entregue ao processador e lido a cada rerun/fragmento.
+# Só a leitura mais recente interessa ao script; o histórico de uma
+# pergunta é acumulado na própria thread (agregador_emocoes).
+
+
+class CanalEstado:
+    """Última amostra (t, valor) publicada, protegida por lock"""
+
+    def __init__(self):
+        self._ultimo = None
+        self._lock = threading.Lock()
+
+    def publicar(self, valor, t=None):
+        """Chamado pela thread do vídeo"""
+        t = time.time() if t is None else t
+        with self._lock:
+            self._ultimo = (t, valor)
+
+    def ultimo(self):
+        """(t, valor) mais recente ou None"""
+        with self._lock:
+            return self._ultimo
+
+    def valor(self, padrao=None, max_idade_s=None):
+        """Valor mais recente; `padrao` se vazio ou mais velho que o limite"""
+        ultimo = self.ultimo()
+        if ultimo is None:
+            return padrao
+        t, valor = ultimo
+        if max_idade_s is not None and time.time() - t > max_idade_s:
+            return padrao
+        return valor
+
+
+def canal_da_sessao(session_state, chave):
+    """Canal guardado na sessão (criado no primeiro acesso)"""
+    canal = session_state.get(chave)
+    if canal is None:
+        canal = session_state[chave] = CanalEstado()
+    return canal
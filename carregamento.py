@@ -0,0 +1,94 @@
+import importlib
+import importlib.util
+import threading
+import time
+
+# =====================================================
+# IMPORTAÇÃO PREGUIÇOSA DE DEPENDÊNCIAS PESADAS
+# =====================================================
+# cv2, mediapipe, av, openai, pandas e pyarrow levam segundos para importar em
+# servidores modestos. Os módulos do app usam os objetos abaixo como se
+# fossem os próprios módulos; a importação real só acontece no primeiro
+# acesso a um atributo e vale para o processo inteiro.
+
+_lock = threading.RLock()
+_tempos = {}
+
+
+class Preguicoso:
+    """Representa um módulo (ou objeto) carregado no primeiro uso"""
+
+    def __init__(self, nome, carregar=None):
+        self._nome = nome
+        self._carregar = carregar or (lambda: importlib.import_module(nome))
+        self._alvo = None
+
+    def _obter(self):
+        alvo = self._alvo
+        if alvo is None:
+            with _lock:
+                if self._alvo is None:
+                    inicio = time.perf_counter()
+                    self._alvo = self._carregar()
+                    _tempos[self._nome] = time.perf_counter() - inicio
+                alvo = self._alvo
+        return alvo
+
+    @property
+    def carregado(self):
+        return self._alvo is not None
+
+    def __getattr__(self, atributo):
+        return getattr(self._obter(), atributo)
+
+    def __repr__(self):
+        estado = "carregado" if self.carregado else "pendente"
+        return f"<preguiçoso {self._nome} ({estado})>"
+
+
+def disponivel(nome):
+    """Se o pacote está instalado, sem importá-lo"""
+    try:
+        return importlib.util.find_spec(nome) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+def tempos_carregamento():
+    """Segundos gastos em cada carga, na ordem em que aconteceram"""
+    with _lock:
+        return dict(_tempos)
+
+
+def pre_carregar(*modulos):
+    """
+    Carrega os módulos em uma thread de fundo, para que a primeira
+    página que precisar deles não pague o custo da importação.
+    """
+
+    pendentes = [m for m in modulos if not m.carregado]
+    if not pendentes:
+        return
+
+    def _carregar():
+        for modulo in pendentes:
+            try:
+                modulo._obter()
+            except Exception:
+                # indisponível: a página que usar mostra o erro
+                pass
+
+    threading.Thread(
+        target=_carregar, name="pre_carregar", daemon=True
+    ).start()
+
+
+cv2 = Preguicoso("cv2")
+mp = Preguicoso("mediapipe")
+av = Preguicoso("av")
+openai = Preguicoso("openai")
+pd = Preguicoso("pandas")
+pa = Preguicoso("pyarrow")
+pc = Preguicoso("pyarrow.compute")
+ds = Preguicoso("pyarrow.dataset")
+pq = Preguicoso("pyarrow.parquet")
@@ -0,0 +1,275 @@
+import unicodedata
+from collections import deque
+
+# =====================================================
+# LÉXICO DE ALIMENTOS -> CATEGORIA NUTRICIONAL
+# =====================================================
+# Termos sem acento e em minúsculas. Termos compostos vencem os simples
+# ("bolacha recheada" > "bolacha", "sem acucar" > "acucar").
+LEXICO = {
+    "fruta": [
+        "fruta", "frutas", "salada de frutas", "maca", "banana", "laranja",
+        "tangerina", "mexerica", "uva", "uvas", "mamao", "manga", "pera",
+        "morango", "morangos", "abacaxi", "melancia", "melao", "kiwi",
+        "goiaba", "abacate", "ameixa", "caqui", "acerola",
+    ],
+    "vegetal": [
+        "cenoura", "tomate", "alface", "pepino", "brocolis", "legumes",
+        "verduras", "salada", "beterraba", "abobrinha", "espinafre",
+    ],
+    "integral": [
+        "pao integral", "aveia", "granola", "arroz integral",
+        "biscoito integral", "torrada integral", "milho", "pipoca caseira",
+    ],
+    "proteina": [
+        "ovo", "ovos", "ovo cozido", "frango", "atum", "sardinha", "feijao",
+        "grao de bico", "lentilha", "carne",
+    ],
+    "laticinio": [
+        "leite", "iogurte natural", "queijo branco", "queijo", "coalhada",
+        "ricota",
+    ],
+    "hidratacao": [
+        "agua", "agua de coco", "cha", "cha sem acucar", "suco natural",
+        "suco de laranja", "suco de fruta",
+    ],
+    "oleaginosa": [
+        "castanha", "castanhas", "castanha do para", "amendoim", "nozes",
+        "amendoas", "pasta de amendoim",
+    ],
+    "neutro": [
+        "pao", "pao frances", "pao de forma", "tapioca", "cuscuz",
+        "cafe", "cafe com leite", "vitamina", "sem acucar", "torrada",
+        "bolacha de agua e sal", "biscoito de agua e sal", "iogurte",
+        "pao de queijo", "requeijao", "geleia", "mel",
+    ],
+    "gordura": [
+        "manteiga", "margarina", "maionese",
+    ],
+    "doce": [
+        "chocolate", "bala", "balas", "pirulito", "doce", "doces", "bolo",
+        "brigadeiro", "sorvete", "acucar", "achocolatado", "pudim",
+        "bolo de chocolate", "rosquinha", "donut", "sonho", "chiclete",
+        "pacoca", "leite condensado", "nutella", "creme de avela",
+    ],
+    "ultraprocessado": [
+        "bolacha recheada", "biscoito recheado", "bolacha", "biscoito",
+        "salgadinho", "chips", "miojo", "macarrao instantaneo", "nuggets",
+        "suco de caixinha", "suco em po", "refresco", "cereal acucarado",
+        "barra de cereal",
+    ],
+    "bebida_acucarada": [
+        "refrigerante", "refri", "coca", "coca cola", "guarana", "fanta",
+        "energetico", "refrigerante zero",
+    ],
+    "fritura": [
+        "batata frita", "pastel", "coxinha", "salgado", "salgados", "frito",
+        "fritura", "empada", "risole", "kibe", "quibe", "esfiha",
+    ],
+    "fast_food": [
+        "hamburguer", "pizza", "cachorro quente", "x burguer", "x salada",
+        "lanche de fast food",
+    ],
+    "embutido": [
+        "salsicha", "presunto", "mortadela", "salame", "bacon",
+        "peito de peru", "linguica",
+    ],
+}
+
+# Peso de cada categoria no escore do lanche
+PONTUACAO = {
+    "fruta": 2.0,
+    "vegetal": 2.0,
+    "integral": 1.5,
+    "oleaginosa": 1.5,
+    "proteina": 1.0,
+    "laticinio": 1.0,
+    "hidratacao": 1.0,
+    "neutro": 0.0,
+    "gordura": -0.5,
+    "embutido": -1.5,
+    "doce": -2.0,
+    "ultraprocessado": -2.0,
+    "fritura": -2.0,
+    "fast_food": -2.0,
+    "bebida_acucarada": -3.0,
+}
+
+PALAVRAS_VAZIAS = {
+    "com", "de", "do", "da", "e", "um", "uma", "uns", "umas", "o", "a",
+    "os", "as", "no", "na", "em", "pouco", "pouca", "muito", "muita",
+    "meu", "minha", "lanche", "comi", "tomei", "bebi", "copo", "fatia",
+    "pedaco", "prato", "porcao", "pacote", "lata", "garrafa", "so",
+}
+
+EXPLICACOES = {
+    "Saudável": (
+        "Esse lanche tem alimentos que dão energia e nutrientes "
+        "para o corpo e para a cabeça funcionarem bem!"
+    ),
+    "Moderado": (
+        "Esse lanche tem pontos bons, mas dá para deixá-lo ainda mais "
+        "nutritivo com pequenas trocas."
+    ),
+    "Não recomendado": (
+        "Esse lanche tem muito açúcar, gordura ou sal e pouca nutrição. "
+        "Ele dá energia rápida, mas que acaba logo."
+    ),
+}
+
+SUGESTOES = {
+    "bebida_acucarada": "Troque o refrigerante por água ou suco natural.",
+    "doce": "Que tal trocar o doce por uma fruta, como banana ou maçã?",
+    "ultraprocessado": (
+        "Troque o biscoito ou salgadinho por pipoca caseira ou frutas."
+    ),
+    "fritura": "Prefira um sanduíche natural no lugar do salgado frito.",
+    "fast_food": "Experimente um sanduíche caseiro com salada e frango.",
+    "embutido": "Use ovo, frango ou queijo branco no lugar dos embutidos.",
+    "gordura": "Use pouca manteiga ou troque por requeijão light.",
+    "neutro": "Acrescente uma fruta para deixar o lanche mais completo.",
+    "": "Continue assim! Beba água e varie as frutas ao longo da semana.",
+}
+
+
+def normalizar(texto):
+    texto = unicodedata.normalize("NFKD", texto.lower())
+    return "".join(c for c in texto if not unicodedata.combining(c))
+
+
+# =====================================================
+# AUTÔMATO AHO-CORASICK
+# =====================================================
+class AhoCorasick:
+    """Casa todos os termos do léxico em uma única passada pelo texto"""
+
+    def __init__(self, termos):
+        self._goto = [{}]
+        self._falha = [0]
+        self._saida = [[]]
+
+        for termo, valor in termos.items():
+            no = 0
+            for ch in termo:
+                proximo = self._goto[no].get(ch)
+                if proximo is None:
+                    proximo = len(self._goto)
+                    self._goto[no][ch] = proximo
+                    self._goto.append({})
+                    self._falha.append(0)
+                    self._saida.append([])
+                no = proximo
+            self._saida[no].append((len(termo), valor))
+
+        # ligações de falha em largura
+        fila = deque(self._goto[0].values())
+        while fila:
+            no = fila.popleft()
+            for ch, filho in self._goto[no].items():
+                fila.append(filho)
+                f = self._falha[no]
+                while f and ch not in self._goto[f]:
+                    f = self._falha[f]
+                destino = self._goto[f].get(ch, 0)
+                self._falha[filho] = destino if destino != filho else 0
+                self._saida[filho] = (
+                    self._saida[filho] + self._saida[self._falha[filho]]
+                )
+
+    def buscar(self, texto):
+        """Gera (inicio, fim, valor) de cada ocorrência"""
+        no = 0
+        for i, ch in enumerate(texto):
+            while no and ch not in self._goto[no]:
+                no = self._falha[no]
+            no = self._goto[no].get(ch, 0)
+            for tamanho, valor in self._saida[no]:
+                yield i - tamanho + 1, i + 1, valor
+
+
+_TERMOS = {
+    normalizar(termo): (termo, categoria)
+    for categoria, termos in LEXICO.items()
+    for termo in termos
+}
+_automato = AhoCorasick(_TERMOS)
+
+
+def encontrar_alimentos(texto):
+    """Termos do léxico no texto: os mais longos, sem sobreposição"""
+    # pontuação vira espaço ("x-salada" -> "x salada"), mantendo posições
+    texto = "".join(c if c.isalnum() else " " for c in normalizar(texto))
+    ocorrencias = []
+    for inicio, fim, valor in _automato.buscar(texto):
+        antes = texto[inicio - 1] if inicio > 0 else " "
+        depois = texto[fim] if fim < len(texto) else " "
+        if antes.isalnum() or depois.isalnum():
+            continue  # pedaço de outra palavra ("uva" em "luva")
+        ocorrencias.append((inicio, fim, valor))
+
+    ocorrencias.sort(key=lambda o: (o[0], o[0] - o[1]))
+    escolhidas, fim_atual = [], -1
+    for inicio, fim, valor in ocorrencias:
+        if inicio >= fim_atual:
+            escolhidas.append((inicio, fim, valor))
+            fim_atual = fim
+        elif fim > fim_atual and fim - inicio > escolhidas[-1][1] - escolhidas[-1][0]:
+            escolhidas[-1] = (inicio, fim, valor)
+            fim_atual = fim
+
+    return texto, escolhidas
+
+
+# =====================================================
+# CLASSIFICAÇÃO
+# =====================================================
+def classificar_lanche(descricao):
+    """
+    Classifica o lanche pelo léxico, sem rede.
+    Retorna None se nenhum alimento foi reconhecido; senão um dict com
+    classificacao, explicacao, sugestao, confianca (0-1) e categorias.
+    """
+    texto, achados = encontrar_alimentos(descricao)
+    if not achados:
+        return None
+
+    categorias = [valor[1] for _, _, valor in achados]
+    escore = sum(PONTUACAO[c] for c in categorias)
+
+    # cobertura: fração das palavras relevantes que foram reconhecidas
+    cobertas = set()
+    for inicio, fim, _ in achados:
+        cobertas.update(texto[inicio:fim].split())
+    palavras = [
+        p for p in texto.split()
+        if p not in PALAVRAS_VAZIAS and not p.isdigit()
+    ]
+    cobertura = (
+        sum(p in cobertas for p in palavras) / len(palavras) if palavras else 1.0
+    )
+
+    positivos = any(PONTUACAO[c] > 0 for c in categorias)
+    negativos = any(PONTUACAO[c] < 0 for c in categorias)
+    # lanche misto (fruta + refrigerante) é o caso em que a IA ajuda mais
+    clareza = 0.6 if positivos and negativos else 1.0
+
+    if escore >= 1.5:
+        classificacao = "Saudável"
+    elif escore <= -2.0:
+        classificacao = "Não recomendado"
+    else:
+        classificacao = "Moderado"
+
+    pior = min(categorias, key=lambda c: PONTUACAO[c])
+    if PONTUACAO[pior] <= 0:
+        chave_sugestao = pior
+    else:
+        chave_sugestao = "" if classificacao == "Saudável" else "neutro"
+
+    return {
+        "classificacao": classificacao,
+        "explicacao": EXPLICACOES[classificacao],
+        "sugestao": SUGESTOES.get(chave_sugestao, SUGESTOES[""]),
+        "confianca": round(cobertura * clareza, 3),
+        "categorias": categorias,
+    }
@@ -0,0 +1,344 @@
+from contextlib import contextmanager
+from datetime import datetime
+
+import arquivo_parquet
+from cache_dados import em_cache
+from carregamento import pa, pc, pd
+from database import conectar
+
+# =====================================================
+# CONSULTAS DO PAINEL COGNITIVO
+# =====================================================
+# Filtros e agregações rodam no SQLite (usando os índices de
+# aluno_id/data_avaliacao/disciplina); o Python só recebe o resultado.
+# Os resultados ficam no cache compartilhado (cache_dados) até expirar
+# o TTL ou o banco mudar.
+#
+# Linhas antigas vivem em Parquet (arquivo_parquet.py): cada consulta
+# soma as parciais do banco às do arquivo. Sem nada arquivado no
+# período, o manifesto não devolve arquivos e só o SQLite é lido.
+
+TTL_CONSULTAS = 60.0
+TABELA = "desempenho_cognitivo"
+
+COLUNAS_DETALHE = [
+    "id",
+    "nome",
+    "idade",
+    "disciplina",
+    "nota",
+    "estado_emocional",
+    "data_avaliacao",
+]
+
+
+_FUSO_LOCAL = datetime.now().astimezone().tzinfo
+
+
+def epoch_para_local(serie):
+    """Converte epochs (UTC) em datas no horário local"""
+    return (
+        pd.to_datetime(serie, unit="s", utc=True)
+        .dt.tz_convert(_FUSO_LOCAL)
+        .dt.tz_localize(None)
+    )
+
+
+def _where(aluno_id=None, disciplina=None, inicio=None, fim=None):
+    """Monta a cláusula WHERE a partir dos filtros (datas em epoch)"""
+    condicoes, params = [], []
+
+    if aluno_id is not None:
+        condicoes.append("aluno_id = ?")
+        params.append(aluno_id)
+    if disciplina is not None:
+        condicoes.append("disciplina = ?")
+        params.append(disciplina)
+    if inicio is not None:
+        condicoes.append("data_avaliacao >= ?")
+        params.append(inicio)
+    if fim is not None:
+        condicoes.append("data_avaliacao < ?")
+        params.append(fim)
+
+    sql = " WHERE " + " AND ".join(condicoes) if condicoes else ""
+    return sql, params
+
+
+@contextmanager
+def _leitura():
+    """
+    Conexão em uma transação de leitura: banco e manifesto do arquivo
+    vêm do mesmo instantâneo, e uma compactação concorrente não faz
+    nenhuma linha aparecer duas vezes (ou nenhuma).
+    """
+    with conectar() as conn:
+        conn.execute("BEGIN")
+        try:
+            yield conn
+        finally:
+            conn.rollback()
+
+
+def _frio(conn, colunas, **filtros):
+    return arquivo_parquet.ler(conn, TABELA, colunas, **filtros)
+
+
+def _linhas(tabela_arrow, colunas):
+    """pyarrow.Table -> lista de tuplas, como o fetchall do sqlite3"""
+    return list(zip(*(tabela_arrow[c].to_pylist() for c in colunas)))
+
+
+def _chave_nula_primeiro(valor):
+    # mesma ordem do ORDER BY do SQLite: NULL antes de tudo
+    return (valor is not None, valor if valor is not None else "")
+
+
+@em_cache("consultas.listar_alunos", TTL_CONSULTAS)
+def listar_alunos():
+    """Lista (aluno_id, nome) de quem tem avaliações (sem aluno_id nulo)"""
+    with _leitura() as conn:
+        rows = conn.execute(
+            """
+            SELECT aluno_id, MAX(nome)
+            FROM desempenho_cognitivo
+            WHERE aluno_id IS NOT NULL
+            GROUP BY aluno_id
+            ORDER BY MAX(nome)
+            """
+        ).fetchall()
+        frio = _frio(conn, ["aluno_id", "nome"])
+
+    if frio is None:
+        return rows
+
+    nomes = dict(rows)
+    agrupado = frio.group_by("aluno_id").aggregate([("nome", "max")])
+    for aluno_id, nome in _linhas(agrupado, ["aluno_id", "nome_max"]):
+        if aluno_id is None:
+            continue
+        atual = nomes.get(aluno_id)
+        nomes[aluno_id] = nome if atual is None else max(atual, nome or "")
+    return sorted(
+        nomes.items(), key=lambda item: _chave_nula_primeiro(item[1])
+    )
+
+
+@em_cache("consultas.listar_usuarios", TTL_CONSULTAS)
+def listar_usuarios():
+    """Lista (id, nome) de todos os alunos cadastrados"""
+    with conectar() as conn:
+        return conn.execute(
+            "SELECT id, COALESCE(nome, 'Aluno ' || id) FROM usuarios "
+            "ORDER BY nome, id"
+        ).fetchall()
+
+
+@em_cache("consultas.listar_disciplinas", TTL_CONSULTAS)
+def listar_disciplinas():
+    with _leitura() as conn:
+        rows = conn.execute(
+            """
+            SELECT DISTINCT disciplina
+            FROM desempenho_cognitivo
+            WHERE disciplina IS NOT NULL
+            ORDER BY disciplina
+            """
+        ).fetchall()
+        frio = _frio(conn, ["disciplina"])
+
+    disciplinas = [r[0] for r in rows]
+    if frio is None:
+        return disciplinas
+    arquivadas = pc.unique(frio["disciplina"]).to_pylist()
+    return sorted({*disciplinas, *arquivadas} - {None})
+
+
+@em_cache("consultas.resumo", TTL_CONSULTAS)
+def resumo(**filtros):
+    """Total de alunos, média geral, avaliações 'Focado' e total"""
+    where, params = _where(**filtros)
+    with _leitura() as conn:
+        total_alunos, soma, notas, focados, total = conn.execute(
+            f"""
+            SELECT
+                COUNT(DISTINCT nome),
+                SUM(nota),
+                COUNT(nota),
+                COALESCE(SUM(estado_emocional = 'Focado'), 0),
+                COUNT(*)
+            FROM desempenho_cognitivo
+            {where}
+            """,
+            params,
+        ).fetchone()
+
+        frio = _frio(conn, ["nome", "nota", "estado_emocional"], **filtros)
+        if frio is not None and frio.num_rows:
+            # alunos distintos não se somam: junta os conjuntos de nomes
+            nomes = {
+                r[0]
+                for r in conn.execute(
+                    f"SELECT DISTINCT nome FROM desempenho_cognitivo {where}",
+                    params,
+                )
+            }
+            nomes.update(pc.unique(frio["nome"]).to_pylist())
+            nomes.discard(None)
+            total_alunos = len(nomes)
+            soma = (soma or 0) + (pc.sum(frio["nota"]).as_py() or 0)
+            notas += pc.count(frio["nota"]).as_py()
+            focados += pc.sum(
+                pc.equal(frio["estado_emocional"], "Focado")
+            ).as_py() or 0
+            total += frio.num_rows
+
+    return {
+        "total_alunos": total_alunos,
+        "media_geral": soma / notas if notas else None,
+        "focados": focados,
+        "total_avaliacoes": total,
+    }
+
+
+@em_cache("consultas.media_por_disciplina", TTL_CONSULTAS)
+def media_por_disciplina(**filtros):
+    where, params = _where(**filtros)
+    with _leitura() as conn:
+        rows = conn.execute(
+            f"""
+            SELECT disciplina, SUM(nota), COUNT(nota)
+            FROM desempenho_cognitivo
+            {where}
+            GROUP BY disciplina
+            ORDER BY disciplina
+            """,
+            params,
+        ).fetchall()
+        frio = _frio(conn, ["disciplina", "nota"], **filtros)
+
+    if frio is not None and frio.num_rows:
+        somas = {d: [soma or 0, n] for d, soma, n in rows}
+        agrupado = frio.group_by("disciplina").aggregate(
+            [("nota", "sum"), ("nota", "count")]
+        )
+        for disciplina, soma, n in _linhas(
+            agrupado, ["disciplina", "nota_sum", "nota_count"]
+        ):
+            parcial = somas.setdefault(disciplina, [0, 0])
+            parcial[0] += soma or 0
+            parcial[1] += n
+        rows = sorted(
+            ((d, soma, n) for d, (soma, n) in somas.items()),
+            key=lambda r: _chave_nula_primeiro(r[0]),
+        )
+
+    return pd.Series(
+        [soma / n if n else None for _, soma, n in rows],
+        index=pd.Index([r[0] for r in rows], name="disciplina"),
+        name="nota",
+        dtype="float64",
+    )
+
+
+@em_cache("consultas.contagem_emocoes", TTL_CONSULTAS)
+def contagem_emocoes(**filtros):
+    where, params = _where(**filtros)
+    with _leitura() as conn:
+        rows = conn.execute(
+            f"""
+            SELECT estado_emocional, COUNT(*)
+            FROM desempenho_cognitivo
+            {where}
+            GROUP BY estado_emocional
+            ORDER BY COUNT(*) DESC
+            """,
+            params,
+        ).fetchall()
+        frio = _frio(conn, ["estado_emocional"], **filtros)
+
+    contagem = dict(rows)
+    if frio is not None and frio.num_rows:
+        for item in pc.value_counts(frio["estado_emocional"]).to_pylist():
+            estado = item["values"]
+            contagem[estado] = contagem.get(estado, 0) + item["counts"]
+        contagem = dict(
+            sorted(contagem.items(), key=lambda item: -item[1])
+        )
+    return contagem
+
+
+@em_cache("consultas.pagina_detalhes", TTL_CONSULTAS)
+def pagina_detalhes(limite=50, apos=None, **filtros):
+    """
+    Página do detalhamento, da avaliação mais recente para a mais antiga.
+
+    Paginação por chave (keyset): `apos` é o cursor (data_avaliacao, id)
+    da última linha da página anterior. Retorna (DataFrame, cursor da
+    próxima página ou None).
+    """
+    where, params = _where(**filtros)
+
+    if apos is not None:
+        data, id_ = apos
+        where += " AND " if where else " WHERE "
+        where += "(data_avaliacao < ? OR (data_avaliacao = ? AND id < ?))"
+        params += [data, data, id_]
+
+    with _leitura() as conn:
+        rows = conn.execute(
+            f"""
+            SELECT {", ".join(COLUNAS_DETALHE)}
+            FROM desempenho_cognitivo
+            {where}
+            ORDER BY data_avaliacao DESC, id DESC
+            LIMIT ?
+            """,
+            params + [limite + 1],
+        ).fetchall()
+        frio = arquivo_parquet.mais_recentes(
+            conn, TABELA, limite + 1, COLUNAS_DETALHE, antes=apos, **filtros
+        )
+
+    if frio is not None and frio.num_rows:
+        rows = sorted(
+            rows + _linhas(frio, COLUNAS_DETALHE),
+            key=lambda r: (r[6], r[0]),
+            reverse=True,
+        )[: limite + 1]
+
+    proximo = None
+    if len(rows) > limite:
+        rows = rows[:limite]
+        ultimo = rows[-1]
+        proximo = (ultimo[6], ultimo[0])
+
+    df = pd.DataFrame(rows, columns=COLUNAS_DETALHE)
+    df["data_avaliacao"] = epoch_para_local(df["data_avaliacao"])
+    return df, proximo
+
+
+def historico(**filtros):
+    """
+    Todas as avaliações (banco + arquivo) que passam nos filtros, como
+    pyarrow.Table em ordem cronológica; usado na exportação.
+    """
+    where, params = _where(**filtros)
+    with _leitura() as conn:
+        esquema = arquivo_parquet.esquema(conn, TABELA)
+        rows = conn.execute(
+            f"""
+            SELECT {", ".join(esquema.names)}
+            FROM desempenho_cognitivo
+            {where}
+            """,
+            params,
+        ).fetchall()
+        frio = _frio(conn, esquema.names, **filtros)
+
+    partes = [arquivo_parquet.tabela_arrow(esquema, rows)]
+    if frio is not None:
+        partes.insert(0, frio)
+    return pa.concat_tables(partes).sort_by(
+        [("data_avaliacao", "ascending"), ("id", "ascending")]
+    )
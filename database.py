@@ -1,39 +1,161 @@
+import os
+import queue
 import sqlite3
+import threading
+from contextlib import contextmanager
 
+from migracoes import aplicar_migracoes
 
-DB = 'nutriedu.db'
 
+DB = os.getenv('NUTRIEDU_DB', 'nutriedu.db')
 
-def conectar():
-    return sqlite3.connect(DB, check_same_thread=False)
+TAMANHO_POOL = 8
 
+# Aplicados em toda conexão nova do pool
+PRAGMAS = (
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA cache_size=-16000',
+    'PRAGMA mmap_size=134217728',
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA busy_timeout=5000',
+    'PRAGMA foreign_keys=ON',
+)
 
-def criar_tabelas():
-    conn = conectar()
-    c = conn.cursor()
 
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS usuarios (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            nome TEXT,
-            idade INTEGER,
-            turma TEXT
-        )
-    ''')
-
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS historico_avaliacoes (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            usuario_id INTEGER,
-            avaliacao TEXT,
-            resposta_ia TEXT,
-            emocao_detectada TEXT,
-            data TEXT
+# =====================================================
+# POOL DE CONEXÕES
+# =====================================================
+class PoolConexoes:
+    """
+    Pool thread-safe de conexões SQLite já configuradas.
+    Cada conexão mantém seu cache de statements compilados
+    (`cached_statements`), então SQL repetido não é recompilado.
+    """
+
+    def __init__(self, caminho, tamanho=TAMANHO_POOL, timeout=10.0):
+        self.caminho = caminho
+        self.tamanho = tamanho
+        self.timeout = timeout
+        self._livres = queue.LifoQueue()
+        self._criadas = 0
+        self._lock = threading.Lock()
+
+    def _nova(self):
+        conn = sqlite3.connect(
+            self.caminho,
+            check_same_thread=False,
+            timeout=5.0,
+            cached_statements=256,
         )
-    ''')
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def adquirir(self):
+        try:
+            return self._livres.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            criar = self._criadas < self.tamanho
+            if criar:
+                self._criadas += 1
+
+        if criar:
+            try:
+                return self._nova()
+            except Exception:
+                with self._lock:
+                    self._criadas -= 1
+                raise
+
+        try:
+            return self._livres.get(timeout=self.timeout)
+        except queue.Empty:
+            raise sqlite3.OperationalError(
+                'Nenhuma conexão livre no pool'
+            ) from None
+
+    def devolver(self, conn):
+        if conn.in_transaction:
+            conn.rollback()
+        self._livres.put(conn)
+
+    def fechar(self):
+        while True:
+            try:
+                conn = self._livres.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._criadas -= 1
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def obter_pool(caminho=None):
+    caminho = caminho or DB
+    with _pools_lock:
+        pool = _pools.get(caminho)
+        if pool is None:
+            pool = _pools[caminho] = PoolConexoes(caminho)
+    return pool
+
+
+@contextmanager
+def conectar(caminho=None):
+    """Empresta uma conexão do pool; ela volta ao pool ao sair do bloco"""
+    pool = obter_pool(caminho)
+    conn = pool.adquirir()
+    try:
+        yield conn
+    finally:
+        pool.devolver(conn)
+
+
+@contextmanager
+def transacao(caminho=None):
+    """Conexão do pool dentro de uma transação (commit ou rollback)"""
+    with conectar(caminho) as conn:
+        with conn:
+            yield conn
+
+
+# =====================================================
+# ESQUEMA
+# =====================================================
+def criar_tabelas(caminho=None):
+    """Aplica as migrações pendentes (ver migracoes.py)"""
+    with conectar(caminho) as conn:
+        return aplicar_migracoes(conn)
+
+
+def garantir_usuario(conn, usuario_id, nome=None, idade=None):
+    """Cria o usuário se ainda não existir (chave estrangeira)"""
+    conn.execute(
+        'INSERT OR IGNORE INTO usuarios (id, nome, idade) VALUES (?, ?, ?)',
+        (usuario_id, nome or f'Aluno {usuario_id}', idade),
+    )
+
+
+_inicializados = set()
+_init_lock = threading.Lock()
+
 
-    conn.commit()
-    conn.close()
+def inicializar(caminho=None):
+    """Cria as tabelas uma única vez por processo (barato nos reruns)"""
+    caminho = caminho or DB
+    if caminho in _inicializados:
+        return
+    with _init_lock:
+        if caminho not in _inicializados:
+            criar_tabelas(caminho)
+            _inicializados.add(caminho)
 
 
 if __name__ == '__main__':
@@ -1,54 +1,55 @@
-import cv2
-import mediapipe as mp
 import time
 
-mp_face_mesh = mp.solutions.face_mesh # type: ignore
-mp_drawing = mp.solutions.drawing_utils # type: ignore
+from carregamento import cv2
+from motor_facial import SessaoFacial, desenhar_landmarks, mp_face_mesh
 
 
-def executar_emocoes(tempo_max=10):
-    cap = cv2.VideoCapture(0)
+def executar_emocoes(tempo_max=10, fonte=0):
+    """
+    Mostra a análise facial em uma janela por até `tempo_max` segundos.
+    `fonte` é o índice da câmera ou o caminho de um vídeo gravado
+    (para reprocessar sem janela, use replay.py).
+    """
+    cap = cv2.VideoCapture(fonte)
     inicio = time.time()
     rosto_detectado = False
 
-    with mp_face_mesh.FaceMesh(
-        max_num_faces=1,
-        refine_landmarks=True,
+    sessao = SessaoFacial(
         min_detection_confidence=0.5,
         min_tracking_confidence=0.5
-    ) as face_mesh:
+    )
 
-        try:
-            while True:
-                ok, frame = cap.read()
-                if not ok:
-                    break
+    try:
+        while True:
+            ok, frame = cap.read()
+            if not ok:
+                break
 
-                img_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                result = face_mesh.process(img_rgb)
+            img_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            faces = sessao.processar(img_rgb)
 
-                if result.multi_face_landmarks:
-                    rosto_detectado = True
-                    for face in result.multi_face_landmarks:
-                        mp_drawing.draw_landmarks(
-                            frame,
-                            face,
-                            mp_face_mesh.FACEMESH_TESSELATION
-                        )
+            if faces:
+                rosto_detectado = True
+                for pts in faces:
+                    desenhar_landmarks(
+                        frame,
+                        pts,
+                        mp_face_mesh.FACEMESH_TESSELATION
+                    )
 
-                cv2.imshow("IA de Foco e Expressões", frame)
+            cv2.imshow("IA de Foco e Expressões", frame)
 
-                if cv2.waitKey(1) & 0xFF == ord('q'):
-                    break
+            if cv2.waitKey(1) & 0xFF == ord('q'):
+                break
 
-                if time.time() - inicio > tempo_max:
-                    break
+            if time.time() - inicio > tempo_max:
+                break
 
-        finally:
-            cap.release()
-            cv2.destroyAllWindows()
+    finally:
+        cap.release()
+        cv2.destroyAllWindows()
 
-        if rosto_detectado:
-            return "Neutro"
+    if rosto_detectado:
+        return "Neutro"
 
-        return "Indefinido"
+    return "Indefinido"
@@ -0,0 +1,317 @@
+import atexit
+import itertools
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from database import DB, inicializar, transacao
+from instrumentacao import contar, cronometrar
+
+# =====================================================
+# ESCRITA EM LOTE (WRITE-BEHIND)
+# =====================================================
+# As páginas enfileiram as escritas e voltam na hora; uma thread junta
+# tudo o que chegou e grava com `executemany` em UMA transação, quando
+# o lote enche (`max_registros`) ou o mais antigo espera `max_espera_s`.
+# Com a turma inteira clicando em "Finalizar" ao mesmo tempo, são
+# poucas transações em vez de uma disputa pelo lock do SQLite por aluno.
+#
+# A ordem de enfileiramento é respeitada entre SQLs diferentes: o lote
+# vira sequências de registros consecutivos do mesmo SQL, cada uma com
+# seu `executemany`. Uma linha coalescida vai para a posição da última
+# versão (é o efeito final que vale).
+#
+# Cada enfileiramento devolve um Future resolvido depois do commit:
+# quem precisa confirmar ao usuário espera por ele (commit em grupo).
+# Se o lote falha por erro de dados (ex.: chave estrangeira), cada
+# chamador é regravado em um SAVEPOINT próprio e só o culpado recebe a
+# exceção; apenas banco ocupado (OperationalError) é tentado de novo.
+# Ao encerrar o processo (atexit) o que estiver pendente é gravado.
+
+MAX_REGISTROS = 500
+MAX_ESPERA_S = 0.2
+TENTATIVAS = 3
+
+SQL_USUARIOS = (
+    "INSERT OR IGNORE INTO usuarios (id, nome) VALUES (?, 'Aluno ' || ?)"
+)
+
+
+def _executar_em_ordem(conn, ordem):
+    """Um `executemany` por sequência consecutiva do mesmo SQL"""
+    for sql, grupo in itertools.groupby(ordem, key=lambda item: item[0]):
+        conn.executemany(sql, [p for _, p in grupo])
+
+
+class EscritaLote:
+    """
+    Buffer de escritas de um banco. Registros com a mesma `chave` (para
+    o mesmo SQL) são coalescidos: só o último vai para o banco, na
+    posição em que foi enfileirado.
+    """
+
+    def __init__(
+        self,
+        caminho=None,
+        max_registros=MAX_REGISTROS,
+        max_espera_s=MAX_ESPERA_S,
+        tentativas=TENTATIVAS,
+    ):
+        self.caminho = caminho
+        self.max_registros = max_registros
+        self.max_espera_s = max_espera_s
+        self.tentativas = tentativas
+
+        self._cond = threading.Condition()
+        self._sequencia = itertools.count()
+        self._zerar()
+        self._thread = None
+        self._fechado = False
+
+        self.transacoes = 0
+        self.registros = 0
+        self.coalescidos = 0
+
+    def _zerar(self):
+        # (sql, chave) -> (parâmetros, Futures donos), na ordem de
+        # chegada; o último dono é quem grava a linha
+        self._linhas = OrderedDict()
+        self._usuarios = {}
+        self._futuros = []
+        self._primeiro_em = None
+
+    # ---------- entrada ----------
+    def enfileirar(self, sql, parametros, chave=None, usuario_id=None):
+        """Uma linha; `usuario_id` garante o usuário (chave estrangeira)"""
+        return self.enfileirar_varios(
+            sql,
+            [parametros],
+            chaves=None if chave is None else [chave],
+            usuario_ids=() if usuario_id is None else (usuario_id,),
+        )
+
+    def enfileirar_varios(self, sql, linhas, chaves=None, usuario_ids=()):
+        """Várias linhas do mesmo SQL com um único Future"""
+        futuro = Future()
+        with self._cond:
+            if self._fechado:
+                raise RuntimeError("escrita em lote encerrada")
+            for i, parametros in enumerate(linhas):
+                if chaves is None:
+                    chave = (sql, "seq", next(self._sequencia))
+                else:
+                    chave = (sql, "chave", chaves[i])
+                donos = [futuro]
+                anterior = self._linhas.pop(chave, None)
+                if anterior is not None:
+                    self.coalescidos += 1
+                    # quem foi sobrescrito segue o resultado da nova linha
+                    donos = anterior[1] + donos
+                self._linhas[chave] = (tuple(parametros), donos)
+            self._usuarios[futuro] = tuple(usuario_ids)
+            self._futuros.append(futuro)
+            if self._primeiro_em is None:
+                self._primeiro_em = time.monotonic()
+            self._iniciar()
+            self._cond.notify()
+        return futuro
+
+    # ---------- thread de gravação ----------
+    def _iniciar(self):
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._executar, name="escrita_lote", daemon=True
+            )
+            self._thread.start()
+
+    def _pronto(self):
+        if not self._futuros:
+            return False
+        if self._fechado or len(self._linhas) >= self.max_registros:
+            return True
+        return time.monotonic() - self._primeiro_em >= self.max_espera_s
+
+    def _executar(self):
+        while True:
+            with self._cond:
+                while not self._pronto():
+                    if self._fechado:
+                        return
+                    espera = None
+                    if self._primeiro_em is not None:
+                        espera = max(
+                            self.max_espera_s
+                            - (time.monotonic() - self._primeiro_em),
+                            0.001,
+                        )
+                    self._cond.wait(espera)
+                linhas, usuarios, futuros = (
+                    self._linhas,
+                    self._usuarios,
+                    self._futuros,
+                )
+                self._zerar()
+                self._cond.notify_all()
+
+            self._gravar(linhas, usuarios, futuros)
+
+    def _com_tentativas(self, gravar):
+        """
+        Roda `gravar(conn)` em uma transação; só banco ocupado
+        (OperationalError) é tentado de novo.
+        """
+        for tentativa in range(self.tentativas):
+            try:
+                inicializar(self.caminho)
+                with transacao(self.caminho) as conn:
+                    return gravar(conn)
+            except sqlite3.OperationalError:
+                if tentativa == self.tentativas - 1:
+                    raise
+                contar("escrita_lote.novas_tentativas")
+                time.sleep(0.05 * 2**tentativa)
+
+    def _gravar(self, linhas, usuarios, futuros):
+        quantidade = len(linhas)
+        todos = sorted({u for ids in usuarios.values() for u in ids})
+        ordem = [(chave[0], p) for chave, (p, _) in linhas.items()]
+
+        def _tudo(conn):
+            if todos:
+                conn.executemany(SQL_USUARIOS, [(u, u) for u in todos])
+            _executar_em_ordem(conn, ordem)
+
+        try:
+            with cronometrar("escrita_lote.transacao"):
+                self._com_tentativas(_tudo)
+        except sqlite3.OperationalError as e:
+            # banco indisponível: ninguém foi gravado
+            contar("escrita_lote.falhas")
+            for futuro in futuros:
+                futuro.set_exception(e)
+            return
+        except Exception:
+            # erro de dados (chave estrangeira, restrição...): separa
+            # cada chamador para que só o culpado falhe
+            contar("escrita_lote.isolamentos")
+            self._gravar_isolado(linhas, usuarios, futuros)
+            return
+
+        self.transacoes += 1
+        self.registros += quantidade
+        contar("escrita_lote.registros", quantidade)
+        for futuro in futuros:
+            futuro.set_result(quantidade)
+
+    def _gravar_isolado(self, linhas, usuarios, futuros):
+        """Um SAVEPOINT por chamador, na mesma transação"""
+        # futuro -> [(sql, parâmetros)] das linhas em que é o último
+        # dono; como a linha coalescida vai para a posição do último
+        # dono, chamador a chamador ainda é a ordem de chegada
+        grupos = OrderedDict((f, []) for f in futuros)
+        for chave, (parametros, donos) in linhas.items():
+            grupos[donos[-1]].append((chave[0], parametros))
+
+        def _por_grupo(conn):
+            # BEGIN explícito: senão o primeiro SAVEPOINT abriria (e o
+            # RELEASE confirmaria) uma transação por chamador
+            conn.execute("BEGIN IMMEDIATE")
+            erros, gravados = {}, 0
+            for futuro, ordem in grupos.items():
+                conn.execute("SAVEPOINT chamador")
+                try:
+                    ids = usuarios.get(futuro, ())
+                    if ids:
+                        conn.executemany(
+                            SQL_USUARIOS, [(u, u) for u in sorted(ids)]
+                        )
+                    _executar_em_ordem(conn, ordem)
+                except sqlite3.OperationalError:
+                    raise
+                except Exception as e:
+                    conn.execute("ROLLBACK TO chamador")
+                    erros[futuro] = e
+                else:
+                    gravados += len(ordem)
+                conn.execute("RELEASE chamador")
+            return erros, gravados
+
+        try:
+            with cronometrar("escrita_lote.transacao"):
+                erros, gravados = self._com_tentativas(_por_grupo)
+        except Exception as e:
+            contar("escrita_lote.falhas")
+            for futuro in futuros:
+                futuro.set_exception(e)
+            return
+
+        # quem teve uma linha sobrescrita segue o destino dela
+        for _, donos in linhas.values():
+            erro = erros.get(donos[-1])
+            if erro is not None:
+                for dono in donos[:-1]:
+                    erros.setdefault(dono, erro)
+
+        self.transacoes += 1
+        self.registros += gravados
+        contar("escrita_lote.registros", gravados)
+        contar("escrita_lote.falhas", len(erros))
+        for futuro in futuros:
+            erro = erros.get(futuro)
+            if erro is None:
+                futuro.set_result(gravados)
+            else:
+                futuro.set_exception(erro)
+
+    # ---------- controle ----------
+    def descarregar(self, timeout=None):
+        """Força a gravação do que está pendente e espera o commit"""
+        with self._cond:
+            if not self._futuros:
+                return
+            futuro = self._futuros[-1]
+            # antecipa o prazo do lote atual
+            self._primeiro_em = -float("inf")
+            self._cond.notify()
+        futuro.result(timeout)
+
+    def fechar(self, timeout=10.0):
+        """Grava o pendente e encerra a thread (chamado no atexit)"""
+        with self._cond:
+            if self._fechado:
+                return
+            self._fechado = True
+            self._cond.notify()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    @property
+    def pendentes(self):
+        with self._cond:
+            return len(self._linhas)
+
+    def estatisticas(self):
+        return {
+            "pendentes": self.pendentes,
+            "transacoes": self.transacoes,
+            "registros": self.registros,
+            "coalescidos": self.coalescidos,
+        }
+
+
+_escritas = {}
+_escritas_lock = threading.Lock()
+
+
+def obter_escrita(caminho=None):
+    """Buffer de escrita do banco `caminho` (um por processo)"""
+    caminho = caminho or DB
+    with _escritas_lock:
+        escrita = _escritas.get(caminho)
+        if escrita is None:
+            escrita = _escritas[caminho] = EscritaLote(caminho)
+            atexit.register(escrita.fechar)
+    return escrita
@@ -0,0 +1,154 @@
+import time
+from collections import deque
+
+import numpy as np
+
+
+# =====================================================
+# CLASSIFICAÇÃO DO ESTADO COGNITIVO
+# =====================================================
+def classificar_estado(ear, pisc_min):
+    if ear < 0.18:
+        return "😴 Fadiga", "Sinais consistentes de sonolência."
+    if pisc_min > 25:
+        return "😵 Distração", "Piscadas excessivas detectadas."
+    if ear > 0.28:
+        return "😊 Foco", "Atenção visual estável."
+    return "😐 Neutro", "Estado cognitivo regular."
+
+
+# rótulos de classificar_estado -> vocabulário dos painéis
+ESTADOS_PAINEL = {
+    "Foco": "Focado",
+    "Neutro": "Normal",
+    "Distração": "Distraído",
+    "Fadiga": "Fadiga",
+}
+
+
+def estado_painel(estado):
+    """Converte "😊 Foco" em "Focado" (None continua None)"""
+    if not estado:
+        return None
+    rotulo = estado.split(" ", 1)[-1]
+    return ESTADOS_PAINEL.get(rotulo, rotulo)
+
+
+def indices_atencao(ear_medio, perclos, pisc_min):
+    """
+    (nivel_foco, fadiga) entre 0 e 1, nos mesmos limiares de
+    classificar_estado: EAR <= 0.18 é fadiga plena e >= 0.28 nenhuma;
+    acima de 25 piscadas/min conta como distração.
+    """
+    fadiga = max(perclos, float(np.clip((0.28 - ear_medio) / 0.10, 0, 1)))
+    distracao = float(np.clip((pisc_min - 15) / 10, 0, 1))
+    return round(1.0 - max(fadiga, distracao), 2), round(fadiga, 2)
+
+
+# =====================================================
+# ESTIMADOR DE PISCADAS E FADIGA (MEMÓRIA FIXA)
+# =====================================================
+class EstimadorPiscadas:
+    """
+    Estimador contínuo de EAR médio, piscadas e fadiga.
+
+    - buffer circular com soma corrente para o EAR médio das últimas
+      `janela_amostras` leituras (O(1) por frame);
+    - máquina de estados com histerese: uma piscada é contada uma única
+      vez, na transição fechado -> aberto;
+    - taxa de piscadas por minuto sobre uma janela deslizante de tempo;
+    - PERCLOS: fração das amostras da janela com o olho fechado.
+    """
+
+    # recalcula as somas do zero de tempos em tempos (erro de ponto flutuante)
+    _RECALCULO = 10_000
+
+    def __init__(
+        self,
+        limiar=0.25,
+        histerese=0.03,
+        janela_amostras=30,
+        janela_s=60.0,
+        max_piscadas_janela=512,
+    ):
+        self.limiar = limiar
+        self.histerese = histerese
+        self.janela_s = janela_s
+
+        self._ears = np.zeros(janela_amostras, dtype=np.float64)
+        self._fechadas = np.zeros(janela_amostras, dtype=bool)
+        self._pos = 0
+        self._n = 0
+        self._soma = 0.0
+        self._soma_fechadas = 0
+        self._atualizacoes = 0
+
+        self.fechado = False
+        self.piscadas = 0
+        self._tempos = deque(maxlen=max_piscadas_janela)
+        self.inicio = None
+        self.ultimo_t = None
+
+    def atualizar(self, ear, t=None):
+        """Registra uma leitura de EAR no instante `t` (segundos)"""
+        t = time.time() if t is None else t
+        if self.inicio is None:
+            self.inicio = t
+        self.ultimo_t = t
+
+        # máquina de estados com histerese
+        if not self.fechado and ear < self.limiar:
+            self.fechado = True
+        elif self.fechado and ear > self.limiar + self.histerese:
+            self.fechado = False
+            self.piscadas += 1
+            self._tempos.append(t)
+
+        # buffer circular
+        tamanho = len(self._ears)
+        if self._n == tamanho:
+            self._soma -= self._ears[self._pos]
+            self._soma_fechadas -= int(self._fechadas[self._pos])
+        else:
+            self._n += 1
+
+        self._ears[self._pos] = ear
+        self._fechadas[self._pos] = self.fechado
+        self._soma += ear
+        self._soma_fechadas += int(self.fechado)
+        self._pos = (self._pos + 1) % tamanho
+
+        self._atualizacoes += 1
+        if self._atualizacoes % self._RECALCULO == 0:
+            self._soma = float(self._ears[: self._n].sum())
+
+        self._descartar(t)
+
+    def _descartar(self, t):
+        limite = t - self.janela_s
+        while self._tempos and self._tempos[0] < limite:
+            self._tempos.popleft()
+
+    @property
+    def pronto(self):
+        return self._n == len(self._ears)
+
+    @property
+    def ear_medio(self):
+        return self._soma / self._n if self._n else 0.0
+
+    @property
+    def perclos(self):
+        return self._soma_fechadas / self._n if self._n else 0.0
+
+    def piscadas_min(self, t=None):
+        """Piscadas por minuto na janela deslizante terminando em `t`"""
+        if self.inicio is None:
+            return 0.0
+
+        t = self.ultimo_t if t is None else t
+        self._descartar(t)
+
+        # como no cálculo original, nunca divide por menos de 1 minuto
+        janela = max(min(t - self.inicio, self.janela_s), 60.0)
+        return len(self._tempos) * 60.0 / janela
@@ -0,0 +1,477 @@
+"""
+Estatísticas incrementais de nutrição × cognição (ano letivo inteiro).
+
+Cada amostra (foco, fadiga e, se houver, a nutrição do aluno) atualiza
+em O(1) os acumuladores de todos os grupos a que pertence: aluno, turma,
+disciplina e a escola toda. Nada de histórico em memória:
+
+- Momentos: média e variância de Welford;
+- Comomentos: médias, variâncias e covariância conjuntas (Pearson);
+- TendenciaDecaida: nível e inclinação do foco com pesos que decaem
+  exponencialmente (meia-vida configurável), "como está agora".
+
+Os acumuladores são gravados na tabela `estatisticas_online` (só os
+alterados) e recarregados no próximo início do processo; consultar a
+correlação do ano custa o mesmo que a de um dia.
+"""
+
+import atexit
+import json
+import math
+import threading
+import time
+
+from database import conectar, inicializar
+
+INTERVALO_SALVAR_S = 30.0
+MEIA_VIDA_TENDENCIA_S = 14 * 24 * 3600
+SEGUNDOS_SEMANA = 7 * 24 * 3600
+
+GERAL = ("escola", "geral")
+
+
+# =====================================================
+# MOMENTOS (WELFORD)
+# =====================================================
+class Momentos:
+    """Média e variância online (Welford), com fusão de grupos (Chan)"""
+
+    __slots__ = ("n", "media", "m2")
+
+    def __init__(self, n=0, media=0.0, m2=0.0):
+        self.n, self.media, self.m2 = n, media, m2
+
+    def adicionar(self, x):
+        self.n += 1
+        delta = x - self.media
+        self.media += delta / self.n
+        self.m2 += delta * (x - self.media)
+
+    def combinar(self, outro):
+        if not outro.n:
+            return
+        n = self.n + outro.n
+        delta = outro.media - self.media
+        self.media += delta * outro.n / n
+        self.m2 += outro.m2 + delta * delta * self.n * outro.n / n
+        self.n = n
+
+    @property
+    def variancia(self):
+        return self.m2 / (self.n - 1) if self.n > 1 else None
+
+    @property
+    def desvio(self):
+        v = self.variancia
+        return math.sqrt(v) if v is not None else None
+
+    def estado(self):
+        return [self.n, self.media, self.m2]
+
+
+class Comomentos:
+    """Momentos conjuntos de (x, y): covariância e correlação online"""
+
+    __slots__ = ("n", "media_x", "media_y", "m2_x", "m2_y", "c_xy")
+
+    def __init__(
+        self, n=0, media_x=0.0, media_y=0.0, m2_x=0.0, m2_y=0.0, c_xy=0.0
+    ):
+        self.n = n
+        self.media_x, self.media_y = media_x, media_y
+        self.m2_x, self.m2_y, self.c_xy = m2_x, m2_y, c_xy
+
+    def adicionar(self, x, y):
+        self.n += 1
+        dx = x - self.media_x
+        self.media_x += dx / self.n
+        dy = y - self.media_y
+        self.media_y += dy / self.n
+        self.m2_x += dx * (x - self.media_x)
+        self.m2_y += dy * (y - self.media_y)
+        self.c_xy += dx * (y - self.media_y)
+
+    def combinar(self, outro):
+        if not outro.n:
+            return
+        n = self.n + outro.n
+        fator = self.n * outro.n / n
+        dx = outro.media_x - self.media_x
+        dy = outro.media_y - self.media_y
+        self.media_x += dx * outro.n / n
+        self.media_y += dy * outro.n / n
+        self.m2_x += outro.m2_x + dx * dx * fator
+        self.m2_y += outro.m2_y + dy * dy * fator
+        self.c_xy += outro.c_xy + dx * dy * fator
+        self.n = n
+
+    @property
+    def covariancia(self):
+        return self.c_xy / (self.n - 1) if self.n > 1 else None
+
+    @property
+    def correlacao(self):
+        if self.n < 2 or self.m2_x <= 0 or self.m2_y <= 0:
+            return None
+        r = self.c_xy / math.sqrt(self.m2_x * self.m2_y)
+        return max(-1.0, min(1.0, r))
+
+    def estado(self):
+        return [
+            self.n,
+            self.media_x,
+            self.media_y,
+            self.m2_x,
+            self.m2_y,
+            self.c_xy,
+        ]
+
+
+# =====================================================
+# TENDÊNCIA COM DECAIMENTO EXPONENCIAL
+# =====================================================
+class TendenciaDecaida:
+    """
+    Regressão linear de y sobre o tempo com pesos exp(-idade/tau): cada
+    amostra nova encolhe o peso de todo o passado de uma vez, sem
+    guardar as amostras. `nivel` é a média ponderada recente e
+    `inclinacao` a variação de y por segundo.
+    """
+
+    __slots__ = (
+        "tau",
+        "peso",
+        "media_t",
+        "media_y",
+        "m2_t",
+        "c_ty",
+        "ultimo_t",
+    )
+
+    def __init__(
+        self,
+        meia_vida_s=MEIA_VIDA_TENDENCIA_S,
+        peso=0.0,
+        media_t=0.0,
+        media_y=0.0,
+        m2_t=0.0,
+        c_ty=0.0,
+        ultimo_t=None,
+    ):
+        self.tau = meia_vida_s / math.log(2)
+        self.peso = peso
+        self.media_t, self.media_y = media_t, media_y
+        self.m2_t, self.c_ty = m2_t, c_ty
+        self.ultimo_t = ultimo_t
+
+    def adicionar(self, y, t):
+        # pesos relativos à amostra mais recente (peso 1): chegando mais
+        # nova, o passado decai; chegando atrasada, ela é que decai
+        w = 1.0
+        if self.ultimo_t is not None:
+            if t > self.ultimo_t:
+                fator = math.exp(-(t - self.ultimo_t) / self.tau)
+                self.peso *= fator
+                self.m2_t *= fator
+                self.c_ty *= fator
+            else:
+                w = math.exp(-(self.ultimo_t - t) / self.tau)
+        self.ultimo_t = t if self.ultimo_t is None else max(t, self.ultimo_t)
+
+        # Welford ponderado
+        self.peso += w
+        dt = t - self.media_t
+        dy = y - self.media_y
+        self.media_t += w * dt / self.peso
+        self.media_y += w * dy / self.peso
+        self.m2_t += w * dt * (t - self.media_t)
+        self.c_ty += w * dt * (y - self.media_y)
+
+    def combinar(self, outro):
+        """Junta dois conjuntos ponderados, decaídos até o mais recente"""
+        if not outro.peso:
+            return
+        if not self.peso:
+            for nome in self.__slots__[1:]:
+                setattr(self, nome, getattr(outro, nome))
+            return
+
+        t = max(self.ultimo_t, outro.ultimo_t)
+        fa = math.exp(-(t - self.ultimo_t) / self.tau)
+        fb = math.exp(-(t - outro.ultimo_t) / self.tau)
+        wa, wb = self.peso * fa, outro.peso * fb
+        peso = wa + wb
+        dt = outro.media_t - self.media_t
+        dy = outro.media_y - self.media_y
+
+        self.media_t += dt * wb / peso
+        self.media_y += dy * wb / peso
+        self.m2_t = self.m2_t * fa + outro.m2_t * fb + dt * dt * wa * wb / peso
+        self.c_ty = self.c_ty * fa + outro.c_ty * fb + dt * dy * wa * wb / peso
+        self.peso = peso
+        self.ultimo_t = t
+
+    @property
+    def nivel(self):
+        return self.media_y if self.peso else None
+
+    @property
+    def inclinacao(self):
+        # menos de ~1 minuto de espalhamento: ainda não há tendência
+        if self.peso < 2 or self.m2_t / self.peso < 60.0:
+            return None
+        return self.c_ty / self.m2_t
+
+    def estado(self):
+        return [
+            self.peso,
+            self.media_t,
+            self.media_y,
+            self.m2_t,
+            self.c_ty,
+            self.ultimo_t,
+        ]
+
+
+# =====================================================
+# ACUMULADOR POR GRUPO
+# =====================================================
+class Acumulador:
+    """Tudo o que se guarda de um grupo (aluno, turma, disciplina...)"""
+
+    def __init__(self, meia_vida_s=MEIA_VIDA_TENDENCIA_S):
+        self.foco = Momentos()
+        self.fadiga = Momentos()
+        self.nutricao_foco = Comomentos()
+        self.tendencia_foco = TendenciaDecaida(meia_vida_s)
+
+    def adicionar(self, foco, fadiga, nutricao, t):
+        self.foco.adicionar(foco)
+        self.fadiga.adicionar(fadiga)
+        if nutricao is not None:
+            self.nutricao_foco.adicionar(nutricao, foco)
+        self.tendencia_foco.adicionar(foco, t)
+
+    def combinar(self, outro):
+        self.foco.combinar(outro.foco)
+        self.fadiga.combinar(outro.fadiga)
+        self.nutricao_foco.combinar(outro.nutricao_foco)
+        self.tendencia_foco.combinar(outro.tendencia_foco)
+
+    def resumo(self):
+        inclinacao = self.tendencia_foco.inclinacao
+        return {
+            "amostras": self.foco.n,
+            "foco_medio": self.foco.media if self.foco.n else None,
+            "foco_desvio": self.foco.desvio,
+            "fadiga_media": self.fadiga.media if self.fadiga.n else None,
+            "correlacao_nutricao_foco": self.nutricao_foco.correlacao,
+            "amostras_nutricao": self.nutricao_foco.n,
+            "foco_recente": self.tendencia_foco.nivel,
+            "tendencia_foco_semana": (
+                inclinacao * SEGUNDOS_SEMANA
+                if inclinacao is not None
+                else None
+            ),
+        }
+
+    def serializar(self):
+        return json.dumps(
+            {
+                "foco": self.foco.estado(),
+                "fadiga": self.fadiga.estado(),
+                "nutricao_foco": self.nutricao_foco.estado(),
+                "tendencia_foco": self.tendencia_foco.estado(),
+            }
+        )
+
+    @classmethod
+    def restaurar(cls, texto, meia_vida_s=MEIA_VIDA_TENDENCIA_S):
+        dados = json.loads(texto)
+        acumulador = cls(meia_vida_s)
+        acumulador.foco = Momentos(*dados["foco"])
+        acumulador.fadiga = Momentos(*dados["fadiga"])
+        acumulador.nutricao_foco = Comomentos(*dados["nutricao_foco"])
+        acumulador.tendencia_foco = TendenciaDecaida(
+            meia_vida_s, *dados["tendencia_foco"]
+        )
+        return acumulador
+
+
+# =====================================================
+# REGISTRO PERSISTENTE (UM POR PROCESSO)
+# =====================================================
+class EstatisticasOnline:
+    """
+    Acumuladores por (escopo, chave). `registrar` é O(número de grupos
+    da amostra) e só mexe em memória.
+
+    Além da visão completa, cada grupo guarda o delta das amostras
+    ainda não gravadas. `salvar` soma o delta ao que está no banco
+    (fusão de Chan), então o servidor e o processamento em lote podem
+    gravar no mesmo banco sem um apagar as amostras do outro.
+    """
+
+    def __init__(
+        self,
+        caminho=None,
+        meia_vida_s=MEIA_VIDA_TENDENCIA_S,
+        intervalo_salvar_s=INTERVALO_SALVAR_S,
+    ):
+        self.caminho = caminho
+        self.meia_vida_s = meia_vida_s
+        self.intervalo_salvar_s = intervalo_salvar_s
+        self.grupos = {}
+        self._deltas = {}
+        self._salvo_em = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _novo(self):
+        return Acumulador(self.meia_vida_s)
+
+    def carregar(self):
+        inicializar(self.caminho)
+        with conectar(self.caminho) as conn:
+            rows = conn.execute(
+                "SELECT escopo, chave, estado FROM estatisticas_online"
+            ).fetchall()
+        with self._lock:
+            for escopo, chave, estado in rows:
+                acumulador = Acumulador.restaurar(estado, self.meia_vida_s)
+                delta = self._deltas.get((escopo, chave))
+                if delta is not None:
+                    acumulador.combinar(delta)
+                self.grupos[(escopo, chave)] = acumulador
+        return len(rows)
+
+    def registrar(self, foco, fadiga, nutricao=None, t=None, **grupos):
+        """
+        Uma amostra para os grupos dados, ex.:
+        registrar(0.7, 0.2, 1.0, aluno=12, turma="7A", disciplina=None)
+        Grupos None são ignorados; a escola toda sempre recebe.
+        """
+        t = time.time() if t is None else t
+        chaves = [GERAL] + [
+            (escopo, str(chave))
+            for escopo, chave in grupos.items()
+            if chave is not None
+        ]
+        with self._lock:
+            for chave in chaves:
+                for destino in (self.grupos, self._deltas):
+                    acumulador = destino.get(chave)
+                    if acumulador is None:
+                        acumulador = destino[chave] = self._novo()
+                    acumulador.adicionar(foco, fadiga, nutricao, t)
+            salvar = (
+                time.monotonic() - self._salvo_em >= self.intervalo_salvar_s
+            )
+        if salvar:
+            self.salvar()
+
+    def resumo(self, escopo, chave):
+        with self._lock:
+            acumulador = self.grupos.get((escopo, str(chave)))
+            return acumulador.resumo() if acumulador else None
+
+    def chaves(self, escopo):
+        with self._lock:
+            return sorted(c for e, c in self.grupos if e == escopo)
+
+    def salvar(self, conn=None):
+        """
+        Soma ao banco os deltas pendentes; retorna quantos grupos. Com
+        `conn` (já em uma transação de escrita), a soma entra nela e é
+        confirmada junto com o resto da transação.
+        """
+        with self._lock:
+            deltas, self._deltas = self._deltas, {}
+            self._salvo_em = time.monotonic()
+        if not deltas:
+            return 0
+
+        agora = int(time.time())
+        try:
+            if conn is not None:
+                gravados = self._somar_no_banco(conn, deltas, agora)
+            else:
+                inicializar(self.caminho)
+                with conectar(self.caminho) as conn:
+                    # lock de escrita já na leitura: dois processos
+                    # somando o mesmo grupo não perdem amostras
+                    conn.execute("BEGIN IMMEDIATE")
+                    try:
+                        gravados = self._somar_no_banco(conn, deltas, agora)
+                        conn.commit()
+                    except Exception:
+                        conn.rollback()
+                        raise
+        except Exception:
+            # devolve os deltas para a próxima tentativa
+            with self._lock:
+                for chave, delta in deltas.items():
+                    atual = self._deltas.get(chave)
+                    if atual is not None:
+                        delta.combinar(atual)
+                    self._deltas[chave] = delta
+            raise
+
+        # a visão em memória passa a incluir o que outros processos
+        # gravaram, mais o que chegou aqui durante a gravação
+        with self._lock:
+            for chave, acumulador in gravados.items():
+                delta = self._deltas.get(chave)
+                if delta is not None:
+                    acumulador.combinar(delta)
+                self.grupos[chave] = acumulador
+        return len(gravados)
+
+    def _somar_no_banco(self, conn, deltas, agora):
+        gravados = {}
+        for (escopo, chave), delta in deltas.items():
+            row = conn.execute(
+                """
+                SELECT estado FROM estatisticas_online
+                WHERE escopo = ? AND chave = ?
+                """,
+                (escopo, chave),
+            ).fetchone()
+            acumulador = (
+                Acumulador.restaurar(row[0], self.meia_vida_s)
+                if row
+                else self._novo()
+            )
+            acumulador.combinar(delta)
+            gravados[(escopo, chave)] = acumulador
+
+        conn.executemany(
+            """
+            INSERT OR REPLACE INTO estatisticas_online
+            (escopo, chave, estado, atualizado_em)
+            VALUES (?, ?, ?, ?)
+            """,
+            [
+                (escopo, chave, acumulador.serializar(), agora)
+                for (escopo, chave), acumulador in gravados.items()
+            ],
+        )
+        # cópias: o banco fica com o estado gravado, a memória segue
+        return {
+            chave: Acumulador.restaurar(a.serializar(), self.meia_vida_s)
+            for chave, a in gravados.items()
+        }
+
+
+_estatisticas = None
+_estatisticas_lock = threading.Lock()
+
+
+def obter_estatisticas():
+    """Estatísticas do processo, carregadas do banco no primeiro uso"""
+    global _estatisticas
+    with _estatisticas_lock:
+        if _estatisticas is None:
+            _estatisticas = EstatisticasOnline()
+            _estatisticas.carregar()
+            atexit.register(_estatisticas.salvar)
+        return _estatisticas
@@ -0,0 +1,133 @@
+import functools
+import json
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from carregamento import tempos_carregamento
+
+# =====================================================
+# MÉTRICAS DE DESEMPENHO DO PROCESSO
+# =====================================================
+# Tudo em memória e compartilhado por todas as sessões e threads
+# (script do Streamlit, workers do webrtc, thread do gateway LLM).
+# Latências em milissegundos.
+
+JANELA_AMOSTRAS = 2048
+
+
+class Histograma:
+    """Latências recentes (janela fixa) + totais desde o início"""
+
+    def __init__(self, janela=JANELA_AMOSTRAS):
+        self._amostras = deque(maxlen=janela)
+        self.contagem = 0
+        self.total = 0.0
+        self.maximo = 0.0
+
+    def registrar(self, valor):
+        self._amostras.append(valor)
+        self.contagem += 1
+        self.total += valor
+        if valor > self.maximo:
+            self.maximo = valor
+
+    def resumo(self):
+        ordenadas = sorted(self._amostras)
+
+        def percentil(p):
+            if not ordenadas:
+                return 0.0
+            # nearest-rank
+            return ordenadas[max(math.ceil(p / 100 * len(ordenadas)) - 1, 0)]
+
+        return {
+            "contagem": self.contagem,
+            "media_ms": self.total / self.contagem if self.contagem else 0.0,
+            "p50_ms": percentil(50),
+            "p95_ms": percentil(95),
+            "p99_ms": percentil(99),
+            "max_ms": self.maximo,
+        }
+
+
+class Metricas:
+    """Registro de histogramas e contadores, seguro entre threads"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histogramas = {}
+        self._contadores = {}
+        self.inicio = time.time()
+
+    def registrar(self, nome, valor_ms):
+        with self._lock:
+            histograma = self._histogramas.get(nome)
+            if histograma is None:
+                histograma = self._histogramas[nome] = Histograma()
+            histograma.registrar(valor_ms)
+
+    def contar(self, nome, n=1):
+        with self._lock:
+            self._contadores[nome] = self._contadores.get(nome, 0) + n
+
+    def zerar(self):
+        with self._lock:
+            self._histogramas.clear()
+            self._contadores.clear()
+            self.inicio = time.time()
+
+    def resumo(self):
+        with self._lock:
+            latencias = {
+                nome: h.resumo()
+                for nome, h in sorted(self._histogramas.items())
+            }
+            contadores = dict(sorted(self._contadores.items()))
+        return {
+            "desde": self.inicio,
+            "latencias": latencias,
+            "contadores": contadores,
+            "importacoes_ms": {
+                nome: s * 1000 for nome, s in tempos_carregamento().items()
+            },
+        }
+
+    def exportar_json(self):
+        return json.dumps(self.resumo(), ensure_ascii=False, indent=2)
+
+
+metricas = Metricas()
+
+
+# =====================================================
+# ATALHOS
+# =====================================================
+@contextmanager
+def cronometrar(nome):
+    """Registra a duração do bloco (também quando ele levanta erro)"""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        metricas.registrar(nome, (time.perf_counter() - inicio) * 1000)
+
+
+def medir(nome):
+    """Decorador: cronometra cada chamada da função"""
+
+    def decorador(func):
+        @functools.wraps(func)
+        def envolvida(*args, **kwargs):
+            with cronometrar(nome):
+                return func(*args, **kwargs)
+
+        return envolvida
+
+    return decorador
+
+
+def contar(nome, n=1):
+    metricas.contar(nome, n)
@@ -0,0 +1,261 @@
+import asyncio
+import os
+import queue
+import random
+import threading
+
+import streamlit as st
+
+from carregamento import openai
+from instrumentacao import contar, cronometrar
+
+MODELO_PADRAO = "gpt-4o-mini"
+
+
+def obter_api_key():
+    """Chave da OpenAI: Streamlit Cloud (secrets) ou .env"""
+    try:
+        api_key = st.secrets.get("OPENAI_API_KEY", None)
+    except Exception:
+        # sem secrets.toml configurado
+        api_key = None
+    return api_key or os.getenv("OPENAI_API_KEY")
+
+
+def gerar_resposta_local(q):
+    return "Expliquei em linguagem simples: (versão local) " + q[:200]
+
+
+# =====================================================
+# BACKENDS
+# =====================================================
+class BackendOpenAI:
+    def __init__(self, api_key, base_url=None):
+        # as novas tentativas ficam a cargo do gateway
+        self.client = openai.AsyncOpenAI(
+            api_key=api_key, base_url=base_url, max_retries=0
+        )
+
+    async def completar(self, messages, **opcoes):
+        resp = await self.client.chat.completions.create(
+            messages=messages, **opcoes
+        )
+        return resp.choices[0].message.content
+
+    async def transmitir(self, messages, **opcoes):
+        stream = await self.client.chat.completions.create(
+            messages=messages, stream=True, **opcoes
+        )
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+    @staticmethod
+    def transitorio(erro):
+        """429, 5xx, timeout e falha de conexão valem nova tentativa"""
+        if isinstance(
+            erro,
+            (
+                openai.APITimeoutError,
+                openai.APIConnectionError,
+                openai.RateLimitError,
+            ),
+        ):
+            return True
+        if isinstance(erro, openai.APIStatusError):
+            return erro.status_code >= 500
+        return isinstance(erro, asyncio.TimeoutError)
+
+
+class BackendLocal:
+    """Backend offline: sem rede, para testes e quando não há chave"""
+
+    def __init__(self, responder=None, atraso=0.0):
+        self.responder = responder or self._padrao
+        self.atraso = atraso
+
+    @staticmethod
+    def _padrao(messages, **opcoes):
+        return gerar_resposta_local(messages[-1]["content"])
+
+    async def completar(self, messages, **opcoes):
+        if self.atraso:
+            await asyncio.sleep(self.atraso)
+        return self.responder(messages, **opcoes)
+
+    async def transmitir(self, messages, **opcoes):
+        texto = await self.completar(messages, **opcoes)
+        for palavra in texto.split(" "):
+            yield palavra + " "
+
+    @staticmethod
+    def transitorio(erro):
+        return isinstance(erro, asyncio.TimeoutError)
+
+
+# =====================================================
+# GATEWAY
+# =====================================================
+_FIM = object()
+
+
+class GatewayLLM:
+    """
+    Ponto único de acesso ao LLM.
+
+    Todas as chamadas rodam em um event loop próprio (thread dedicada),
+    limitadas por um semáforo global, com timeout por requisição e
+    novas tentativas com backoff exponencial e jitter. As versões
+    `*_sync` servem ao script do Streamlit, que é síncrono.
+    """
+
+    def __init__(
+        self,
+        backend,
+        max_concorrencia=8,
+        timeout=30.0,
+        tentativas=4,
+        espera_base=0.5,
+        espera_max=8.0,
+        modelo=MODELO_PADRAO,
+    ):
+        self.backend = backend
+        self.max_concorrencia = max_concorrencia
+        self.timeout = timeout
+        self.tentativas = tentativas
+        self.espera_base = espera_base
+        self.espera_max = espera_max
+        self.modelo = modelo
+
+        self._loop = None
+        self._semaforo = None
+        self._lock = threading.Lock()
+
+    @property
+    def local(self):
+        return isinstance(self.backend, BackendLocal)
+
+    # ---------- event loop dedicado ----------
+    def _obter_loop(self):
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(
+                    target=loop.run_forever, name="llm", daemon=True
+                ).start()
+                self._loop = loop
+            return self._loop
+
+    def _obter_semaforo(self):
+        if self._semaforo is None:
+            self._semaforo = asyncio.Semaphore(self.max_concorrencia)
+        return self._semaforo
+
+    def _espera(self, tentativa):
+        # "full jitter": espalha as novas tentativas de vários clientes
+        teto = min(self.espera_max, self.espera_base * 2**tentativa)
+        return random.uniform(0, teto)
+
+    def _repetir(self, erro, tentativa):
+        return (
+            tentativa + 1 < self.tentativas
+            and self.backend.transitorio(erro)
+        )
+
+    # ---------- API assíncrona ----------
+    async def completar(self, messages, **opcoes):
+        opcoes.setdefault("model", self.modelo)
+        # inclui a espera pelo semáforo e as novas tentativas; o backoff
+        # roda fora do semáforo para não segurar a vaga de quem está pronto
+        with cronometrar("llm.completar"):
+            tentativa = 0
+            while True:
+                try:
+                    async with self._obter_semaforo():
+                        return await asyncio.wait_for(
+                            self.backend.completar(messages, **opcoes),
+                            self.timeout,
+                        )
+                except Exception as e:
+                    if not self._repetir(e, tentativa):
+                        contar("llm.falhas")
+                        raise
+                contar("llm.novas_tentativas")
+                await asyncio.sleep(self._espera(tentativa))
+                tentativa += 1
+
+    async def transmitir(self, messages, **opcoes):
+        """Gera os pedaços da resposta; só repete antes do 1º pedaço"""
+        opcoes.setdefault("model", self.modelo)
+        tentativa = 0
+        while True:
+            async with self._obter_semaforo():
+                recebeu = False
+                pedacos = self.backend.transmitir(messages, **opcoes)
+                try:
+                    while True:
+                        pedaco = await asyncio.wait_for(
+                            pedacos.__anext__(), self.timeout
+                        )
+                        recebeu = True
+                        yield pedaco
+                except StopAsyncIteration:
+                    return
+                except Exception as e:
+                    if recebeu or not self._repetir(e, tentativa):
+                        raise
+                finally:
+                    await pedacos.aclose()
+            await asyncio.sleep(self._espera(tentativa))
+            tentativa += 1
+
+    # ---------- API síncrona ----------
+    def executar(self, coro):
+        """Roda uma corrotina no loop do gateway e espera o resultado"""
+        return asyncio.run_coroutine_threadsafe(coro, self._obter_loop()).result()
+
+    def completar_sync(self, messages, **opcoes):
+        return self.executar(self.completar(messages, **opcoes))
+
+    def transmitir_sync(self, messages, **opcoes):
+        """Gerador síncrono dos pedaços (pronto para st.write_stream)"""
+        fila = queue.Queue()
+
+        async def produzir():
+            try:
+                async for pedaco in self.transmitir(messages, **opcoes):
+                    fila.put(pedaco)
+            except Exception as e:
+                fila.put(e)
+            finally:
+                fila.put(_FIM)
+
+        futuro = asyncio.run_coroutine_threadsafe(
+            produzir(), self._obter_loop()
+        )
+        try:
+            while True:
+                item = fila.get()
+                if item is _FIM:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            # consumidor interrompido (ex.: rerun): cancela a requisição
+            futuro.cancel()
+
+
+_gateway = None
+_gateway_lock = threading.Lock()
+
+
+def obter_gateway():
+    """Gateway do processo: OpenAI se houver chave, senão o local"""
+    global _gateway
+    with _gateway_lock:
+        if _gateway is None:
+            api_key = obter_api_key()
+            backend = BackendOpenAI(api_key) if api_key else BackendLocal()
+            _gateway = GatewayLLM(backend)
+        return _gateway
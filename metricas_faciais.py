@@ -0,0 +1,136 @@
+import numpy as np
+
+# =====================================================
+# ÍNDICES DOS LANDMARKS (MEDIAPIPE FACE MESH)
+# =====================================================
+OLHO_ESQ = [33, 160, 158, 133, 153, 144]
+OLHO_DIR = [362, 385, 387, 263, 373, 380]
+
+MIN_LANDMARKS = 468
+
+# Pares (a, b) avaliados em uma única indexação:
+#   0-1 -> verticais do EAR (esq, dir)      -> distância euclidiana
+#   2-3 -> horizontais do EAR (esq, dir)    -> distância euclidiana
+#   4-6 -> pálpebras esq/dir e lábios       -> |dy|
+#   7-8 -> cantos dos olhos e da boca       -> |dx|
+_PARES = np.array(
+    [
+        [160, 144],
+        [385, 380],
+        [33, 133],
+        [362, 263],
+        [159, 145],
+        [386, 374],
+        [13, 14],
+        [33, 263],
+        [61, 291],
+    ],
+    dtype=np.intp,
+)
+_SOBRANCELHAS = np.array([70, 300], dtype=np.intp)
+
+
+# =====================================================
+# CONVERSÃO LANDMARKS -> NUMPY
+# =====================================================
+def landmarks_para_array(landmarks):
+    """Converte `face.landmark` em um array (N, 3) float32"""
+    landmarks = getattr(landmarks, "landmark", landmarks)
+    n = len(landmarks)
+    coords = np.fromiter(
+        (c for p in landmarks for c in (p.x, p.y, p.z)),
+        dtype=np.float32,
+        count=3 * n,
+    )
+    return coords.reshape(n, 3)
+
+
+# =====================================================
+# KERNEL VETORIZADO DE MÉTRICAS
+# =====================================================
+def calcular_ear(pts, idx):
+    """EAR de um olho a partir do array de landmarks"""
+    p = pts[idx, :2]
+    vertical = np.linalg.norm(p[1] - p[5])
+    horizontal = np.linalg.norm(p[0] - p[3])
+
+    if horizontal == 0:
+        return 0.0
+
+    return float(vertical / horizontal)
+
+
+def calcular_metricas(pts):
+    """
+    Calcula todas as métricas de olhos, boca e sobrancelhas
+    em uma única passada sobre o array de landmarks.
+    """
+    if pts is None or len(pts) < MIN_LANDMARKS:
+        return None
+
+    xy = pts[:, :2]
+    delta = xy[_PARES[:, 0]] - xy[_PARES[:, 1]]
+
+    dist = np.sqrt(np.einsum("ij,ij->i", delta[:4], delta[:4]))
+    dy = np.abs(delta[4:7, 1])
+    dx = np.abs(delta[7:, 0])
+
+    vertical, horizontal = dist[:2], dist[2:4]
+    ear_olhos = np.divide(
+        vertical,
+        horizontal,
+        out=np.zeros(2, dtype=np.float32),
+        where=horizontal != 0,
+    )
+
+    dist_entre_olhos = dx[0]
+    if dist_entre_olhos == 0:
+        abertura_olhos = abertura_boca = largura_boca = 0.0
+    else:
+        abertura_olhos = (dy[0] + dy[1]) / 2 / dist_entre_olhos
+        abertura_boca = dy[2] / dist_entre_olhos
+        largura_boca = dx[1] / dist_entre_olhos
+
+    return {
+        "ear_esq": float(ear_olhos[0]),
+        "ear_dir": float(ear_olhos[1]),
+        "ear": float(ear_olhos.mean()),
+        "dist_entre_olhos": float(dist_entre_olhos),
+        "abertura_olhos": float(abertura_olhos),
+        "abertura_boca": float(abertura_boca),
+        "largura_boca": float(largura_boca),
+        "sobrancelhas": float(xy[_SOBRANCELHAS, 1].mean()),
+    }
+
+
+# =====================================================
+# DETECTOR DE EMOÇÃO (REGRAS DO PROTÓTIPO)
+# =====================================================
+def classificar_emocao(metricas):
+    if not metricas or metricas["dist_entre_olhos"] == 0:
+        return "Neutro"
+
+    abertura_olhos = metricas["abertura_olhos"]
+    abertura_boca = metricas["abertura_boca"]
+    largura_boca = metricas["largura_boca"]
+    sobrancelhas = metricas["sobrancelhas"]
+
+    if abertura_olhos > 0.30 and abertura_boca > 0.32:
+        return "Surpreso"
+    if largura_boca > 0.75 and abertura_boca < 0.25:
+        return "Feliz"
+    if abertura_olhos < 0.18 and sobrancelhas < 0.38:
+        return "Bravo"
+    if largura_boca < 0.55 and abertura_boca < 0.18:
+        return "Triste"
+    return "Neutro"
+
+
+def detectar_emocao_por_landmarks(pts):
+    """Classifica a emoção a partir do array (N, 3) de landmarks"""
+    try:
+        if pts is not None and not isinstance(pts, np.ndarray):
+            pts = landmarks_para_array(pts)
+        return classificar_emocao(calcular_metricas(pts))
+    except Exception:
+        return "Neutro"
@@ -0,0 +1,299 @@
+"""
+Migrações versionadas do banco do NutriEdu.
+
+A versão do esquema fica em `PRAGMA user_version`. Cada migração roda
+em uma única transação e só é aplicada se a versão atual for menor.
+Novas mudanças de esquema entram sempre no fim da lista.
+"""
+
+AGORA_EPOCH = "CAST(strftime('%s', 'now') AS INTEGER)"
+
+
+def _epoch(coluna, local=False):
+    # textos gravados com datetime.now() estão em hora local
+    modificador = ", 'utc'" if local else ""
+    return (
+        f"COALESCE(CAST(strftime('%s', {coluna}{modificador}) AS INTEGER), "
+        f"{AGORA_EPOCH})"
+    )
+
+
+# -----------------------------------------------------
+# v1 — esquema legado (como era criado por cada página)
+# -----------------------------------------------------
+V1_ESQUEMA_LEGADO = [
+    """
+    CREATE TABLE IF NOT EXISTS usuarios (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        nome TEXT,
+        idade INTEGER,
+        turma TEXT
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS historico_avaliacoes (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        usuario_id INTEGER,
+        avaliacao TEXT,
+        resposta_ia TEXT,
+        emocao_detectada TEXT,
+        data TEXT
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS desempenho_cognitivo (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        aluno_id INTEGER,
+        nome TEXT,
+        idade INTEGER,
+        disciplina TEXT,
+        nota REAL,
+        estado_emocional TEXT,
+        data_avaliacao DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS avaliacoes_pergunta (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        usuario_id INTEGER,
+        pergunta_index INTEGER,
+        pergunta TEXT,
+        resposta TEXT,
+        emocao_detectada TEXT,
+        timestamp TEXT
+    )
+    """,
+]
+
+# -----------------------------------------------------
+# v2 — chaves estrangeiras, datas em epoch e índices
+# -----------------------------------------------------
+V2_CONSOLIDACAO = [
+    # todo id referenciado passa a existir em `usuarios`
+    """
+    INSERT OR IGNORE INTO usuarios (id, nome, idade)
+    SELECT aluno_id, MAX(nome), MAX(idade)
+    FROM desempenho_cognitivo
+    WHERE aluno_id IS NOT NULL
+    GROUP BY aluno_id
+    """,
+    """
+    INSERT OR IGNORE INTO usuarios (id, nome)
+    SELECT DISTINCT usuario_id, 'Aluno ' || usuario_id
+    FROM historico_avaliacoes
+    WHERE usuario_id IS NOT NULL
+    """,
+    """
+    INSERT OR IGNORE INTO usuarios (id, nome)
+    SELECT DISTINCT usuario_id, 'Aluno ' || usuario_id
+    FROM avaliacoes_pergunta
+    WHERE usuario_id IS NOT NULL
+    """,
+    f"""
+    CREATE TABLE desempenho_cognitivo_v2 (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        aluno_id INTEGER REFERENCES usuarios(id) ON DELETE CASCADE,
+        nome TEXT,
+        idade INTEGER,
+        disciplina TEXT,
+        nota REAL,
+        estado_emocional TEXT,
+        data_avaliacao INTEGER NOT NULL DEFAULT ({AGORA_EPOCH})
+    )
+    """,
+    f"""
+    INSERT INTO desempenho_cognitivo_v2
+    (id, aluno_id, nome, idade, disciplina, nota, estado_emocional,
+     data_avaliacao)
+    SELECT id, aluno_id, nome, idade, disciplina, nota, estado_emocional,
+           {_epoch("data_avaliacao")}
+    FROM desempenho_cognitivo
+    """,
+    "DROP TABLE desempenho_cognitivo",
+    "ALTER TABLE desempenho_cognitivo_v2 RENAME TO desempenho_cognitivo",
+    f"""
+    CREATE TABLE historico_avaliacoes_v2 (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        usuario_id INTEGER REFERENCES usuarios(id) ON DELETE CASCADE,
+        avaliacao TEXT,
+        resposta_ia TEXT,
+        emocao_detectada TEXT,
+        data INTEGER NOT NULL DEFAULT ({AGORA_EPOCH})
+    )
+    """,
+    f"""
+    INSERT INTO historico_avaliacoes_v2
+    (id, usuario_id, avaliacao, resposta_ia, emocao_detectada, data)
+    SELECT id, usuario_id, avaliacao, resposta_ia, emocao_detectada,
+           {_epoch("data", local=True)}
+    FROM historico_avaliacoes
+    """,
+    "DROP TABLE historico_avaliacoes",
+    "ALTER TABLE historico_avaliacoes_v2 RENAME TO historico_avaliacoes",
+    f"""
+    CREATE TABLE avaliacoes_pergunta_v2 (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        usuario_id INTEGER REFERENCES usuarios(id) ON DELETE CASCADE,
+        pergunta_index INTEGER,
+        pergunta TEXT,
+        resposta TEXT,
+        emocao_detectada TEXT,
+        timestamp INTEGER NOT NULL DEFAULT ({AGORA_EPOCH})
+    )
+    """,
+    f"""
+    INSERT INTO avaliacoes_pergunta_v2
+    (id, usuario_id, pergunta_index, pergunta, resposta, emocao_detectada,
+     timestamp)
+    SELECT id, usuario_id, pergunta_index, pergunta, resposta,
+           emocao_detectada, {_epoch("timestamp", local=True)}
+    FROM avaliacoes_pergunta
+    """,
+    "DROP TABLE avaliacoes_pergunta",
+    "ALTER TABLE avaliacoes_pergunta_v2 RENAME TO avaliacoes_pergunta",
+    """
+    CREATE INDEX idx_desempenho_aluno_data
+    ON desempenho_cognitivo (aluno_id, data_avaliacao)
+    """,
+    """
+    CREATE INDEX idx_desempenho_data
+    ON desempenho_cognitivo (data_avaliacao)
+    """,
+    """
+    CREATE INDEX idx_desempenho_disciplina
+    ON desempenho_cognitivo (disciplina)
+    """,
+    """
+    CREATE INDEX idx_avaliacoes_usuario_ts
+    ON avaliacoes_pergunta (usuario_id, timestamp)
+    """,
+    """
+    CREATE INDEX idx_historico_usuario_data
+    ON historico_avaliacoes (usuario_id, data)
+    """,
+]
+
+# -----------------------------------------------------
+# v3 — cache persistente das respostas da IA Nutricional
+# -----------------------------------------------------
+V3_CACHE_LANCHES = [
+    """
+    CREATE TABLE cache_lanches (
+        chave TEXT PRIMARY KEY,
+        descricao TEXT,
+        resposta TEXT NOT NULL,
+        criado_em INTEGER NOT NULL,
+        acessado_em INTEGER NOT NULL
+    )
+    """,
+    """
+    CREATE INDEX idx_cache_lanches_acesso
+    ON cache_lanches (acessado_em)
+    """,
+]
+
+# -----------------------------------------------------
+# v4 — classificação estruturada das avaliações de lanche
+# -----------------------------------------------------
+V4_CLASSIFICACAO_LANCHE = [
+    "ALTER TABLE historico_avaliacoes ADD COLUMN classificacao TEXT",
+    """
+    CREATE INDEX idx_historico_classificacao
+    ON historico_avaliacoes (classificacao, data)
+    """,
+]
+
+# -----------------------------------------------------
+# v5 — métricas oculares das gravações processadas em lote
+# -----------------------------------------------------
+V5_METRICAS_GRAVACOES = [
+    "ALTER TABLE desempenho_cognitivo ADD COLUMN ear_medio REAL",
+    "ALTER TABLE desempenho_cognitivo ADD COLUMN piscadas_min REAL",
+    "ALTER TABLE desempenho_cognitivo ADD COLUMN perclos REAL",
+    # gravação de origem; reprocessar a mesma substitui a linha
+    "ALTER TABLE desempenho_cognitivo ADD COLUMN fonte TEXT",
+    """
+    CREATE UNIQUE INDEX idx_desempenho_fonte
+    ON desempenho_cognitivo (fonte) WHERE fonte IS NOT NULL
+    """,
+]
+
+# -----------------------------------------------------
+# v6 — confiança da emoção predominante por pergunta
+# -----------------------------------------------------
+V6_CONFIANCA_EMOCAO = [
+    "ALTER TABLE avaliacoes_pergunta ADD COLUMN confianca REAL",
+]
+
+# -----------------------------------------------------
+# v7 — acumuladores das estatísticas incrementais (estatisticas.py)
+# -----------------------------------------------------
+V7_ESTATISTICAS_ONLINE = [
+    """
+    CREATE TABLE estatisticas_online (
+        escopo TEXT NOT NULL,
+        chave TEXT NOT NULL,
+        estado TEXT NOT NULL,
+        atualizado_em INTEGER NOT NULL,
+        PRIMARY KEY (escopo, chave)
+    )
+    """,
+]
+
+# -----------------------------------------------------
+# v8 — manifesto dos arquivos Parquet do histórico (arquivo_parquet.py)
+# -----------------------------------------------------
+V8_ARQUIVO_PARQUET = [
+    """
+    CREATE TABLE arquivos_parquet (
+        arquivo TEXT PRIMARY KEY,
+        tabela TEXT NOT NULL,
+        turma TEXT NOT NULL,
+        mes TEXT NOT NULL,
+        linhas INTEGER NOT NULL,
+        data_min INTEGER NOT NULL,
+        data_max INTEGER NOT NULL,
+        criado_em INTEGER NOT NULL
+    )
+    """,
+    """
+    CREATE INDEX idx_arquivos_parquet_tabela
+    ON arquivos_parquet (tabela, data_max)
+    """,
+]
+
+MIGRACOES = [
+    V1_ESQUEMA_LEGADO,
+    V2_CONSOLIDACAO,
+    V3_CACHE_LANCHES,
+    V4_CLASSIFICACAO_LANCHE,
+    V5_METRICAS_GRAVACOES,
+    V6_CONFIANCA_EMOCAO,
+    V7_ESTATISTICAS_ONLINE,
+    V8_ARQUIVO_PARQUET,
+]
+
+
+def versao_atual(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def aplicar_migracoes(conn):
+    """Aplica as migrações pendentes; retorna a versão final"""
+    for versao, comandos in enumerate(MIGRACOES, start=1):
+        if versao_atual(conn) >= versao:
+            continue
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # outro processo pode ter migrado enquanto esperávamos o lock
+            if versao_atual(conn) < versao:
+                for sql in comandos:
+                    conn.execute(sql)
+                conn.execute(f"PRAGMA user_version = {versao}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+    return versao_atual(conn)
@@ -0,0 +1,309 @@
+"""
+Modo sala: uma câmera, vários alunos.
+
+Por quadro roda só o detector de rostos (barato) e um rastreador por
+IoU, que mantém o mesmo ID para cada rosto entre quadros. O FaceMesh
+roda apenas no recorte de cada trilha e de forma escalonada: no máximo
+`max_landmarks_quadro` trilhas por quadro, sempre as que estão há mais
+tempo sem leitura. O custo por quadro fica fixo (1 detecção + K
+recortes); com a turma maior, cada aluno é lido com menos frequência.
+
+Cada trilha tem o seu EstimadorPiscadas e AgregadorEmocoes, e gera
+Estado_Cognitivo / Nivel_Foco / Fadiga para o Painel do Professor.
+"""
+
+import itertools
+import threading
+import time
+
+import numpy as np
+
+from agregador_emocoes import AgregadorEmocoes
+from carregamento import Preguicoso, cv2, mp
+from estado_cognitivo import (
+    EstimadorPiscadas,
+    classificar_estado,
+    estado_painel,
+    indices_atencao,
+)
+from instrumentacao import cronometrar
+from metricas_faciais import calcular_metricas
+from motor_facial import expandir_caixa, landmarks_no_recorte
+
+mp_face_detection = Preguicoso(
+    "mediapipe.solutions.face_detection",
+    lambda: mp.solutions.face_detection,
+)
+
+PERFIL_SALA = {
+    "max_num_faces": 1,
+    "refine_landmarks": False,
+    "min_detection_confidence": 0.5,
+    "min_tracking_confidence": 0.5,
+}
+
+
+# =====================================================
+# DETECTOR DE ROSTOS (UM POR THREAD)
+# =====================================================
+_detectores = threading.local()
+
+
+def obter_detector(modelo=1, confianca=0.5):
+    """
+    FaceDetection da thread atual. O modelo 1 (alcance de até ~5 m)
+    é o indicado para a câmera da sala.
+    """
+    instancias = getattr(_detectores, "instancias", None)
+    if instancias is None:
+        instancias = _detectores.instancias = {}
+
+    chave = (modelo, confianca)
+    detector = instancias.get(chave)
+    if detector is None:
+        detector = mp_face_detection.FaceDetection(
+            model_selection=modelo, min_detection_confidence=confianca
+        )
+        instancias[chave] = detector
+    return detector
+
+
+def detectar_rostos(rgb, modelo=1, confianca=0.5):
+    """Caixas (N, 4) int em pixels: x0, y0, x1, y1"""
+    h, w = rgb.shape[:2]
+    with cronometrar("sala.deteccao"):
+        resultado = obter_detector(modelo, confianca).process(rgb)
+
+    caixas = []
+    for deteccao in resultado.detections or []:
+        r = deteccao.location_data.relative_bounding_box
+        x0, y0 = max(int(r.xmin * w), 0), max(int(r.ymin * h), 0)
+        x1 = min(int((r.xmin + r.width) * w), w)
+        y1 = min(int((r.ymin + r.height) * h), h)
+        if x1 > x0 and y1 > y0:
+            caixas.append((x0, y0, x1, y1))
+    return np.array(caixas, dtype=np.int32).reshape(-1, 4)
+
+
+# =====================================================
+# RASTREAMENTO POR IoU
+# =====================================================
+def matriz_iou(a, b):
+    """IoU entre todas as caixas de `a` (N, 4) e `b` (M, 4) -> (N, M)"""
+    a = np.asarray(a, dtype=np.float32).reshape(-1, 1, 4)
+    b = np.asarray(b, dtype=np.float32).reshape(1, -1, 4)
+
+    x0 = np.maximum(a[..., 0], b[..., 0])
+    y0 = np.maximum(a[..., 1], b[..., 1])
+    x1 = np.minimum(a[..., 2], b[..., 2])
+    y1 = np.minimum(a[..., 3], b[..., 3])
+    largura, altura = x1 - x0, y1 - y0
+    inter = np.clip(largura, 0, None) * np.clip(altura, 0, None)
+
+    area_a = (a[..., 2] - a[..., 0]) * (a[..., 3] - a[..., 1])
+    area_b = (b[..., 2] - b[..., 0]) * (b[..., 3] - b[..., 1])
+    uniao = area_a + area_b - inter
+    return np.divide(inter, uniao, out=np.zeros_like(inter), where=uniao > 0)
+
+
+class Trilha:
+    """Um rosto acompanhado entre quadros, com os seus estimadores"""
+
+    def __init__(self, id, caixa, t, limiar=0.25, janela_amostras=10):
+        self.id = id
+        self.caixa = tuple(int(v) for v in caixa)
+        self.criada_em = t
+        self.visto_em = t
+        self.lido_em = None
+        self.leituras = 0
+        self.metricas = None
+        # poucas leituras por segundo por aluno: janela menor que a da
+        # webcam individual para o estado sair em poucos segundos
+        self.estimador = EstimadorPiscadas(
+            limiar=limiar, janela_amostras=janela_amostras
+        )
+        self.agregador = AgregadorEmocoes()
+
+    def registrar(self, metricas, t):
+        self.lido_em = t
+        if metricas is None:
+            return
+        self.leituras += 1
+        self.metricas = metricas
+        self.estimador.atualizar(metricas["ear"], t)
+        self.agregador.atualizar(metricas, t)
+
+
+class RastreadorIoU:
+    """
+    Associação gulosa detecção -> trilha pelo maior IoU. Detecções sem
+    par viram trilhas novas; trilhas sem detecção por mais de
+    `max_ausencia_s` são descartadas.
+    """
+
+    def __init__(self, iou_min=0.3, max_ausencia_s=2.0, limiar=0.25):
+        self.iou_min = iou_min
+        self.max_ausencia_s = max_ausencia_s
+        self.limiar = limiar
+        self.trilhas = {}
+        self._ids = itertools.count(1)
+
+    def atualizar(self, caixas, t):
+        """Associa as caixas do quadro; devolve as trilhas vistas agora"""
+        ativas = list(self.trilhas.values())
+        livres = set(range(len(caixas)))
+        vistas = []
+
+        if ativas and len(caixas):
+            iou = matriz_iou([tr.caixa for tr in ativas], caixas)
+            usadas = set()
+            ordem = np.argsort(-iou, axis=None)
+            for i, j in zip(*np.unravel_index(ordem, iou.shape)):
+                if iou[i, j] < self.iou_min:
+                    break
+                if i in usadas or j not in livres:
+                    continue
+                usadas.add(i)
+                livres.discard(j)
+                trilha = ativas[i]
+                trilha.caixa = tuple(int(v) for v in caixas[j])
+                trilha.visto_em = t
+                vistas.append(trilha)
+
+        for j in sorted(livres):
+            trilha = Trilha(next(self._ids), caixas[j], t, self.limiar)
+            self.trilhas[trilha.id] = trilha
+            vistas.append(trilha)
+
+        for id, trilha in list(self.trilhas.items()):
+            if t - trilha.visto_em > self.max_ausencia_s:
+                del self.trilhas[id]
+
+        return vistas
+
+
+# =====================================================
+# SALA DE AULA (UMA POR CÂMERA)
+# =====================================================
+class SalaDeAula:
+    """
+    Estado de análise da câmera da sala. Roda na thread do vídeo:
+    quem lê de outra thread deve usar `leituras()` (cópia em dicts).
+
+    Com leituras espaçadas (`intervalo_landmarks_s`), uma piscada pode
+    cair entre duas amostras: o EAR médio e o PERCLOS continuam
+    confiáveis, a contagem de piscadas por minuto tende a ficar baixa.
+    """
+
+    def __init__(
+        self,
+        max_landmarks_quadro=2,
+        intervalo_landmarks_s=0.2,
+        lado_recorte=192,
+        margem_recorte=0.25,
+        limiar=0.25,
+        confianca=0.5,
+        modelo_deteccao=1,
+        iou_min=0.3,
+        max_ausencia_s=2.0,
+    ):
+        self.max_landmarks_quadro = max_landmarks_quadro
+        self.intervalo_landmarks_s = intervalo_landmarks_s
+        self.lado_recorte = lado_recorte
+        self.margem_recorte = margem_recorte
+        self.confianca = confianca
+        self.modelo_deteccao = modelo_deteccao
+        self.perfil = {
+            **PERFIL_SALA,
+            "min_detection_confidence": confianca,
+            "min_tracking_confidence": confianca,
+        }
+        self.rastreador = RastreadorIoU(iou_min, max_ausencia_s, limiar)
+
+    @property
+    def trilhas(self):
+        return list(self.rastreador.trilhas.values())
+
+    def processar(self, rgb, t=None):
+        """Detecta, rastreia e lê os landmarks das trilhas da vez"""
+        t = time.monotonic() if t is None else t
+        h, w = rgb.shape[:2]
+
+        caixas = detectar_rostos(rgb, self.modelo_deteccao, self.confianca)
+        vistas = self.rastreador.atualizar(caixas, t)
+
+        # trilhas nunca lidas primeiro, depois as lidas há mais tempo
+        da_vez = sorted(
+            (
+                tr
+                for tr in vistas
+                if tr.lido_em is None
+                or t - tr.lido_em >= self.intervalo_landmarks_s
+            ),
+            key=lambda tr: -np.inf if tr.lido_em is None else tr.lido_em,
+        )[: self.max_landmarks_quadro]
+
+        for trilha in da_vez:
+            caixa = expandir_caixa(trilha.caixa, w, h, self.margem_recorte)
+            faces = (
+                landmarks_no_recorte(
+                    rgb, caixa, self.lado_recorte, self.perfil
+                )
+                if caixa
+                else []
+            )
+            trilha.registrar(calcular_metricas(faces[0]) if faces else None, t)
+
+        return vistas
+
+    def leituras(self, t=None):
+        """Uma linha por trilha, no vocabulário do Painel do Professor"""
+        t = time.monotonic() if t is None else t
+        linhas = []
+        for trilha in self.trilhas:
+            estimador = trilha.estimador
+            estado = foco = fadiga = pisc_min = None
+            if estimador.pronto:
+                pisc_min = round(estimador.piscadas_min(t), 1)
+                estado, _ = classificar_estado(estimador.ear_medio, pisc_min)
+                foco, fadiga = indices_atencao(
+                    estimador.ear_medio, estimador.perclos, pisc_min
+                )
+            linhas.append(
+                {
+                    "trilha": trilha.id,
+                    "caixa": trilha.caixa,
+                    "Estado_Cognitivo": estado_painel(estado),
+                    "Nivel_Foco": foco,
+                    "Fadiga": fadiga,
+                    "emocao": trilha.agregador.atual,
+                    "ear_medio": round(estimador.ear_medio, 3),
+                    "piscadas_min": pisc_min,
+                    "perclos": round(estimador.perclos, 3),
+                    "leituras": trilha.leituras,
+                    "visto_ha_s": round(t - trilha.visto_em, 1),
+                }
+            )
+        return linhas
+
+
+# =====================================================
+# DESENHO
+# =====================================================
+def desenhar_trilhas(frame, leituras, cor=(0, 200, 255)):
+    """Caixa e "#id estado" de cada trilha (cor no espaço do frame)"""
+    for leitura in leituras:
+        x0, y0, x1, y1 = leitura["caixa"]
+        cv2.rectangle(frame, (x0, y0), (x1, y1), cor, 2)
+        texto = f"#{leitura['trilha']} {leitura['Estado_Cognitivo'] or '...'}"
+        cv2.putText(
+            frame,
+            texto,
+            (x0, max(y0 - 8, 12)),
+            cv2.FONT_HERSHEY_SIMPLEX,
+            0.5,
+            cor,
+            1,
+            cv2.LINE_AA,
+        )
+    return frame
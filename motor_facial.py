@@ -0,0 +1,216 @@
+import math
+import threading
+import time
+
+import numpy as np
+
+from carregamento import Preguicoso, cv2, mp
+from instrumentacao import cronometrar
+from metricas_faciais import landmarks_para_array
+
+# MediaPipe só é importado quando o primeiro FaceMesh é criado
+mp_face_mesh = Preguicoso(
+    "mediapipe.solutions.face_mesh", lambda: mp.solutions.face_mesh
+)
+
+# =====================================================
+# POOL DE FACEMESH (UMA INSTÂNCIA POR THREAD)
+# =====================================================
+PERFIL_PADRAO = {
+    "max_num_faces": 1,
+    "refine_landmarks": True,
+    "min_detection_confidence": 0.5,
+    "min_tracking_confidence": 0.5,
+}
+
+_pool = threading.local()
+
+
+def obter_face_mesh(**config):
+    """
+    Retorna o FaceMesh da thread atual para a configuração pedida.
+    O FaceMesh não é thread-safe, então cada thread de processamento
+    (worker do webrtc, thread de inferência, ...) recebe o seu.
+    """
+    perfil = {**PERFIL_PADRAO, **config}
+    chave = tuple(sorted(perfil.items()))
+
+    instancias = getattr(_pool, "instancias", None)
+    if instancias is None:
+        instancias = _pool.instancias = {}
+
+    face_mesh = instancias.get(chave)
+    if face_mesh is None:
+        face_mesh = mp_face_mesh.FaceMesh(**perfil)
+        instancias[chave] = face_mesh
+
+    return face_mesh
+
+
+def liberar_face_mesh():
+    """Fecha os FaceMesh criados pela thread atual"""
+    instancias = getattr(_pool, "instancias", None) or {}
+    for face_mesh in instancias.values():
+        face_mesh.close()
+    instancias.clear()
+
+
+# =====================================================
+# AMOSTRAGEM ADAPTATIVA DE FRAMES
+# =====================================================
+class AmostradorAdaptativo:
+    """
+    Decide quais frames analisar a partir da latência medida.
+    Se a inferência custa mais que o orçamento por frame, passa a
+    analisar um a cada N frames (N = latência / orçamento).
+    """
+
+    def __init__(self, orcamento_ms=10.0, intervalo_max=15, suavizacao=0.2):
+        self.orcamento = orcamento_ms / 1000
+        self.intervalo_max = intervalo_max
+        self.suavizacao = suavizacao
+        self.latencia = 0.0
+        self.intervalo = 1
+        self._contador = 0
+
+    def deve_processar(self):
+        self._contador += 1
+        if self._contador >= self.intervalo:
+            self._contador = 0
+            return True
+        return False
+
+    def registrar(self, latencia):
+        if self.latencia == 0.0:
+            self.latencia = latencia
+        else:
+            self.latencia += self.suavizacao * (latencia - self.latencia)
+
+        intervalo = math.ceil(self.latencia / self.orcamento)
+        self.intervalo = min(max(intervalo, 1), self.intervalo_max)
+
+
+# =====================================================
+# SESSÃO DE ANÁLISE FACIAL (UMA POR FLUXO DE VÍDEO)
+# =====================================================
+class SessaoFacial:
+    """
+    Estado de análise de um fluxo de vídeo: amostragem adaptativa sobre
+    o FaceMesh em modo de rastreamento. Entre frames seguidos o FaceMesh
+    só refaz a detecção quando perde o rosto, então o frame inteiro já
+    sai mais barato que um recorte em modo estático (que detecta sempre).
+    Os landmarks são sempre devolvidos em coordenadas normalizadas
+    do frame inteiro, como arrays (N, 3) float32.
+    """
+
+    def __init__(self, orcamento_ms=None, **perfil):
+        self.perfil = {**PERFIL_PADRAO, **perfil}
+        self.amostrador = (
+            AmostradorAdaptativo(orcamento_ms) if orcamento_ms else None
+        )
+
+    def deve_processar(self):
+        return self.amostrador is None or self.amostrador.deve_processar()
+
+    def processar(self, rgb):
+        """Roda o FaceMesh no frame RGB e devolve a lista de landmarks"""
+        inicio = time.perf_counter()
+
+        face_mesh = obter_face_mesh(**self.perfil)
+        with cronometrar("facemesh.process"):
+            resultado = face_mesh.process(rgb)
+        faces = _extrair(resultado)
+
+        if self.amostrador is not None:
+            self.amostrador.registrar(time.perf_counter() - inicio)
+
+        return faces
+
+
+# =====================================================
+# RECORTES (MODO SALA)
+# =====================================================
+def landmarks_no_recorte(rgb, caixa, lado, perfil):
+    """
+    Roda o FaceMesh só no recorte `caixa` (x0, y0, x1, y1 em pixels),
+    reduzido para no máximo `lado` px, e devolve os landmarks em
+    coordenadas normalizadas do frame inteiro.
+    """
+    h, w = rgb.shape[:2]
+    x0, y0, x1, y1 = caixa
+    recorte = rgb[y0:y1, x0:x1]
+    cw, ch = x1 - x0, y1 - y0
+
+    escala = lado / max(cw, ch)
+    if escala < 1:
+        recorte = cv2.resize(
+            recorte,
+            (max(round(cw * escala), 1), max(round(ch * escala), 1)),
+            interpolation=cv2.INTER_AREA,
+        )
+    else:
+        recorte = np.ascontiguousarray(recorte)
+
+    # Recortes de rostos diferentes se alternam na mesma instância: o
+    # modo estático evita que o rastreamento interno misture os rostos.
+    face_mesh = obter_face_mesh(**perfil, static_image_mode=True)
+    with cronometrar("facemesh.process_roi"):
+        resultado = face_mesh.process(recorte)
+    faces = _extrair(resultado)
+
+    for pts in faces:
+        pts[:, 0] = (x0 + pts[:, 0] * cw) / w
+        pts[:, 1] = (y0 + pts[:, 1] * ch) / h
+        pts[:, 2] *= cw / w
+
+    return faces
+
+
+def expandir_caixa(caixa, w, h, margem):
+    """Aumenta a caixa (pixels) em `margem` de cada lado, limitada ao frame"""
+    x_min, y_min, x_max, y_max = caixa
+    margem_x = (x_max - x_min) * margem
+    margem_y = (y_max - y_min) * margem
+
+    x0 = max(int(x_min - margem_x), 0)
+    y0 = max(int(y_min - margem_y), 0)
+    x1 = min(int(math.ceil(x_max + margem_x)), w)
+    y1 = min(int(math.ceil(y_max + margem_y)), h)
+
+    if x1 - x0 < 16 or y1 - y0 < 16:
+        return None
+
+    return x0, y0, x1, y1
+
+
+def _extrair(result):
+    if not result or not result.multi_face_landmarks:
+        return []
+    return [
+        landmarks_para_array(face.landmark)
+        for face in result.multi_face_landmarks
+    ]
+
+
+# =====================================================
+# DESENHO
+# =====================================================
+_segmentos_cache = {}
+
+
+def desenhar_landmarks(frame, pts, conexoes=None, cor=(0, 255, 0)):
+    """Desenha as conexões do FaceMesh a partir do array de landmarks"""
+    if conexoes is None:
+        conexoes = mp_face_mesh.FACEMESH_CONTOURS
+
+    pares = _segmentos_cache.get(id(conexoes))
+    if pares is None:
+        pares = np.array(sorted(conexoes), dtype=np.intp)
+        _segmentos_cache[id(conexoes)] = pares
+
+    h, w = frame.shape[:2]
+    px = (pts[:, :2] * (w, h)).astype(np.int32)
+    segmentos = px[pares]
+
+    cv2.polylines(frame, list(segmentos), False, cor, 1, cv2.LINE_AA)
+    return frame
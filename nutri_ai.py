@@ -1,27 +1,149 @@
-import os
-import streamlit as st
-from openai import OpenAI
+import asyncio
+import json
+import re
+import unicodedata
+from dataclasses import dataclass
+from typing import Optional
 
-# Tenta pegar do Streamlit Cloud
-api_key = st.secrets.get("OPENAI_API_KEY", None)
+from cache_lanches import CacheRespostas, normalizar_lanche
+from classificador_local import classificar_lanche
+from escrita_lote import obter_escrita
+from instrumentacao import contar, medir
+from llm import obter_api_key, obter_gateway
 
-# Fallback local (.env)
-if api_key is None:
-    api_key = os.getenv("OPENAI_API_KEY")
+# Tenta pegar do Streamlit Cloud; fallback local (.env).
+# Sem chave o módulo continua funcionando só com o classificador local;
+# o cliente da OpenAI só é criado na primeira consulta à IA.
+IA_DISPONIVEL = bool(obter_api_key())
 
-if not api_key:
-    raise ValueError("❌ OPENAI_API_KEY não configurada")
+# Abaixo disso o classificador local escala o lanche para a IA
+CONFIANCA_LOCAL = 0.8
 
-client = OpenAI(api_key=api_key)
+MENSAGEM_INDISPONIVEL = (
+    "⚠️ Não foi possível gerar a avaliação nutricional no momento."
+)
 
+# Lanches repetidos ("pão com manteiga", "bolacha recheada") respondem
+# do cache; pedidos iguais simultâneos viram uma única chamada.
+# A busca aproximada (ex.: 0.92) fica desligada: uma palavra como "zero"
+# ou "sem" muda a avaliação e quase não muda a razão de similaridade.
+SIMILARIDADE_CACHE = None
+cache_respostas = CacheRespostas(similaridade=SIMILARIDADE_CACHE)
 
+CLASSIFICACOES = ("Saudável", "Moderado", "Não recomendado")
+
+# lanches por requisição no modo em lote
+TAMANHO_LOTE = 15
+
+
+# =====================================================
+# AVALIAÇÃO ESTRUTURADA
+# =====================================================
+@dataclass(frozen=True)
+class AvaliacaoLanche:
+    descricao: str
+    classificacao: Optional[str]
+    explicacao: str
+    sugestao: str
+
+    def texto(self):
+        """Mesmo formato livre devolvido por avaliar_lanche"""
+        return (
+            f"Classificação: {self.classificacao or 'Indefinida'}\n\n"
+            f"Explicação:\n{self.explicacao}\n\n"
+            f"Sugestão:\n{self.sugestao}"
+        )
+
+
+def _sem_acentos(texto):
+    texto = unicodedata.normalize("NFKD", texto.lower())
+    return "".join(c for c in texto if not unicodedata.combining(c))
+
+
+def normalizar_classificacao(valor):
+    """Mapeia variações ('nao recomendado', 'SAUDÁVEL.') ao rótulo oficial"""
+    if not valor:
+        return None
+    valor = _sem_acentos(valor)
+    # "não recomendado" antes: contém palavras das outras classes
+    for classe in sorted(CLASSIFICACOES, key=len, reverse=True):
+        if _sem_acentos(classe) in valor:
+            return classe
+    return None
+
+
+_CAMPOS = re.compile(
+    r"Classifica[çc][ãa]o\s*:\s*(?P<classificacao>.*?)\s*"
+    r"(?:Explica[çc][ãa]o\s*:\s*(?P<explicacao>.*?)\s*)?"
+    r"(?:Sugest[ãa]o\s*:\s*(?P<sugestao>.*))?$",
+    re.IGNORECASE | re.DOTALL,
+)
+
+
+def avaliar_localmente(descricao):
+    """Registro do classificador local e sua confiança (ou None)"""
+    resultado = classificar_lanche(descricao)
+    if resultado is None:
+        return None, 0.0
+    avaliacao = AvaliacaoLanche(
+        descricao=descricao,
+        classificacao=resultado["classificacao"],
+        explicacao=resultado["explicacao"],
+        sugestao=resultado["sugestao"],
+    )
+    return avaliacao, resultado["confianca"]
+
+
+def interpretar_avaliacao(texto, descricao=""):
+    """Converte a resposta 'Classificação/Explicação/Sugestão' em registro"""
+    m = _CAMPOS.search(texto or "")
+    if m is None:
+        return AvaliacaoLanche(descricao, None, (texto or "").strip(), "")
+
+    return AvaliacaoLanche(
+        descricao=descricao,
+        classificacao=normalizar_classificacao(m["classificacao"]),
+        explicacao=(m["explicacao"] or "").strip(),
+        sugestao=(m["sugestao"] or "").strip(),
+    )
+
+
+# =====================================================
+# AVALIAÇÃO INDIVIDUAL
+# =====================================================
+@medir("nutri_ai.avaliar_lanche")
 def avaliar_lanche(descricao_lanche: str) -> str:
     """
     Envia o lanche para a IA avaliar (saudável / moderado / não recomendado),
     dando explicação simples e sugestões.
+
+    Lanches que o classificador local reconhece com segurança são
+    respondidos sem rede; só os ambíguos vão para a OpenAI.
     """
+    local, confianca = avaliar_localmente(descricao_lanche)
+    if local is not None and (
+        confianca >= CONFIANCA_LOCAL or not IA_DISPONIVEL
+    ):
+        contar("nutri_ai.resposta_local")
+        return local.texto()
+
+    if not IA_DISPONIVEL:
+        return MENSAGEM_INDISPONIVEL
+
+    contar("nutri_ai.resposta_ia")
+    conteudo = cache_respostas.obter_ou_calcular(
+        descricao_lanche,
+        lambda: _consultar_ia(descricao_lanche),
+    )
 
-    prompt = f"""
+    if conteudo is None:
+        return MENSAGEM_INDISPONIVEL
+
+    return conteudo
+
+
+def _prompt(descricao_lanche):
+    return f"""
     Você é um(a) tutor(a) nutricional amigável para crianças e adolescentes.
 
     Seu objetivo é ensinar alimentação saudável de forma simples, positiva
@@ -44,15 +166,162 @@ def avaliar_lanche(descricao_lanche: str) -> str:
     usando alimentos comuns do dia a dia.
     """
 
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[{"role": "user", "content": prompt}],
+
+def _consultar_ia(descricao_lanche: str):
+    """Chamada à OpenAI; retorna o texto ou None"""
+    return obter_gateway().completar_sync(
+        [{"role": "user", "content": _prompt(descricao_lanche)}],
         temperature=0.4
     )
 
-    conteudo = response.choices[0].message.content
 
-    if conteudo is None:
-        return "⚠️ Não foi possível gerar a avaliação nutricional no momento."
+# =====================================================
+# AVALIAÇÃO EM LOTE (TURMA INTEIRA)
+# =====================================================
+def _prompt_lote(descricoes):
+    itens = "\n".join(
+        f'{i}. "{descricao}"' for i, descricao in enumerate(descricoes)
+    )
+    return f"""
+    Você é um(a) tutor(a) nutricional amigável para crianças e adolescentes.
 
-    return conteudo
+    Avalie CADA lanche da lista abaixo, de forma simples, positiva
+    e sem julgamentos:
+
+    {itens}
+
+    Responda somente com JSON, no formato:
+    {{"avaliacoes": [
+        {{"indice": <número do lanche>,
+          "classificacao": "Saudável" | "Moderado" | "Não recomendado",
+          "explicacao": "<até 3 linhas, linguagem de estudante>",
+          "sugestao": "<dica prática com alimentos do dia a dia>"}}
+    ]}}
+    """
+
+
+async def _avaliar_lote(descricoes):
+    """Uma requisição JSON para vários lanches; devolve {indice: registro}"""
+    try:
+        conteudo = await obter_gateway().completar(
+            [{"role": "user", "content": _prompt_lote(descricoes)}],
+            temperature=0.4,
+            response_format={"type": "json_object"},
+        )
+        itens = json.loads(conteudo or "{}").get("avaliacoes", [])
+    except Exception:
+        # JSON inválido ou falha da requisição: cai para a individual
+        itens = []
+
+    resultado = {}
+    for item in itens:
+        if not isinstance(item, dict):
+            continue
+        i = item.get("indice")
+        if not isinstance(i, int) or not 0 <= i < len(descricoes):
+            continue
+        resultado[i] = AvaliacaoLanche(
+            descricao=descricoes[i],
+            classificacao=normalizar_classificacao(item.get("classificacao")),
+            explicacao=str(item.get("explicacao", "")).strip(),
+            sugestao=str(item.get("sugestao", "")).strip(),
+        )
+
+    # o que faltou na resposta em lote vai pela chamada individual
+    faltando = [i for i in range(len(descricoes)) if i not in resultado]
+    respostas = await asyncio.gather(
+        *[
+            obter_gateway().completar(
+                [{"role": "user", "content": _prompt(descricoes[i])}],
+                temperature=0.4,
+            )
+            for i in faltando
+        ],
+        return_exceptions=True,
+    )
+    for i, texto in zip(faltando, respostas):
+        if isinstance(texto, Exception):
+            texto = None
+        resultado[i] = interpretar_avaliacao(texto, descricoes[i])
+
+    return resultado
+
+
+def avaliar_lanches_lote(descricoes, tamanho_lote=TAMANHO_LOTE):
+    """
+    Avalia muitos lanches de uma vez, na ordem recebida.
+
+    Os óbvios saem do classificador local, repetidos e já conhecidos
+    saem do cache; os demais são agrupados em poucas requisições JSON
+    disparadas em paralelo (limitadas pelo semáforo do gateway).
+    """
+    registros = [None] * len(descricoes)
+    pendentes = {}
+
+    for i, descricao in enumerate(descricoes):
+        local, confianca = avaliar_localmente(descricao)
+        if local is not None and (
+            confianca >= CONFIANCA_LOCAL or not IA_DISPONIVEL
+        ):
+            contar("nutri_ai.resposta_local")
+            registros[i] = local
+            continue
+
+        texto = cache_respostas.obter(descricao) if IA_DISPONIVEL else None
+        if texto is not None:
+            registros[i] = interpretar_avaliacao(texto, descricao)
+        elif not IA_DISPONIVEL:
+            registros[i] = AvaliacaoLanche(
+                descricao, None, MENSAGEM_INDISPONIVEL, ""
+            )
+        else:
+            pendentes.setdefault(normalizar_lanche(descricao), []).append(i)
+
+    unicos = [descricoes[indices[0]] for indices in pendentes.values()]
+    lotes = [
+        unicos[i:i + tamanho_lote]
+        for i in range(0, len(unicos), tamanho_lote)
+    ]
+
+    async def _todos():
+        return await asyncio.gather(*[_avaliar_lote(lote) for lote in lotes])
+
+    resultados = obter_gateway().executar(_todos()) if lotes else []
+
+    avaliados = [
+        resultado[i]
+        for lote, resultado in zip(lotes, resultados)
+        for i in range(len(lote))
+    ]
+    for indices, avaliacao in zip(pendentes.values(), avaliados):
+        if avaliacao.classificacao is not None:
+            cache_respostas.guardar(avaliacao.descricao, avaliacao.texto())
+        for i in indices:
+            registros[i] = AvaliacaoLanche(
+                descricoes[i],
+                avaliacao.classificacao,
+                avaliacao.explicacao,
+                avaliacao.sugestao,
+            )
+
+    return registros
+
+
+def salvar_avaliacoes(usuario_ids, avaliacoes, emocao=None):
+    """
+    Registra as avaliações em historico_avaliacoes (uma linha por aluno)
+    pela escrita em lote; devolve o Future do commit.
+    """
+    return obter_escrita().enfileirar_varios(
+        """
+        INSERT INTO historico_avaliacoes
+        (usuario_id, avaliacao, resposta_ia, emocao_detectada,
+         classificacao)
+        VALUES (?, ?, ?, ?, ?)
+        """,
+        [
+            (uid, a.descricao, a.texto(), emocao, a.classificacao)
+            for uid, a in zip(usuario_ids, avaliacoes)
+        ],
+        usuario_ids=set(usuario_ids),
+    )
@@ -1,7 +1,6 @@
 import os
 import time
 import streamlit as st
-import numpy as np
 
 # =====================================================
 # CONFIGURAÇÃO DA PÁGINA
@@ -30,38 +29,13 @@ if IS_CLOUD:
 # =====================================================
 # IMPORTS LOCAIS (EXECUÇÃO LOCAL)
 # =====================================================
-import cv2
-import mediapipe as mp
-
-mp_face_mesh = mp.solutions.face_mesh
-mp_drawing = mp.solutions.drawing_utils
-
-# =====================================================
-# FUNÇÕES MATEMÁTICAS
-# =====================================================
-def calcular_ear(landmarks, idx):
-    p1 = np.array([landmarks[idx[1]].x, landmarks[idx[1]].y])
-    p2 = np.array([landmarks[idx[5]].x, landmarks[idx[5]].y])
-    p3 = np.array([landmarks[idx[0]].x, landmarks[idx[0]].y])
-    p4 = np.array([landmarks[idx[3]].x, landmarks[idx[3]].y])
-
-    vertical = np.linalg.norm(p1 - p2)
-    horizontal = np.linalg.norm(p3 - p4)
-
-    if horizontal == 0:
-        return 0.0
-
-    return float(vertical / horizontal)
-
-
-def classificar_estado(ear, pisc_min):
-    if ear < 0.18:
-        return "😴 Fadiga", "Sinais consistentes de sonolência."
-    if pisc_min > 25:
-        return "😵 Distração", "Piscadas excessivas detectadas."
-    if ear > 0.28:
-        return "😊 Foco", "Atenção visual estável."
-    return "😐 Neutro", "Estado cognitivo regular."
+from agregacao_turma import obter_agregacao
+from agregador_emocoes import Histerese, HistogramaRotulos
+from carregamento import cv2
+from estado_cognitivo import EstimadorPiscadas, classificar_estado
+from metricas_faciais import calcular_metricas
+from motor_facial import SessaoFacial, desenhar_landmarks
+from pipeline_video import PipelineVideo, ritmo
 
 # =====================================================
 # INTERFACE
@@ -78,6 +52,9 @@ col_cam, col_ctrl = st.columns([3, 1])
 with col_ctrl:
     st.subheader("⚙️ Controles")
 
+    aluno_id = st.number_input("ID do aluno", min_value=1, step=1, value=1)
+    disciplina = st.text_input("Disciplina da aula", value="").strip() or None
+
     iniciar = st.button("▶️ Iniciar Análise")
     parar = st.button("⏹️ Parar")
 
@@ -91,6 +68,13 @@ with col_ctrl:
         step=0.01,
     )
 
+    fps_alvo = st.slider(
+        "Atualização da tela (FPS)",
+        5,
+        30,
+        15,
+    )
+
 with col_cam:
     video_box = st.empty()
     estado_box = st.empty()
@@ -99,85 +83,103 @@ with col_cam:
 # =====================================================
 # LOOP PRINCIPAL
 # =====================================================
-if iniciar and not parar:
-    cap = cv2.VideoCapture(0)
+# Um rerun (ex.: clique em "Parar") interrompe o script; garante que
+# threads de uma execução anterior não continuem com a câmera aberta.
+pipeline_anterior = st.session_state.pop("pipeline_emocional", None)
+if pipeline_anterior is not None:
+    pipeline_anterior.parar()
 
-    with mp_face_mesh.FaceMesh(
-        max_num_faces=1,
-        refine_landmarks=True,
+if iniciar and not parar:
+    sessao = SessaoFacial(
         min_detection_confidence=0.6,
         min_tracking_confidence=0.6,
-    ) as face_mesh:
+    )
 
-        ear_hist = []
-        piscadas = 0
-        inicio = time.time()
+    estimador = EstimadorPiscadas(limiar=ear_limiar)
 
-        while cap.isOpened() and not parar:
-            ret, frame = cap.read()
-            if not ret:
-                break
+    # estado estável + fração recente do tempo em que ele foi o lido
+    histerese = Histerese(persistencia_s=1.0)
+    recentes = HistogramaRotulos(janela_s=10.0)
+    mensagens = {}
 
-            frame = cv2.flip(frame, 1)
-            rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            result = face_mesh.process(rgb)
+    def analisar(frame, t):
+        """Roda na thread de inferência (sem chamadas ao Streamlit)"""
+        frame = cv2.flip(frame, 1)
+        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
 
-            if result.multi_face_landmarks:
-                for face in result.multi_face_landmarks:
-                    lm = face.landmark
+        for pts in sessao.processar(rgb):
+            metricas = calcular_metricas(pts)
 
-                    ear_esq = calcular_ear(
-                        lm, [33, 160, 158, 133, 153, 144]
-                    )
-                    ear_dir = calcular_ear(
-                        lm, [362, 385, 387, 263, 373, 380]
-                    )
+            if metricas is not None:
+                estimador.atualizar(metricas["ear"], t)
 
-                    ear = (ear_esq + ear_dir) / 2
-                    ear_hist.append(ear)
+            desenhar_landmarks(frame, pts)
 
-                    if ear < ear_limiar:
-                        piscadas += 1
+        resultado = {"frame": frame, "estado": None}
+
+        if estimador.pronto:
+            ear_medio = estimador.ear_medio
+            pisc_min = int(estimador.piscadas_min(t))
+
+            lido, msg = classificar_estado(
+                ear_medio,
+                pisc_min,
+            )
+            mensagens[lido] = msg
+            recentes.atualizar(lido, t)
+            estado = histerese.atualizar(lido, t)
+
+            resultado["estado"] = {
+                "estado": estado,
+                "ear": ear_medio,
+                "piscadas_min": pisc_min,
+                "perclos": estimador.perclos,
+                "confianca": recentes.distribuicao().get(estado, 0.0),
+                "timestamp": t,
+            }
+            resultado["mensagem"] = mensagens[estado]
+
+        return resultado
+
+    agregacao = obter_agregacao()
+    pipeline = PipelineVideo(0, analisar).iniciar()
+    st.session_state["pipeline_emocional"] = pipeline
+
+    try:
+        for _ in ritmo(fps_alvo):
+            if not pipeline.ativo:
+                break
 
-                    mp_drawing.draw_landmarks(
-                        frame,
-                        face,
-                        mp_face_mesh.FACEMESH_CONTOURS,
-                    )
+            resultado = pipeline.resultados.retirar(timeout=1 / fps_alvo)
+            if resultado is None:
+                continue
 
             video_box.image(
-                frame,
+                resultado["frame"],
                 channels="BGR",
                 use_container_width=True,
             )
 
-            if len(ear_hist) >= 30:
-                ear_medio = float(np.mean(ear_hist[-30:]))
-                pisc_min = int(
-                    piscadas / max((time.time() - inicio) / 60, 1)
-                )
-
-                estado, msg = classificar_estado(
-                    ear_medio,
-                    pisc_min,
+            estado_cognitivo = resultado["estado"]
+            if estado_cognitivo is not None:
+                st.session_state["estado_cognitivo"] = estado_cognitivo
+                # alimenta o Painel do Professor em tempo real
+                agregacao.registrar_cognitivo(
+                    aluno_id, estado_cognitivo, disciplina=disciplina
                 )
 
-                st.session_state["estado_cognitivo"] = {
-                    "estado": estado,
-                    "ear": ear_medio,
-                    "piscadas_min": pisc_min,
-                    "timestamp": time.time(),
-                }
-
                 metric_box.metric(
                     "EAR Médio",
-                    f"{ear_medio:.3f}",
+                    f"{estado_cognitivo['ear']:.3f}",
                 )
-                
+
                 estado_box.info(
-                    f"**{estado}**\n\n{msg}",
+                    f"**{estado_cognitivo['estado']}**\n\n"
+                    f"{resultado['mensagem']}",
                 )
+    finally:
+        pipeline.parar()
+        st.session_state.pop("pipeline_emocional", None)
 
-            time.sleep(0.03)
-
-    cap.release()
+    if pipeline.erro is not None:
+        st.error(f"Erro na análise de vídeo: {pipeline.erro}")
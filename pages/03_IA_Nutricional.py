@@ -97,6 +97,15 @@ resultado = recomendacao_nutricional(estado, ear, piscadas)
 
 st.subheader("🧠 Estado Cognitivo Atual")
 st.success(estado)
+st.progress(
+    min(max(confianca, 0.0), 1.0),
+    text=f"Confiança da leitura: {confianca:.0%}",
+)
+if confianca < 0.5:
+    st.warning(
+        "⚠️ Leitura instável nos últimos segundos; "
+        "a recomendação pode mudar."
+    )
 
 st.subheader(f"🥗 Estratégia Nutricional: {resultado['categoria']}")
 
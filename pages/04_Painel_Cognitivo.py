@@ -1,6 +1,11 @@
 import streamlit as st
-import pandas as pd
-import sqlite3  # ADICIONADO - estava faltando
+from datetime import datetime, time, timedelta
+
+import consultas
+from cache_dados import cache
+from database import inicializar
+from escrita_lote import obter_escrita
+from instrumentacao import medir
 
 # Configuração da página
 st.set_page_config(
@@ -8,62 +13,50 @@ st.set_page_config(
 )
 
 
-def conectar_bd():
-    """Conecta ao banco de dados"""
+def preparar_bd():
+    """Garante o esquema do banco (executa uma vez por processo)"""
     try:
-        conn = sqlite3.connect("nutriedu.db")
-        # Criar tabela se não existir
-        conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS desempenho_cognitivo (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                aluno_id INTEGER,
-                nome TEXT,
-                idade INTEGER,
-                disciplina TEXT,
-                nota REAL,
-                estado_emocional TEXT,
-                data_avaliacao DATETIME DEFAULT CURRENT_TIMESTAMP
-            )
-        """
-        )
-        conn.commit()
-        return conn
+        inicializar()
+        return True
     except Exception as e:
         st.error(f"Erro ao conectar ao banco: {e}")
-        return None
+        return False
+
 
+TAMANHO_PAGINA = 50
 
+
+@medir("painel_cognitivo.carregar_dados")
 def carregar_dados():
-    """Carrega dados do banco"""
-    conn = conectar_bd()
-    if conn is None:
-        return pd.DataFrame()
+    """Carrega o resumo e as opções de filtro (agregados no banco, em cache)"""
+    if not preparar_bd():
+        return None
 
     try:
-        query = """
-            SELECT
-                nome,
-                idade,
-                disciplina,
-                nota,
-                estado_emocional,
-                data_avaliacao
-            FROM desempenho_cognitivo
-            ORDER BY data_avaliacao DESC
-        """
-        df = pd.read_sql_query(query, conn)
-        conn.close()
-        return df
+        return {
+            "resumo": consultas.resumo(),
+            "alunos": consultas.listar_alunos(),
+            "disciplinas": consultas.listar_disciplinas(),
+        }
     except Exception as e:
         st.warning(f"Erro ao carregar dados: {e}")
-        return pd.DataFrame()
+        return None
+
+
+def _periodo_epoch(periodo):
+    """Converte o intervalo do date_input em (inicio, fim) epoch"""
+    inicio = fim = None
+    if len(periodo) >= 1:
+        inicio = int(datetime.combine(periodo[0], time.min).timestamp())
+    if len(periodo) == 2:
+        fim_dia = periodo[1] + timedelta(days=1)
+        fim = int(datetime.combine(fim_dia, time.min).timestamp())
+    return inicio, fim
 
 
 def inserir_dados_exemplo():
     """Insere dados de exemplo para demonstração"""
-    conn = conectar_bd()
-    if conn is None:
+    if not preparar_bd():
         return
 
     try:
@@ -76,17 +69,22 @@ def inserir_dados_exemplo():
             (3, "Carla Santos", 14, "Geografia", 8.8, "Focado"),
         ]
 
-        conn.executemany(
+        escrita = obter_escrita()
+        usuarios = {(a, nome, idade) for a, nome, idade, *_ in dados_exemplo}
+        # usuários com nome e idade antes das linhas que apontam para eles
+        escrita.enfileirar_varios(
+            "INSERT OR IGNORE INTO usuarios (id, nome, idade) VALUES (?, ?, ?)",
+            usuarios,
+        ).result(timeout=30)
+        escrita.enfileirar_varios(
             """
             INSERT INTO desempenho_cognitivo
             (aluno_id, nome, idade, disciplina, nota, estado_emocional)
             VALUES (?, ?, ?, ?, ?, ?)
         """,
             dados_exemplo,
-        )
+        ).result(timeout=30)
 
-        conn.commit()
-        conn.close()
         st.success("✅ Dados de exemplo inseridos!")
     except Exception as e:
         st.error(f"Erro ao inserir dados: {e}")
@@ -115,9 +113,9 @@ def main():
             st.rerun()
 
     # Carregar dados
-    df = carregar_dados()
+    dados = carregar_dados()
 
-    if df.empty:
+    if not dados or dados["resumo"]["total_avaliacoes"] == 0:
         st.info(
             """
         📝 Nenhum dado encontrado.
@@ -127,81 +125,116 @@ def main():
         )
         return
 
+    resumo = dados["resumo"]
+
     # Métricas gerais
     st.subheader("📈 Visão Geral")
 
     col1, col2, col3, col4 = st.columns(4)
 
     with col1:
-        st.metric("Total de Alunos", df["nome"].nunique())
+        st.metric("Total de Alunos", resumo["total_alunos"])
 
     with col2:
-        st.metric("Média Geral", f"{df['nota'].mean():.2f}")
+        st.metric("Média Geral", f"{resumo['media_geral'] or 0:.2f}")
 
     with col3:
-        focados = (df["estado_emocional"] == "Focado").sum()
-        st.metric("Alunos Focados", focados)
+        st.metric("Alunos Focados", resumo["focados"])
 
     with col4:
-        total_avaliacoes = len(df)
-        st.metric("Total de Avaliações", total_avaliacoes)
+        st.metric("Total de Avaliações", resumo["total_avaliacoes"])
 
     # Tabela de dados
     st.divider()
     st.subheader("📋 Dados Detalhados")
 
     # Filtros
-    col1, col2 = st.columns(2)
+    col1, col2, col3 = st.columns(3)
+
+    nomes = dict(dados["alunos"])
 
     with col1:
-        alunos = ["Todos"] + sorted(df["nome"].unique().tolist())
-        aluno_selecionado = st.selectbox("Filtrar por aluno:", alunos)
+        aluno_id = st.selectbox(
+            "Filtrar por aluno:",
+            [None] + list(nomes),
+            format_func=lambda a: "Todos" if a is None else nomes[a],
+        )
 
     with col2:
-        disciplinas = ["Todas"] + sorted(df["disciplina"].unique().tolist())
+        disciplinas = ["Todas"] + dados["disciplinas"]
         disciplina_selecionada = st.selectbox("Filtrar por disciplina:", disciplinas)
 
-    # Aplicar filtros
-    df_filtrado = df.copy()
+    with col3:
+        periodo = st.date_input("Período:", value=())
+
+    inicio, fim = _periodo_epoch(periodo)
+    filtros = {
+        "aluno_id": aluno_id,
+        "disciplina": (
+            None if disciplina_selecionada == "Todas" else disciplina_selecionada
+        ),
+        "inicio": inicio,
+        "fim": fim,
+    }
+
+    # Paginação por chave: uma pilha de cursores por combinação de filtros
+    chave_filtros = tuple(sorted(filtros.items()))
+    if st.session_state.get("painel_filtros") != chave_filtros:
+        st.session_state.painel_filtros = chave_filtros
+        st.session_state.painel_cursores = [None]
+
+    cursores = st.session_state.painel_cursores
+    df_pagina, proximo = consultas.pagina_detalhes(
+        TAMANHO_PAGINA, cursores[-1], **filtros
+    )
 
-    if aluno_selecionado != "Todos":
-        df_filtrado = df_filtrado[df_filtrado["nome"] == aluno_selecionado]
+    # Mostrar tabela
+    st.dataframe(
+        df_pagina.drop(columns="id"), use_container_width=True, hide_index=True
+    )
 
-    if disciplina_selecionada != "Todas":
-        df_filtrado = df_filtrado[df_filtrado["disciplina"] == disciplina_selecionada]
+    nav1, nav2, nav3 = st.columns([1, 1, 4])
 
-    # Mostrar tabela
-    st.dataframe(df_filtrado, use_container_width=True, hide_index=True)
+    with nav1:
+        if st.button("◀️ Anterior", disabled=len(cursores) == 1):
+            cursores.pop()
+            st.rerun()
+
+    with nav2:
+        if st.button("Próxima ▶️", disabled=proximo is None):
+            cursores.append(proximo)
+            st.rerun()
+
+    with nav3:
+        st.caption(f"Página {len(cursores)}")
 
     # Análise por aluno
-    if aluno_selecionado != "Todos":
+    if aluno_id is not None:
         st.divider()
-        st.subheader(f"📊 Análise: {aluno_selecionado}")
-
-        dados_aluno = df[df["nome"] == aluno_selecionado]
+        st.subheader(f"📊 Análise: {nomes[aluno_id]}")
 
         col1, col2 = st.columns(2)
 
         with col1:
             st.write("**Notas por Disciplina:**")
-            for _, row in dados_aluno.iterrows():
-                st.write(f"- {row['disciplina']}: {row['nota']}")
+            notas = consultas.media_por_disciplina(aluno_id=aluno_id)
+            for disciplina, nota in notas.items():
+                st.write(f"- {disciplina}: {nota:.1f}")
 
         with col2:
             st.write("**Estado Emocional:**")
-            estados = dados_aluno["estado_emocional"].value_counts()
+            estados = consultas.contagem_emocoes(aluno_id=aluno_id)
             for estado, count in estados.items():
                 st.write(f"- {estado}: {count}x")
 
     # Gráfico simples (opcional)
-    if len(df_filtrado) > 0:
+    medias = consultas.media_por_disciplina(**filtros)
+    if not medias.empty:
         st.divider()
         st.subheader("📊 Visualização")
 
         # Gráfico de barras usando Streamlit nativo
-        st.bar_chart(
-            df_filtrado.groupby("disciplina")["nota"].mean(), use_container_width=True
-        )
+        st.bar_chart(medias, use_container_width=True)
 
     # Footer
     st.divider()
@@ -212,6 +245,13 @@ def main():
     """
     )
 
+    stats = cache.estatisticas()
+    st.caption(
+        f"🗄️ Cache de consultas: {stats['taxa_acerto']:.0%} de acertos "
+        f"({stats['acertos']} acertos, {stats['falhas']} falhas, "
+        f"{stats['invalidacoes']} invalidações)"
+    )
+
 
 if __name__ == "__main__":
     main()
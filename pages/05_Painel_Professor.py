@@ -8,6 +8,20 @@ import numpy as np
 import time
 from datetime import datetime
 
+from agregacao_turma import obter_agregacao
+from cache_dados import cache
+from canal_estado import canal_da_sessao
+from estatisticas import obter_estatisticas
+from carregamento import av, disponivel
+from instrumentacao import cronometrar, medir
+
+try:
+    from streamlit_webrtc import webrtc_streamer, WebRtcMode
+
+    WEBRTC_DISPONIVEL = True
+except Exception:
+    WEBRTC_DISPONIVEL = False
+
 # =====================================================
 # CONFIGURAÇÃO DA PÁGINA
 # =====================================================
@@ -21,21 +35,183 @@ st.title("🧑‍🏫 Painel do Professor")
 st.caption("Monitoramento cognitivo e nutricional baseado em IA")
 
 # =====================================================
-# SIMULAÇÃO DE DADOS (SUBSTITUÍVEL POR BANCO)
+# DADOS DA TURMA (AGREGAÇÃO EM TEMPO REAL)
 # =====================================================
+agregacao = obter_agregacao()
+
+
+# turma de demonstração: cinco linhas, montadas a cada uso (cada
+# sessão recebe o próprio DataFrame)
+DADOS_SIMULADOS = {
+    "ID": [1, 2, 3, 4, 5],
+    "Aluno": ["Ana", "Bruno", "Carlos", "Daniela", "Eduardo"],
+    "Estado_Cognitivo": ["Focado", "Normal", "Fadiga", "Distraído", "Focado"],
+    "Nivel_Foco": [0.78, 0.55, 0.32, 0.40, 0.82],
+    "Fadiga": [0.20, 0.40, 0.75, 0.60, 0.18],
+    "Alimentacao_Pre_Aula": ["Adequada", "Inadequada", "Inadequada", "Adequada", "Adequada"],
+    "Hidratacao": ["Boa", "Baixa", "Baixa", "Boa", "Boa"]
+}
 
+
+def rotulo_nutricao(valor):
+    if pd.isna(valor):
+        return "Sem registro"
+    return "Adequada" if valor >= 0.5 else "Inadequada"
+
+
+@medir("painel_professor.carregar_dados")
 def carregar_dados():
-    data = {
-        "Aluno": ["Ana", "Bruno", "Carlos", "Daniela", "Eduardo"],
-        "Estado_Cognitivo": ["Focado", "Normal", "Fadiga", "Distraído", "Focado"],
-        "Nivel_Foco": [0.78, 0.55, 0.32, 0.40, 0.82],
-        "Fadiga": [0.20, 0.40, 0.75, 0.60, 0.18],
-        "Alimentacao_Pre_Aula": ["Adequada", "Inadequada", "Inadequada", "Adequada", "Adequada"],
-        "Hidratacao": ["Boa", "Baixa", "Baixa", "Boa", "Boa"]
-    }
-    return pd.DataFrame(data)
+    """
+    Instantâneo da agregação (O(alunos), sem reler o histórico) e o
+    resumo da turma; sem nenhuma amostra ainda, a turma de demonstração.
+    """
+    instantaneo = agregacao.instantaneo()
+    if not instantaneo["alunos"]:
+        return pd.DataFrame(DADOS_SIMULADOS), None
+
+    df = pd.DataFrame(instantaneo["alunos"])
+    # alunos só com lanche ou resposta (sem amostra da câmera) têm os
+    # índices em None: float com NaN, para gráficos e comparações
+    for coluna in ("Nivel_Foco", "Fadiga", "Nutricao"):
+        df[coluna] = pd.to_numeric(df[coluna], errors="coerce")
+    df["Alimentacao_Pre_Aula"] = df["Nutricao"].map(rotulo_nutricao)
+    df["Hidratacao"] = "—"
+    return df, instantaneo["turma"]
+
 
-df = carregar_dados()
+def percentual(valor):
+    return "—" if pd.isna(valor) else f"{valor * 100:.0f}%"
+
+
+df, resumo_turma = carregar_dados()
+
+if resumo_turma is None:
+    st.info(
+        "ℹ️ Nenhuma leitura ao vivo ainda (IA Emocional, Avaliação IA, "
+        "Modo Sala ou lanches): exibindo uma turma de demonstração."
+    )
+
+# =====================================================
+# MODO SALA (CÂMERA DA TURMA)
+# =====================================================
+# leituras mais velhas que isso (câmera parada) não são listadas
+VALIDADE_LEITURAS_S = 5.0
+
+
+class SalaVideoProcessor:
+    # roda na thread do webrtc: nada de st.* aqui, só o canal e a
+    # agregação (thread-safe)
+    def __init__(self, canal, associacao, aula):
+        from modo_sala import SalaDeAula
+
+        self.sala = SalaDeAula()
+        self.canal = canal
+        # trilha -> (aluno_id, nome), preenchido pelo professor na página
+        self.associacao = associacao
+        # {"disciplina": ...}, atualizado pela página a cada rerun
+        self.aula = aula
+        self._registradas = {}
+
+    @medir("painel_professor.recv")
+    def recv(self, frame: "av.VideoFrame") -> "av.VideoFrame":
+        from modo_sala import desenhar_trilhas
+
+        rgb = frame.to_ndarray(format="rgb24")
+        if not rgb.flags.writeable:
+            rgb = rgb.copy()
+        self.sala.processar(rgb)
+        leituras = self.sala.leituras()
+        self.canal.publicar(leituras)
+        self._registrar(leituras)
+
+        desenhar_trilhas(rgb, leituras)
+        saida = av.VideoFrame.from_ndarray(rgb, format="rgb24")
+        saida.pts = frame.pts
+        saida.time_base = frame.time_base
+        return saida
+
+    def _registrar(self, leituras):
+        """Envia à agregação só as trilhas associadas e com leitura nova"""
+        for leitura in leituras:
+            trilha = leitura["trilha"]
+            aluno = self.associacao.get(trilha)
+            if aluno is None or not leitura["Estado_Cognitivo"]:
+                continue
+            if self._registradas.get(trilha) == leitura["leituras"]:
+                continue
+            self._registradas[trilha] = leitura["leituras"]
+            aluno_id, nome = aluno
+            agregacao.registrar_cognitivo(
+                aluno_id,
+                {
+                    "estado": leitura["Estado_Cognitivo"],
+                    "ear": leitura["ear_medio"],
+                    "piscadas_min": leitura["piscadas_min"],
+                    "perclos": leitura["perclos"],
+                },
+                nome=nome,
+                disciplina=self.aula.get("disciplina"),
+            )
+
+
+st.subheader("🎥 Modo Sala")
+
+if st.toggle("Analisar a turma pela câmera da sala", key="modo_sala"):
+    if not WEBRTC_DISPONIVEL:
+        st.error("streamlit-webrtc não disponível no ambiente.")
+    elif not disponivel("mediapipe"):
+        st.error("MediaPipe não disponível no ambiente.")
+    else:
+        canal_sala = canal_da_sessao(st.session_state, "canal_sala")
+        associacao = st.session_state.setdefault("associacao_sala", {})
+        aula = st.session_state.setdefault("aula_sala", {})
+        aula["disciplina"] = (
+            st.text_input("Disciplina da aula", key="disciplina_sala").strip()
+            or None
+        )
+
+        webrtc_streamer(
+            key="modo_sala_camera",
+            mode=WebRtcMode.SENDRECV,
+            video_processor_factory=lambda: SalaVideoProcessor(
+                canal_sala, associacao, aula
+            ),
+            media_stream_constraints={"video": True, "audio": False},
+            async_processing=True,
+        )
+
+        leituras = canal_sala.valor([], max_idade_s=VALIDADE_LEITURAS_S)
+        st.caption(
+            f"{len(leituras)} rosto(s) acompanhados. Associe cada número "
+            "da câmera a um aluno para usar as leituras no painel."
+        )
+        if leituras:
+            import consultas
+            from database import inicializar
+
+            inicializar()
+            # alunos cadastrados, e não só os que já têm leituras
+            nomes = dict(consultas.listar_usuarios())
+            if not nomes:
+                st.warning(
+                    "Nenhum aluno cadastrado ainda: cadastre os alunos "
+                    "para associar os rostos."
+                )
+            opcoes = [None] + list(nomes)
+            colunas = st.columns(min(len(leituras), 4))
+            for i, leitura in enumerate(leituras):
+                trilha = leitura["trilha"]
+                atual = (associacao.get(trilha) or (None,))[0]
+                escolha = colunas[i % len(colunas)].selectbox(
+                    f"Rosto #{trilha}",
+                    opcoes,
+                    index=opcoes.index(atual) if atual in opcoes else 0,
+                    format_func=lambda a: "—" if a is None else nomes[a],
+                    key=f"rosto_sala_{trilha}",
+                )
+                associacao[trilha] = (
+                    None if escolha is None else (escolha, nomes[escolha])
+                )
 
 # =====================================================
 # DASHBOARD GERAL
@@ -44,10 +220,17 @@ st.subheader("📊 Visão Geral da Turma")
 
 col1, col2, col3, col4 = st.columns(4)
 
+# contagem mantida pela agregação; na demonstração, conta no df
+estados = (
+    resumo_turma["estados"]
+    if resumo_turma is not None
+    else df["Estado_Cognitivo"].value_counts().to_dict()
+)
+
 col1.metric("👥 Alunos Ativos", len(df))
-col2.metric("😊 Focados", (df["Estado_Cognitivo"] == "Focado").sum())
-col3.metric("😴 Em Fadiga", (df["Estado_Cognitivo"] == "Fadiga").sum())
-col4.metric("😵 Distraídos", (df["Estado_Cognitivo"] == "Distraído").sum())
+col2.metric("😊 Focados", estados.get("Focado", 0))
+col3.metric("😴 Em Fadiga", estados.get("Fadiga", 0))
+col4.metric("😵 Distraídos", estados.get("Distraído", 0))
 
 # =====================================================
 # GRÁFICOS
@@ -67,14 +250,86 @@ with g2:
 # =====================================================
 st.subheader("🥗 Correlação Nutricional")
 
-nutricao_map = {"Adequada": 1, "Inadequada": 0}
-df["Alimentacao_Num"] = df["Alimentacao_Pre_Aula"].map(nutricao_map)
-
-correlacao = df["Nivel_Foco"].corr(df["Alimentacao_Num"])
+if resumo_turma is not None:
+    # mantida pela agregação a cada amostra (somas correntes)
+    correlacao = resumo_turma["correlacao_nutricao_foco"]
+else:
+    nutricao_map = {"Adequada": 1, "Inadequada": 0}
+    # df vem do cache compartilhado: não alterar in-place
+    alimentacao_num = df["Alimentacao_Pre_Aula"].map(nutricao_map)
+    correlacao = df["Nivel_Foco"].corr(alimentacao_num)
+
+if correlacao is None or pd.isna(correlacao):
+    st.info(
+        "📌 Correlação entre alimentação e foco: dados insuficientes "
+        "(são necessários alunos com lanche e leitura cognitiva)."
+    )
+else:
+    st.info(
+        f"📌 Correlação entre alimentação adequada e foco cognitivo: **{correlacao:.2f}**"
+    )
 
-st.info(
-    f"📌 Correlação entre alimentação adequada e foco cognitivo: **{correlacao:.2f}**"
+# =====================================================
+# ANO LETIVO (ESTATÍSTICAS INCREMENTAIS)
+# =====================================================
+st.subheader("📆 Ano Letivo")
+
+estatisticas = obter_estatisticas()
+ESCOPOS_ANO = {
+    "escola": "🏫 Escola toda",
+    "turma": "👥 Turma",
+    "disciplina": "📚 Disciplina",
+    "aluno": "👤 Aluno",
+}
+
+a1, a2 = st.columns(2)
+escopo = a1.selectbox(
+    "Agrupar por", list(ESCOPOS_ANO), format_func=ESCOPOS_ANO.get
+)
+chaves_ano = (
+    ["geral"] if escopo == "escola" else estatisticas.chaves(escopo)
 )
+nomes_ano = dict(zip(df["ID"].astype(str), df["Aluno"]))
+chave_ano = a2.selectbox(
+    "Grupo",
+    chaves_ano,
+    format_func=lambda c: nomes_ano.get(c, c) if escopo == "aluno" else c,
+)
+
+# custo constante: lê só os acumuladores do grupo
+ano = estatisticas.resumo(escopo, chave_ano) if chave_ano else None
+if not ano:
+    st.caption("Ainda não há amostras acumuladas para este grupo.")
+else:
+    b1, b2, b3, b4 = st.columns(4)
+    b1.metric("🧮 Amostras", f"{ano['amostras']:,}".replace(",", "."))
+    b2.metric(
+        "🎯 Foco médio",
+        percentual(ano["foco_medio"]),
+        (
+            f"± {ano['foco_desvio'] * 100:.0f} p.p."
+            if ano["foco_desvio"] is not None
+            else None
+        ),
+        delta_color="off",
+    )
+    tendencia = ano["tendencia_foco_semana"]
+    b3.metric(
+        "📈 Foco recente",
+        percentual(ano["foco_recente"]),
+        (
+            f"{tendencia * 100:+.1f} p.p./semana"
+            if tendencia is not None
+            else None
+        ),
+    )
+    correlacao_ano = ano["correlacao_nutricao_foco"]
+    b4.metric(
+        "🥗 Nutrição × foco",
+        "—" if correlacao_ano is None else f"{correlacao_ano:.2f}",
+        f"{ano['amostras_nutricao']} amostras com lanche",
+        delta_color="off",
+    )
 
 # =====================================================
 # MONITORAMENTO INDIVIDUAL
@@ -87,9 +342,9 @@ dados_aluno = df[df["Aluno"] == aluno_sel].iloc[0]
 
 c1, c2, c3 = st.columns(3)
 
-c1.metric("🧠 Estado Cognitivo", dados_aluno["Estado_Cognitivo"])
-c2.metric("🎯 Nível de Foco", f"{dados_aluno['Nivel_Foco']*100:.0f}%")
-c3.metric("😴 Fadiga", f"{dados_aluno['Fadiga']*100:.0f}%")
+c1.metric("🧠 Estado Cognitivo", dados_aluno["Estado_Cognitivo"] or "—")
+c2.metric("🎯 Nível de Foco", percentual(dados_aluno["Nivel_Foco"]))
+c3.metric("😴 Fadiga", percentual(dados_aluno["Fadiga"]))
 
 st.write("🍽️ Alimentação pré-aula:", dados_aluno["Alimentacao_Pre_Aula"])
 st.write("💧 Hidratação:", dados_aluno["Hidratacao"])
@@ -100,11 +355,12 @@ st.write("💧 Hidratação:", dados_aluno["Hidratacao"])
 st.subheader("🚨 Alertas Inteligentes")
 
 alertas = []
+foco, fadiga = dados_aluno["Nivel_Foco"], dados_aluno["Fadiga"]
 
-if dados_aluno["Nivel_Foco"] < 0.45:
+if pd.notna(foco) and foco < 0.45:
     alertas.append("⚠️ Baixo nível de foco detectado.")
 
-if dados_aluno["Fadiga"] > 0.65:
+if pd.notna(fadiga) and fadiga > 0.65:
     alertas.append("⚠️ Alto nível de fadiga.")
 
 if dados_aluno["Alimentacao_Pre_Aula"] == "Inadequada":
@@ -121,15 +377,69 @@ else:
 # =====================================================
 st.subheader("💡 Sugestões Pedagógicas")
 
-if dados_aluno["Fadiga"] > 0.6:
+if pd.notna(fadiga) and fadiga > 0.6:
     st.info("🧠 Sugere-se pausa ativa ou atividade lúdica.")
 
-if dados_aluno["Nivel_Foco"] < 0.4:
+if pd.notna(foco) and foco < 0.4:
     st.info("📚 Recomenda-se revisão do conteúdo ou abordagem multimodal.")
 
 if dados_aluno["Alimentacao_Pre_Aula"] == "Inadequada":
     st.info("🥗 Orientar sobre alimentação antes das aulas.")
 
+# =====================================================
+# LANCHES DA TURMA (AVALIAÇÃO EM LOTE)
+# =====================================================
+st.subheader("🍎 Lanches da Turma")
+
+registro_lanches = st.text_area(
+    "Registro de lanches (uma linha por aluno: ID; lanche)",
+    placeholder="1; pão com manteiga\n2; maçã e iogurte",
+)
+
+if st.button("🧪 Avaliar lanches da turma"):
+    ids, lanches = [], []
+    for linha in registro_lanches.splitlines():
+        aluno, _, lanche = linha.partition(";")
+        if aluno.strip().isdigit() and lanche.strip():
+            ids.append(int(aluno))
+            lanches.append(lanche.strip())
+
+    if not lanches:
+        st.warning("Nenhuma linha válida no formato 'ID; lanche'.")
+    else:
+        import nutri_ai
+
+        if not nutri_ai.IA_DISPONIVEL:
+            st.info("ℹ️ Sem OPENAI_API_KEY: usando apenas o classificador local.")
+
+        with st.spinner(f"Avaliando {len(lanches)} lanches..."):
+            avaliacoes = nutri_ai.avaliar_lanches_lote(lanches)
+            futuro = nutri_ai.salvar_avaliacoes(ids, avaliacoes)
+
+        with st.spinner("Salvando..."):
+            try:
+                futuro.result(timeout=30)
+            except Exception as e:
+                st.error(f"❌ As avaliações não foram salvas: {e}")
+            else:
+                st.success("Avaliações salvas no histórico dos alunos.")
+
+        for aluno_id, avaliacao in zip(ids, avaliacoes):
+            agregacao.registrar_nutricao(aluno_id, avaliacao.classificacao)
+
+        st.dataframe(
+            pd.DataFrame(
+                {
+                    "Aluno": ids,
+                    "Lanche": [a.descricao for a in avaliacoes],
+                    "Classificação": [a.classificacao for a in avaliacoes],
+                    "Explicação": [a.explicacao for a in avaliacoes],
+                    "Sugestão": [a.sugestao for a in avaliacoes],
+                }
+            ),
+            hide_index=True,
+        )
+
 # =====================================================
 # RELATÓRIOS
 # =====================================================
@@ -139,6 +449,32 @@ if st.button("📥 Gerar Relatório da Turma"):
     st.success("Relatório gerado com sucesso!")
     st.dataframe(df)
 
+    if disponivel("pyarrow"):
+        import consultas
+        from arquivo_parquet import para_parquet
+        from database import inicializar
+
+        inicializar()
+        # banco + arquivo Parquet: anos letivos inteiros em um arquivo
+        with cronometrar("professor.exportar_historico"):
+            historico = consultas.historico()
+
+        col_turma, col_historico = st.columns(2)
+        col_turma.download_button(
+            "⬇️ Turma agora (Parquet)",
+            para_parquet(df),
+            file_name="nutriedu_turma.parquet",
+            mime="application/vnd.apache.parquet",
+        )
+        col_historico.download_button(
+            f"⬇️ Histórico ({historico.num_rows} avaliações, Parquet)",
+            para_parquet(historico),
+            file_name="nutriedu_historico.parquet",
+            mime="application/vnd.apache.parquet",
+        )
+    else:
+        st.caption("Instale o pyarrow para exportar em Parquet.")
+
 # =====================================================
 # ÉTICA E PRIVACIDADE
 # =====================================================
@@ -147,3 +483,9 @@ st.caption(
     "🔒 Os dados apresentados são anonimizados e utilizados exclusivamente "
     "para fins educacionais, respeitando princípios éticos e a LGPD."
 )
+
+stats = cache.estatisticas()
+st.caption(
+    f"🗄️ Cache de dados: {stats['taxa_acerto']:.0%} de acertos "
+    f"({stats['acertos']} acertos, {stats['falhas']} falhas)"
+)
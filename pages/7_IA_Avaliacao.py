@@ -1,19 +1,25 @@
 # pages/7_Avaliacao_IA.py
 import streamlit as st
-import sqlite3
+import time
 from datetime import datetime
-import cv2
+from functools import lru_cache
+
 import numpy as np
-import av
 
-# try imports for mediapipe and webrtc
-try:
-    import mediapipe as mp
+from agregacao_turma import obter_agregacao
+from agregador_emocoes import AgregadorEmocoes
+from canal_estado import canal_da_sessao
+from carregamento import av, cv2, disponivel, pd
+from database import conectar, inicializar
+from escrita_lote import obter_escrita
+from instrumentacao import medir
+from metricas_faciais import calcular_metricas
+from motor_facial import SessaoFacial
 
-    MEDIAPIPE_DISPONIVEL = True
-except Exception:
-    MEDIAPIPE_DISPONIVEL = False
+# mediapipe só é importado no primeiro frame analisado
+MEDIAPIPE_DISPONIVEL = disponivel("mediapipe")
 
+# try imports for webrtc
 try:
     from streamlit_webrtc import webrtc_streamer, WebRtcMode, VideoProcessorBase
 
@@ -45,36 +51,7 @@ QUESTOES = [
     "10. Como você se sente fisicamente durante as aulas?",
 ]
 
-DB_PATH = "nutriedu.db"
-
-
-# ---------- DB helpers ----------
-def conectar():
-    return sqlite3.connect(DB_PATH, check_same_thread=False)
-
-
-def criar_tabelas():
-    conn = conectar()
-    c = conn.cursor()
-    # tabela de avaliações por pergunta
-    c.execute(
-        """
-        CREATE TABLE IF NOT EXISTS avaliacoes_pergunta (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            usuario_id INTEGER,
-            pergunta_index INTEGER,
-            pergunta TEXT,
-            resposta TEXT,
-            emocao_detectada TEXT,
-            timestamp TEXT
-        )
-    """
-    )
-    conn.commit()
-    conn.close()
-
-
-criar_tabelas()
+inicializar()
 
 # -------------------------
 # Detector de emoção (simplificado; usa landmarks do MediaPipe)
@@ -95,115 +72,107 @@ EMOCOES_CORES = {
 }
 
 
-def detectar_emocao_por_landmarks(landmarks):
-    try:
-        if not landmarks or len(landmarks) < 468:
-            return "Neutro"
-        olho_esq_top = landmarks[159]
-        olho_esq_bot = landmarks[145]
-        olho_dir_top = landmarks[386]
-        olho_dir_bot = landmarks[374]
-        boca_top = landmarks[13]
-        boca_bot = landmarks[14]
-        boca_esq = landmarks[61]
-        boca_dir = landmarks[291]
-        sobr_esq = landmarks[70]
-        sobr_dir = landmarks[300]
-        dist_entre_olhos = abs(landmarks[33].x - landmarks[263].x)
-        if dist_entre_olhos == 0:
-            return "Neutro"
-        abertura_olhos = (
-            (
-                abs(olho_esq_top.y - olho_esq_bot.y)
-                + abs(olho_dir_top.y - olho_dir_bot.y)
-            )
-            / 2
-            / dist_entre_olhos
-        )
-        abertura_boca = abs(boca_top.y - boca_bot.y) / dist_entre_olhos
-        largura_boca = abs(boca_esq.x - boca_dir.x) / dist_entre_olhos
-        sobr_diff = (sobr_esq.y + sobr_dir.y) / 2
-        # regras simples (mesmas do protótipo)
-        if abertura_olhos > 0.30 and abertura_boca > 0.32:
-            return "Surpreso"
-        if largura_boca > 0.75 and abertura_boca < 0.25:
-            return "Feliz"
-        if abertura_olhos < 0.18 and sobr_diff < 0.38:
-            return "Bravo"
-        if largura_boca < 0.55 and abertura_boca < 0.18:
-            return "Triste"
-        return "Neutro"
-    except Exception:
-        return "Neutro"
-
-
 # -------------------------
-# Video processor que atualiza st.session_state["last_emotion"]
+# Video processor: publica a emoção no canal da sessão
 # -------------------------
-if MEDIAPIPE_DISPONIVEL:
-    mp_face_mesh = mp.solutions.face_mesh
-    mp_drawing = mp.solutions.drawing_utils
-    # instância única (opcional)
-    face_mesh = mp_face_mesh.FaceMesh(
-        max_num_faces=1,
-        refine_landmarks=True,
-        min_detection_confidence=0.5,
-        min_tracking_confidence=0.5,
+# orçamento médio de CPU por frame recebido; a sessão passa a pular
+# frames quando a inferência fica mais cara que isso
+ORCAMENTO_FRAME_MS = 8.0
+
+
+# intervalo de atualização da "Emoção atual" na tela
+INTERVALO_ATUALIZACAO_S = 0.5
+
+# retângulo do rótulo no canto do vídeo (x0, y0, x1, y1)
+CAIXA_ROTULO = (5, 5, 360, 70)
+
+
+@lru_cache(maxsize=16)
+def painel_rotulo(texto, cor_bgr, escala=1.0, espessura=3):
+    """
+    Rótulo (fundo + borda + texto) desenhado uma única vez por texto;
+    depois é só copiado para o canto do quadro. Cores em RGB, pois o
+    quadro é analisado e devolvido em rgb24.
+    """
+    x0, y0, x1, y1 = CAIXA_ROTULO
+    cor = tuple(reversed(cor_bgr))
+    painel = np.zeros((y1 - y0 + 1, x1 - x0 + 1, 3), dtype=np.uint8)
+    cv2.rectangle(painel, (0, 0), (x1 - x0, y1 - y0), cor, 2)
+    cv2.putText(
+        painel,
+        texto,
+        (10, 40),
+        cv2.FONT_HERSHEY_SIMPLEX,
+        escala,
+        cor,
+        espessura,
+        cv2.LINE_AA,
     )
-else:
-    face_mesh = None
+    painel.flags.writeable = False
+    return painel
 
 
 class AvaliacaoVideoProcessor(VideoProcessorBase):
-    def __init__(self):
-        self.frame_count = 0
-
-    def recv(self, frame: av.VideoFrame) -> av.VideoFrame:
-        img = frame.to_ndarray(format="bgr24")
-        self.frame_count += 1
-        # atualiza a cada 5 frames para não sobrecarregar
-        if not MEDIAPIPE_DISPONIVEL or face_mesh is None:
-            # escreve aviso no frame
-            cv2.putText(
-                img,
-                "MediaPipe nao disponivel",
-                (10, 30),
-                cv2.FONT_HERSHEY_SIMPLEX,
-                0.7,
-                (0, 0, 255),
-                2,
-            )
-            last = st.session_state.get("last_emotion", "Neutro")
-            st.session_state["last_emotion"] = last
-            return av.VideoFrame.from_ndarray(img, format="bgr24")
-        if self.frame_count % 5 != 0:
-            return av.VideoFrame.from_ndarray(img, format="bgr24")
-        rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-        results = face_mesh.process(rgb)
-        if results and getattr(results, "multi_face_landmarks", None):
-            face_landmarks = results.multi_face_landmarks[0]
-            emocao = detectar_emocao_por_landmarks(face_landmarks.landmark)
-            st.session_state["last_emotion"] = emocao
-            # desenha label (fundo + texto)
-            cor = EMOCOES_CORES.get(emocao, (255, 255, 255))
-            emoji = EMOCOES_EMOJI.get(emocao, "")
-            cv2.rectangle(img, (5, 5), (360, 70), (0, 0, 0), -1)
-            cv2.rectangle(img, (5, 5), (360, 70), cor, 2)
-            cv2.putText(
-                img,
-                f"{emoji} {emocao}",
-                (15, 45),
-                cv2.FONT_HERSHEY_SIMPLEX,
-                1.0,
-                cor,
-                3,
-                cv2.LINE_AA,
-            )
-        else:
-            st.session_state["last_emotion"] = st.session_state.get(
-                "last_emotion", "Neutro"
-            )
-        return av.VideoFrame.from_ndarray(img, format="bgr24")
+    # roda na thread do webrtc: nada de st.* aqui, só o canal
+    def __init__(self, canal, agregador):
+        self.sessao = (
+            SessaoFacial(orcamento_ms=ORCAMENTO_FRAME_MS)
+            if MEDIAPIPE_DISPONIVEL
+            else None
+        )
+        self.canal = canal
+        # emoção estável (EMA + histerese) e histograma por pergunta
+        self.agregador = agregador
+        # buffer reaproveitado quando o PyAV devolve um array só-leitura
+        self._rgb = None
+
+    @medir("avaliacao.recv")
+    def recv(self, frame: "av.VideoFrame") -> "av.VideoFrame":
+        if self.sessao is None:
+            aviso = painel_rotulo("MediaPipe nao disponivel", (0, 0, 255), 0.7, 2)
+            return self._com_painel(frame, self._quadro_rgb(frame), aviso)
+
+        # quadro não analisado segue intacto, sem ida e volta ao numpy
+        if not self.sessao.deve_processar():
+            return frame
+
+        # o PyAV converte YUV -> RGB direto: sem cvtColor nem BGR
+        rgb = self._quadro_rgb(frame)
+        faces = self.sessao.processar(rgb)
+        metricas = calcular_metricas(faces[0]) if faces else None
+        emocao = self.agregador.atualizar(metricas)
+        if metricas is None or emocao is None:
+            return frame
+
+        self.canal.publicar(emocao)
+        painel = painel_rotulo(
+            f"{EMOCOES_EMOJI.get(emocao, '')} {emocao}",
+            EMOCOES_CORES.get(emocao, (255, 255, 255)),
+        )
+        return self._com_painel(frame, rgb, painel)
+
+    def _quadro_rgb(self, frame):
+        rgb = frame.to_ndarray(format="rgb24")
+        if rgb.flags.writeable:
+            return rgb
+        if self._rgb is None or self._rgb.shape != rgb.shape:
+            self._rgb = np.empty_like(rgb)
+        np.copyto(self._rgb, rgb)
+        return self._rgb
+
+    @staticmethod
+    def _com_painel(original, rgb, painel):
+        """Cola o painel no canto e monta o quadro de saída"""
+        x0, y0 = CAIXA_ROTULO[:2]
+        h = min(painel.shape[0], rgb.shape[0] - y0)
+        w = min(painel.shape[1], rgb.shape[1] - x0)
+        if h > 0 and w > 0:
+            rgb[y0:y0 + h, x0:x0 + w] = painel[:h, :w]
+
+        saida = av.VideoFrame.from_ndarray(rgb, format="rgb24")
+        saida.pts = original.pts
+        saida.time_base = original.time_base
+        return saida
 
 
 # -------------------------
@@ -215,6 +184,16 @@ if "avaliacao_respostas" not in st.session_state:
     st.session_state.avaliacao_respostas = []  # lista de dicts por pergunta
 if "last_emotion" not in st.session_state:
     st.session_state.last_emotion = "Neutro"
+if "agregador_emocoes" not in st.session_state:
+    st.session_state.agregador_emocoes = AgregadorEmocoes()
+
+# objetos compartilhados com a thread do vídeo (um par por sessão)
+canal_emocao = canal_da_sessao(st.session_state, "canal_emocao")
+agregador = st.session_state.agregador_emocoes
+
+
+def criar_processador():
+    return AvaliacaoVideoProcessor(canal_emocao, agregador)
 
 # -------------------------
 # Layout: usuário e webcam
@@ -232,22 +211,26 @@ col1, col2 = st.columns([2, 3])
 with col1:
     st.subheader("📹 Webcam")
     if WEBRTC_DISPONIVEL:
-        webrtc_ctx = webrtc_streamer(
+        webrtc_streamer(
             key="avaliacao_ia_camera",
             mode=WebRtcMode.SENDRECV,
-            video_processor_factory=AvaliacaoVideoProcessor,
+            video_processor_factory=criar_processador,
             media_stream_constraints={"video": True, "audio": False},
             async_processing=True,
         )
     else:
         st.error("streamlit-webrtc não disponível no ambiente.")
 
-    st.markdown(
-        "**Emoção atual:** "
-        + EMOCOES_EMOJI.get(st.session_state.get("last_emotion", "Neutro"), "")
-        + " "
-        + st.session_state.get("last_emotion", "Neutro")
-    )
+    @st.fragment(run_every=INTERVALO_ATUALIZACAO_S)
+    def mostrar_emocao_atual():
+        # só este trecho reroda no timer, não a página inteira
+        emocao = canal_emocao.valor(st.session_state.last_emotion)
+        st.session_state.last_emotion = emocao
+        st.markdown(
+            "**Emoção atual:** " + EMOCOES_EMOJI.get(emocao, "") + " " + emocao
+        )
+
+    mostrar_emocao_atual()
 
 with col2:
     st.subheader("✍️ Pergunta e Resposta")
@@ -257,21 +240,27 @@ with col2:
     resposta = st.text_area("Sua resposta:", height=160, key=f"resposta_{idx}")
 
     cols = st.columns([1, 1, 1])
+
     if cols[0].button("◀️ Anterior") and st.session_state.avaliacao_index > 0:
         # volta sem salvar alterações atuais (o texto fica guardado no text_area key)
+        agregador.fechar_pergunta()
         st.session_state.avaliacao_index -= 1
         st.experimental_rerun()
 
     if cols[1].button("Próxima ▶️"):
-        # salva resposta atual
-        emocao = st.session_state.get("last_emotion", "Neutro")
-        timestamp = datetime.now().isoformat()
+        # salva resposta atual com a emoção predominante na pergunta
+        emocao, confianca, _ = agregador.fechar_pergunta()
+        if emocao is None:
+            emocao = st.session_state.get("last_emotion", "Neutro")
+            confianca = None
+        timestamp = int(time.time())
         registro = {
             "usuario_id": usuario_id,
             "pergunta_index": idx,
             "pergunta": QUESTOES[idx],
             "resposta": resposta.strip(),
             "emocao": emocao,
+            "confianca": confianca,
             "timestamp": timestamp,
         }
         # atualiza lista (se já tinha resposta para esse idx, substitui)
@@ -283,6 +272,7 @@ with col2:
                 break
         if not found:
             st.session_state.avaliacao_respostas.append(registro)
+        obter_agregacao().registrar_resposta(usuario_id, emocao, confianca)
         # ir para próxima pergunta se existir
         if st.session_state.avaliacao_index < len(QUESTOES) - 1:
             st.session_state.avaliacao_index += 1
@@ -294,33 +284,44 @@ with col2:
             st.experimental_rerun()
 
     if cols[2].button("Finalizar e Salvar"):
-        # salva todas respostas no DB
-        conn = conectar()
-        c = conn.cursor()
-        for r in st.session_state.avaliacao_respostas:
-            c.execute(
-                """
-                INSERT INTO avaliacoes_pergunta
-                (usuario_id, pergunta_index, pergunta, resposta, emocao_detectada, timestamp)
-                VALUES (?, ?, ?, ?, ?, ?)
+        # entra no lote compartilhado: a turma toda finalizando ao mesmo
+        # tempo vira poucas transações; espera o commit para confirmar
+        respostas = st.session_state.avaliacao_respostas
+        futuro = obter_escrita().enfileirar_varios(
+            """
+            INSERT INTO avaliacoes_pergunta
+            (usuario_id, pergunta_index, pergunta, resposta, emocao_detectada, confianca, timestamp)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
             """,
+            [
                 (
                     r["usuario_id"],
                     r["pergunta_index"],
                     r["pergunta"],
                     r["resposta"],
                     r["emocao"],
+                    r["confianca"],
                     r["timestamp"],
-                ),
-            )
-        conn.commit()
-        conn.close()
-        st.success("Avaliação salva localmente no banco (nutriedu.db).")
-        # mostrar resumo
-        st.balloons()
-        st.session_state.avaliacao_index = 0
-        st.session_state.avaliacao_respostas = []
-        st.experimental_rerun()
+                )
+                for r in respostas
+            ],
+            usuario_ids={r["usuario_id"] for r in respostas},
+        )
+        salvo = False
+        with st.spinner("Salvando..."):
+            try:
+                futuro.result(timeout=30)
+                salvo = True
+            except Exception as e:
+                # respostas continuam na sessão para tentar de novo
+                st.error(f"❌ A avaliação não foi salva: {e}")
+        if salvo:
+            st.success("Avaliação salva localmente no banco (nutriedu.db).")
+            # mostrar resumo
+            st.balloons()
+            st.session_state.avaliacao_index = 0
+            st.session_state.avaliacao_respostas = []
+            st.experimental_rerun()
 
 # -------------------------
 # Visualização de histórico rápido
@@ -328,18 +329,15 @@ with col2:
 st.markdown("---")
 st.subheader("📚 Histórico rápido (últimas 20 respostas salvas)")
 if st.button("Carregar histórico local"):
-    conn = conectar()
-    rows = conn.execute(
+    with conectar() as conn:
+        rows = conn.execute(
+            """
+            SELECT usuario_id, pergunta_index, pergunta, resposta, emocao_detectada, confianca, timestamp
+            FROM avaliacoes_pergunta
+            ORDER BY id DESC LIMIT 20
         """
-        SELECT usuario_id, pergunta_index, pergunta, resposta, emocao_detectada, timestamp
-        FROM avaliacoes_pergunta
-        ORDER BY id DESC LIMIT 20
-    """
-    ).fetchall()
-    conn.close()
+        ).fetchall()
     if rows:
-        import pandas as pd
-
         df = pd.DataFrame(
             rows,
             columns=[
@@ -348,9 +346,11 @@ if st.button("Carregar histórico local"):
                 "pergunta",
                 "resposta",
                 "emocao",
+                "confianca",
                 "timestamp",
             ],
         )
+        df["timestamp"] = df["timestamp"].map(datetime.fromtimestamp)
         st.dataframe(df)
     else:
         st.info("Nenhuma avaliação registrada ainda.")
@@ -0,0 +1,126 @@
+import threading
+import time
+from collections import deque
+
+from carregamento import cv2
+
+
+# =====================================================
+# FILA LIMITADA COM DESCARTE DO MAIS ANTIGO
+# =====================================================
+class FilaDescarte:
+    """
+    Fila limitada: quando cheia, descarta o item mais antigo.
+    Um estágio lento nunca bloqueia o anterior; ele apenas perde
+    frames velhos e sempre trabalha sobre o mais recente.
+    """
+
+    def __init__(self, tamanho=2):
+        self._itens = deque(maxlen=tamanho)
+        self._cond = threading.Condition()
+        self.descartados = 0
+
+    def colocar(self, item):
+        with self._cond:
+            if len(self._itens) == self._itens.maxlen:
+                self.descartados += 1
+            self._itens.append(item)
+            self._cond.notify()
+
+    def retirar(self, timeout=None):
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._itens, timeout):
+                return None
+            return self._itens.popleft()
+
+    def __len__(self):
+        return len(self._itens)
+
+
+# =====================================================
+# PIPELINE CAPTURA -> INFERÊNCIA
+# =====================================================
+class PipelineVideo:
+    """
+    Produtor/consumidor para análise de vídeo:
+    thread de captura -> FilaDescarte -> thread de inferência -> resultados.
+
+    `processar(frame, t)` roda na thread de inferência e não deve
+    chamar funções do Streamlit; quem consome `resultados` é a thread
+    do script, no ritmo da interface.
+    """
+
+    def __init__(self, fonte, processar, tamanho_fila=2):
+        self.fonte = fonte
+        self.processar = processar
+        self.frames = FilaDescarte(tamanho_fila)
+        self.resultados = FilaDescarte(1)
+        self.erro = None
+
+        self._parar = threading.Event()
+        self._captura_fim = threading.Event()
+        self._threads = []
+
+    @property
+    def ativo(self):
+        return any(t.is_alive() for t in self._threads)
+
+    def iniciar(self):
+        self._threads = [
+            threading.Thread(
+                target=self._capturar, name="captura", daemon=True
+            ),
+            threading.Thread(
+                target=self._inferir, name="inferencia", daemon=True
+            ),
+        ]
+        for t in self._threads:
+            t.start()
+        return self
+
+    def parar(self, timeout=2.0):
+        self._parar.set()
+        for t in self._threads:
+            t.join(timeout)
+
+    def _capturar(self):
+        cap = cv2.VideoCapture(self.fonte)
+        try:
+            while not self._parar.is_set() and cap.isOpened():
+                ok, frame = cap.read()
+                if not ok:
+                    break
+                self.frames.colocar((time.time(), frame))
+        finally:
+            cap.release()
+            self._captura_fim.set()
+
+    def _inferir(self):
+        while not self._parar.is_set():
+            item = self.frames.retirar(timeout=0.1)
+            if item is None:
+                if self._captura_fim.is_set():
+                    break
+                continue
+
+            t, frame = item
+            try:
+                self.resultados.colocar(self.processar(frame, t))
+            except Exception as e:
+                self.erro = e
+                self._parar.set()
+
+
+def ritmo(fps):
+    """Gerador que limita um loop a `fps` iterações por segundo"""
+    intervalo = 1 / fps
+    proximo = time.perf_counter()
+    while True:
+        yield
+        proximo += intervalo
+        espera = proximo - time.perf_counter()
+        if espera > 0:
+            time.sleep(espera)
+        else:
+            # atrasado: não tenta "recuperar" frames perdidos
+            proximo = time.perf_counter()
@@ -0,0 +1,402 @@
+"""
+Processamento em lote de gravações de aula, em todos os núcleos.
+
+Cada gravação passa pelo pipeline da IA Emocional (ver replay.py) em um
+processo do pool; cada processo tem o seu FaceMesh. O resumo por
+gravação (EAR médio, piscadas/min, PERCLOS, estado predominante) vai em
+lotes para `desempenho_cognitivo`, que alimenta o Painel Cognitivo.
+
+O manifesto JSON guarda o estado de cada gravação: rodar de novo retoma
+de onde parou e pula o que já foi concluído (e não mudou no disco).
+
+Cada gravação também vira uma amostra das estatísticas do ano letivo
+(estatisticas.py), somada na mesma transação que insere a sua linha.
+Ela conta uma única vez: reprocessar uma gravação alterada substitui a
+linha do painel, mas não mexe nas estatísticas (os acumuladores não
+removem amostras), que ficam com a primeira versão.
+
+    python processamento_lote.py gravacoes/
+    python processamento_lote.py gravacoes/ --processos 6 --disciplina Matemática
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import re
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from database import garantir_usuario, inicializar, transacao
+from estado_cognitivo import estado_painel, indices_atencao
+from estatisticas import EstatisticasOnline
+from replay import analisar_clipe, listar_clipes
+
+# nome do arquivo -> aluno, ex.: "12_matematica_2024-05-02.mp4"
+PADRAO_ALUNO = r"^(?P<aluno_id>\d+)"
+LOTE_BANCO = 20
+
+
+# =====================================================
+# MANIFESTO (RETOMADA)
+# =====================================================
+class Manifesto:
+    """Estado das tarefas em um arquivo JSON, regravado atomicamente"""
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self.tarefas = {}
+        if os.path.exists(caminho):
+            with open(caminho, encoding="utf-8") as f:
+                self.tarefas = json.load(f).get("tarefas", {})
+
+    @staticmethod
+    def _assinatura(video):
+        info = os.stat(video)
+        return {"tamanho": info.st_size, "mtime": int(info.st_mtime)}
+
+    def pendentes(self, videos, refazer_erros=True):
+        """Vídeos novos, alterados, não concluídos ou (opcional) com erro"""
+        resultado = []
+        for video in videos:
+            tarefa = self.tarefas.get(video)
+            mudou = (
+                tarefa is None
+                or {k: tarefa.get(k) for k in ("tamanho", "mtime")}
+                != self._assinatura(video)
+            )
+            if mudou or tarefa["estado"] == "pendente":
+                resultado.append(video)
+            elif tarefa["estado"] == "erro" and refazer_erros:
+                resultado.append(video)
+        return resultado
+
+    def marcar(self, video, estado, **dados):
+        self.tarefas[video] = {
+            "estado": estado,
+            **self._assinatura(video),
+            "atualizado_em": int(time.time()),
+            **dados,
+        }
+
+    def salvar(self):
+        temporario = self.caminho + ".tmp"
+        with open(temporario, "w", encoding="utf-8") as f:
+            json.dump(
+                {"versao": 1, "tarefas": self.tarefas},
+                f,
+                ensure_ascii=False,
+                indent=1,
+            )
+        os.replace(temporario, self.caminho)
+
+    def contagem(self):
+        return Counter(t["estado"] for t in self.tarefas.values())
+
+
+# =====================================================
+# TRABALHO DE CADA PROCESSO
+# =====================================================
+def _iniciar_processo():
+    from carregamento import cv2
+
+    # um núcleo por processo: sem isso o OpenCV abre threads próprias
+    # e os processos disputam a CPU entre si
+    cv2.setNumThreads(1)
+
+
+def resumir_gravacao(video, limiar=0.25, confianca=0.6):
+    """Roda o pipeline na gravação inteira e devolve o resumo"""
+    quadros = com_rosto = 0
+    soma_ear = soma_perclos = 0.0
+    piscadas = 0
+    duracao = 0.0
+    estados = Counter()
+    emocoes = Counter()
+
+    for linha in analisar_clipe(
+        video,
+        (limiar,),
+        min_detection_confidence=confianca,
+        min_tracking_confidence=confianca,
+    ):
+        quadros += 1
+        duracao = linha["t_s"]
+        piscadas = linha["piscadas"]
+        if linha["rosto"]:
+            com_rosto += 1
+            soma_ear += linha["ear"]
+            soma_perclos += linha["perclos"]
+            emocoes[linha["emocao"]] += 1
+        if linha["estado"]:
+            estados[linha["estado"]] += 1
+
+    if not com_rosto:
+        raise ValueError("nenhum rosto detectado")
+
+    estado = estados.most_common(1)[0][0] if estados else None
+    return {
+        "quadros": quadros,
+        "quadros_com_rosto": com_rosto,
+        "duracao_s": duracao,
+        "ear_medio": soma_ear / com_rosto,
+        "piscadas": piscadas,
+        "piscadas_min": piscadas * 60 / max(duracao, 60.0),
+        "perclos": soma_perclos / com_rosto,
+        "estado": estado,
+        "emocao": emocoes.most_common(1)[0][0],
+    }
+
+
+def _processar(video, limiar, confianca):
+    # exceções do MediaPipe nem sempre atravessam o pickle: vira texto
+    inicio = time.perf_counter()
+    try:
+        resumo = resumir_gravacao(video, limiar, confianca)
+    except Exception as e:
+        return video, None, f"{type(e).__name__}: {e}"
+    resumo["processamento_s"] = round(time.perf_counter() - inicio, 2)
+    return video, resumo, None
+
+
+# =====================================================
+# GRAVAÇÃO NO BANCO (EM LOTE)
+# =====================================================
+def gravar_resultados(
+    itens, disciplina, caminho_banco=None, estatisticas=None
+):
+    """
+    Grava [(video, aluno_id, resumo)] em uma transação. Reprocessar uma
+    gravação substitui a linha anterior (chave: coluna `fonte`).
+
+    Com `estatisticas`, as gravações ainda sem linha no banco entram nos
+    acumuladores, que são somados ao banco nessa mesma transação.
+    """
+    inicializar(caminho_banco)
+    with transacao(caminho_banco) as conn:
+        alunos = sorted({aluno_id for _, aluno_id, _ in itens})
+        for aluno_id in alunos:
+            garantir_usuario(conn, aluno_id)
+        # depois do INSERT acima a transação já tem o lock de escrita
+        ja_gravadas = {
+            r[0]
+            for r in conn.execute(
+                f"""
+                SELECT fonte FROM desempenho_cognitivo
+                WHERE fonte IN ({", ".join("?" * len(itens))})
+                """,
+                [video for video, _, _ in itens],
+            )
+        }
+        conn.executemany(
+            "DELETE FROM desempenho_cognitivo WHERE fonte = ?",
+            [(video,) for video, _, _ in itens],
+        )
+        conn.executemany(
+            """
+            INSERT INTO desempenho_cognitivo
+            (aluno_id, nome, idade, disciplina, estado_emocional,
+             data_avaliacao, ear_medio, piscadas_min, perclos, fonte)
+            SELECT id, nome, idade, ?, ?, ?, ?, ?, ?, ?
+            FROM usuarios WHERE id = ?
+            """,
+            [
+                (
+                    disciplina,
+                    estado_painel(resumo["estado"]),
+                    int(os.path.getmtime(video)),
+                    resumo["ear_medio"],
+                    resumo["piscadas_min"],
+                    resumo["perclos"],
+                    video,
+                    aluno_id,
+                )
+                for video, aluno_id, resumo in itens
+            ],
+        )
+
+        if estatisticas is not None:
+            turmas = dict(
+                conn.execute(
+                    f"""
+                    SELECT id, turma FROM usuarios
+                    WHERE id IN ({", ".join("?" * len(alunos))})
+                    """,
+                    alunos,
+                ).fetchall()
+            )
+            for video, aluno_id, resumo in itens:
+                if video not in ja_gravadas:
+                    registrar_estatisticas(
+                        estatisticas,
+                        aluno_id,
+                        disciplina,
+                        video,
+                        resumo,
+                        turmas.get(aluno_id),
+                    )
+            estatisticas.salvar(conn)
+
+
+def registrar_estatisticas(
+    estatisticas, aluno_id, disciplina, video, resumo, turma=None
+):
+    """Uma gravação = uma amostra nos acumuladores do ano letivo"""
+    foco, fadiga = indices_atencao(
+        resumo["ear_medio"], resumo["perclos"], resumo["piscadas_min"]
+    )
+    estatisticas.registrar(
+        foco,
+        fadiga,
+        t=os.path.getmtime(video),
+        aluno=aluno_id,
+        turma=turma,
+        disciplina=disciplina,
+    )
+
+
+# =====================================================
+# ORQUESTRAÇÃO
+# =====================================================
+def _aluno(video, padrao):
+    m = re.search(padrao, os.path.basename(video))
+    return int(m["aluno_id"]) if m else None
+
+
+def processar_lote(
+    videos,
+    manifesto,
+    processos=None,
+    padrao=PADRAO_ALUNO,
+    disciplina="Gravação de aula",
+    limiar=0.25,
+    confianca=0.6,
+    caminho_banco=None,
+    refazer_erros=True,
+):
+    """Processa as gravações pendentes; retorna a contagem por estado"""
+    videos = [os.path.abspath(v) for v in videos]
+    alunos = {}
+    for video in videos:
+        aluno_id = _aluno(video, padrao)
+        if aluno_id is None:
+            manifesto.marcar(video, "erro", erro="aluno não identificado")
+        else:
+            alunos[video] = aluno_id
+
+    pendentes = [
+        v for v in manifesto.pendentes(videos, refazer_erros) if v in alunos
+    ]
+    for video in pendentes:
+        manifesto.marcar(video, "pendente", aluno_id=alunos[video])
+    manifesto.salvar()
+
+    total = len(pendentes)
+    print(f"{total} gravação(ões) a processar", file=sys.stderr)
+    if not total:
+        return manifesto.contagem()
+
+    buffer = []
+    # só grava junto com as linhas (gravar_resultados), nunca sozinha
+    estatisticas = EstatisticasOnline(
+        caminho_banco, intervalo_salvar_s=float("inf")
+    )
+
+    def descarregar():
+        if not buffer:
+            return
+        # banco primeiro: se cair aqui, o manifesto ainda diz "pendente"
+        # e a próxima rodada regrava (a linha é substituída, não duplica;
+        # as estatísticas já somadas não são somadas de novo)
+        gravar_resultados(buffer, disciplina, caminho_banco, estatisticas)
+        for video, aluno_id, resumo in buffer:
+            manifesto.marcar(
+                video, "concluida", aluno_id=aluno_id, resultado=resumo
+            )
+        manifesto.salvar()
+        buffer.clear()
+
+    contexto = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(
+        max_workers=processos or os.cpu_count(),
+        mp_context=contexto,
+        initializer=_iniciar_processo,
+    ) as pool:
+        futuros = [
+            pool.submit(_processar, video, limiar, confianca)
+            for video in pendentes
+        ]
+        for feitos, futuro in enumerate(as_completed(futuros), start=1):
+            video, resumo, erro = futuro.result()
+            nome = os.path.basename(video)
+            if erro is not None:
+                manifesto.marcar(
+                    video, "erro", aluno_id=alunos[video], erro=erro
+                )
+                print(f"[{feitos}/{total}] {nome}: {erro}", file=sys.stderr)
+            else:
+                buffer.append((video, alunos[video], resumo))
+                print(
+                    f"[{feitos}/{total}] {nome}: "
+                    f"{resumo['processamento_s']}s",
+                    file=sys.stderr,
+                )
+            if len(buffer) >= LOTE_BANCO:
+                descarregar()
+
+    descarregar()
+    manifesto.salvar()
+    return manifesto.contagem()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Processa gravações em paralelo e grava o resumo "
+        "por aluno no banco do Painel Cognitivo."
+    )
+    parser.add_argument("entrada", nargs="+", help="vídeos ou pastas")
+    parser.add_argument("--manifesto", help="default: manifesto_lote.json")
+    parser.add_argument("--processos", type=int)
+    parser.add_argument(
+        "--padrao", default=PADRAO_ALUNO,
+        help="regex com o grupo aluno_id sobre o nome do arquivo",
+    )
+    parser.add_argument("--disciplina", default="Gravação de aula")
+    parser.add_argument("--ear-limiar", type=float, default=0.25)
+    parser.add_argument("--confianca", type=float, default=0.6)
+    parser.add_argument("--banco", help="default: NUTRIEDU_DB")
+    parser.add_argument(
+        "--sem-repetir-erros", action="store_true",
+        help="não tenta de novo gravações que falharam antes",
+    )
+    args = parser.parse_args(argv)
+
+    videos = [v for entrada in args.entrada for v in listar_clipes(entrada)]
+    if not videos:
+        parser.error("nenhum vídeo encontrado")
+
+    manifesto = Manifesto(args.manifesto or "manifesto_lote.json")
+    inicio = time.perf_counter()
+    contagem = processar_lote(
+        videos,
+        manifesto,
+        processos=args.processos,
+        padrao=args.padrao,
+        disciplina=args.disciplina,
+        limiar=args.ear_limiar,
+        confianca=args.confianca,
+        caminho_banco=args.banco,
+        refazer_erros=not args.sem_repetir_erros,
+    )
+    print(
+        f"{dict(contagem)} em {time.perf_counter() - inicio:.0f}s "
+        f"(manifesto: {manifesto.caminho})",
+        file=sys.stderr,
+    )
+    return 1 if contagem.get("erro") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,260 @@
+"""
+Reprocessamento offline de vídeos gravados (IA Emocional).
+
+Roda o mesmo pipeline da página 01 (FaceMesh -> EAR -> piscadas ->
+estado cognitivo) sobre um arquivo ou uma pasta de clipes, o mais rápido
+que a CPU permitir: sem janela, sem esperas, com o relógio do próprio
+vídeo. Gera uma linha do tempo por quadro em CSV ou Parquet.
+
+    python replay.py aula.mp4
+    python replay.py gravacoes/ --saida noite.parquet
+    python replay.py aula.mp4 --ear-limiar 0.22 0.25 0.28
+"""
+
+import argparse
+import csv
+import os
+import sys
+import time
+
+from carregamento import cv2, pa, pq
+from estado_cognitivo import EstimadorPiscadas, classificar_estado
+from metricas_faciais import calcular_metricas, classificar_emocao
+from motor_facial import SessaoFacial
+
+EXTENSOES_VIDEO = (".mp4", ".avi", ".mov", ".mkv", ".webm", ".m4v")
+FPS_PADRAO = 30.0
+LINHAS_GRUPO_PARQUET = 50_000
+
+COLUNAS = [
+    "clipe",
+    "quadro",
+    "t_s",
+    "limiar",
+    "rosto",
+    "ear",
+    "ear_medio",
+    "fechado",
+    "piscadas",
+    "piscadas_min",
+    "perclos",
+    "estado",
+    "emocao",
+]
+
+
+# =====================================================
+# LEITURA DOS QUADROS
+# =====================================================
+def listar_clipes(caminho):
+    if os.path.isdir(caminho):
+        return sorted(
+            os.path.join(caminho, nome)
+            for nome in os.listdir(caminho)
+            if nome.lower().endswith(EXTENSOES_VIDEO)
+        )
+    return [caminho]
+
+
+def ler_quadros(caminho):
+    """Gera (índice, tempo no vídeo em s, frame BGR)"""
+    cap = cv2.VideoCapture(caminho)
+    if not cap.isOpened():
+        raise IOError(f"não foi possível abrir {caminho}")
+
+    fps = cap.get(cv2.CAP_PROP_FPS) or FPS_PADRAO
+    try:
+        quadro = 0
+        while True:
+            ok, frame = cap.read()
+            if not ok:
+                break
+            t = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000
+            if t <= 0 and quadro > 0:
+                # alguns backends não informam a posição
+                t = quadro / fps
+            yield quadro, t, frame
+            quadro += 1
+    finally:
+        cap.release()
+
+
+# =====================================================
+# ANÁLISE
+# =====================================================
+def analisar_clipe(caminho, limiares=(0.25,), **perfil):
+    """
+    Gera uma linha (dict com COLUNAS) por quadro e limiar.
+    O FaceMesh roda uma única vez por quadro; cada limiar de EAR tem o
+    seu estimador, para comparar limiares contra a anotação manual.
+    """
+    clipe = os.path.basename(caminho)
+    sessao = SessaoFacial(**perfil)
+    estimadores = {
+        limiar: EstimadorPiscadas(limiar=limiar) for limiar in limiares
+    }
+
+    for quadro, t, frame in ler_quadros(caminho):
+        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        faces = sessao.processar(rgb)
+        metricas = calcular_metricas(faces[0]) if faces else None
+        emocao = classificar_emocao(metricas) if metricas else None
+
+        for limiar, estimador in estimadores.items():
+            if metricas is not None:
+                estimador.atualizar(metricas["ear"], t)
+
+            estado = pisc_min = None
+            if estimador.pronto:
+                pisc_min = int(estimador.piscadas_min(t))
+                estado, _ = classificar_estado(estimador.ear_medio, pisc_min)
+
+            yield {
+                "clipe": clipe,
+                "quadro": quadro,
+                "t_s": round(t, 4),
+                "limiar": limiar,
+                "rosto": metricas is not None,
+                "ear": metricas["ear"] if metricas else None,
+                "ear_medio": estimador.ear_medio,
+                "fechado": estimador.fechado,
+                "piscadas": estimador.piscadas,
+                "piscadas_min": pisc_min,
+                "perclos": estimador.perclos,
+                "estado": estado,
+                "emocao": emocao,
+            }
+
+
+# =====================================================
+# SAÍDA
+# =====================================================
+class EscritorCSV:
+    """Escreve as linhas conforme chegam (memória constante)"""
+
+    def __init__(self, caminho):
+        self._arquivo = open(caminho, "w", newline="", encoding="utf-8")
+        self._csv = csv.DictWriter(self._arquivo, fieldnames=COLUNAS)
+        self._csv.writeheader()
+
+    def escrever(self, linha):
+        self._csv.writerow(linha)
+
+    def fechar(self):
+        self._arquivo.close()
+
+
+class EscritorParquet:
+    """
+    Grava um row group a cada `linhas_grupo` linhas (memória limitada
+    mesmo com aulas longas e vários limiares); requer pyarrow.
+    """
+
+    def __init__(self, caminho, linhas_grupo=LINHAS_GRUPO_PARQUET):
+        self.linhas_grupo = linhas_grupo
+        self._esquema = pa.schema(
+            [
+                ("clipe", pa.string()),
+                ("quadro", pa.int64()),
+                ("t_s", pa.float64()),
+                ("limiar", pa.float64()),
+                ("rosto", pa.bool_()),
+                ("ear", pa.float64()),
+                ("ear_medio", pa.float64()),
+                ("fechado", pa.bool_()),
+                ("piscadas", pa.int64()),
+                ("piscadas_min", pa.float64()),
+                ("perclos", pa.float64()),
+                ("estado", pa.string()),
+                ("emocao", pa.string()),
+            ]
+        )
+        self._escritor = pq.ParquetWriter(caminho, self._esquema)
+        self._linhas = []
+
+    def escrever(self, linha):
+        self._linhas.append(linha)
+        if len(self._linhas) >= self.linhas_grupo:
+            self._gravar()
+
+    def _gravar(self):
+        if self._linhas:
+            self._escritor.write_table(
+                pa.Table.from_pylist(self._linhas, schema=self._esquema)
+            )
+            self._linhas = []
+
+    def fechar(self):
+        self._gravar()
+        self._escritor.close()
+
+
+def _saida_padrao(entrada, formato):
+    if os.path.isdir(entrada):
+        return os.path.join(entrada, f"timeline.{formato}")
+    return f"{os.path.splitext(entrada)[0]}_timeline.{formato}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Reprocessa vídeos gravados e gera a linha do tempo "
+        "do estado cognitivo por quadro."
+    )
+    parser.add_argument("entrada", help="arquivo de vídeo ou pasta de clipes")
+    parser.add_argument("--saida", help="arquivo .csv ou .parquet")
+    parser.add_argument("--formato", choices=("csv", "parquet"))
+    parser.add_argument(
+        "--ear-limiar", type=float, nargs="+", default=[0.25],
+        help="um ou mais limiares de EAR (default: 0.25)",
+    )
+    parser.add_argument("--confianca", type=float, default=0.6)
+    args = parser.parse_args(argv)
+
+    formato = args.formato or (
+        "parquet" if (args.saida or "").endswith(".parquet") else "csv"
+    )
+    saida = args.saida or _saida_padrao(args.entrada, formato)
+    limiares = list(dict.fromkeys(args.ear_limiar))
+
+    clipes = listar_clipes(args.entrada)
+    if not clipes:
+        parser.error(f"nenhum vídeo encontrado em {args.entrada}")
+
+    escritor = (EscritorParquet if formato == "parquet" else EscritorCSV)(
+        saida
+    )
+    total_quadros = 0
+    inicio = time.perf_counter()
+    try:
+        for caminho in clipes:
+            inicio_clipe = time.perf_counter()
+            quadros = 0
+            for linha in analisar_clipe(
+                caminho,
+                limiares,
+                min_detection_confidence=args.confianca,
+                min_tracking_confidence=args.confianca,
+            ):
+                escritor.escrever(linha)
+                quadros = linha["quadro"] + 1
+
+            duracao = time.perf_counter() - inicio_clipe
+            total_quadros += quadros
+            print(
+                f"{os.path.basename(caminho)}: {quadros} quadros em "
+                f"{duracao:.1f}s ({quadros / max(duracao, 1e-9):.0f} q/s)",
+                file=sys.stderr,
+            )
+    finally:
+        escritor.fechar()
+
+    duracao = time.perf_counter() - inicio
+    print(
+        f"{len(clipes)} clipe(s), {total_quadros} quadros em {duracao:.1f}s "
+        f"-> {saida}",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
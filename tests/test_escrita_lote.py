@@ -0,0 +1,58 @@
+import sqlite3
+
+import pytest
+
+from database import conectar
+from escrita_lote import EscritaLote
+
+SQL_INSERIR = (
+    "INSERT OR REPLACE INTO historico_avaliacoes (id, usuario_id, avaliacao, data) "
+    "VALUES (?, ?, ?, ?)"
+)
+SQL_APAGAR = "DELETE FROM historico_avaliacoes WHERE usuario_id = ?"
+
+
+@pytest.fixture
+def escrita(tmp_path):
+    escrita = EscritaLote(str(tmp_path / "t.db"), max_espera_s=60)
+    yield escrita
+    escrita.fechar()
+
+
+def _avaliacoes(escrita):
+    with conectar(escrita.caminho) as conn:
+        return conn.execute(
+            "SELECT id, usuario_id, avaliacao FROM historico_avaliacoes ORDER BY id"
+        ).fetchall()
+
+
+def test_ordem_entre_sqls(escrita):
+    escrita.enfileirar(SQL_INSERIR, (1, 1, "a", 0), usuario_id=1)
+    escrita.enfileirar(SQL_APAGAR, (1,))
+    escrita.enfileirar(SQL_INSERIR, (2, 1, "b", 0), usuario_id=1)
+    escrita.descarregar(timeout=10)
+
+    assert _avaliacoes(escrita) == [(2, 1, "b")]
+
+
+def test_coalescida_vai_para_a_ultima_posicao(escrita):
+    escrita.enfileirar(SQL_INSERIR, (1, 1, "a", 0), chave=1, usuario_id=1)
+    escrita.enfileirar(SQL_APAGAR, (1,))
+    escrita.enfileirar(SQL_INSERIR, (1, 1, "b", 0), chave=1, usuario_id=1)
+    escrita.descarregar(timeout=10)
+
+    assert _avaliacoes(escrita) == [(1, 1, "b")]
+    assert escrita.coalescidos == 1
+
+
+def test_erro_de_dados_so_falha_o_culpado(escrita):
+    bom = escrita.enfileirar(SQL_INSERIR, (1, 1, "a", 0), usuario_id=1)
+    ruim = escrita.enfileirar(SQL_INSERIR, (2, 99, "x", 0))
+    escrita.enfileirar(SQL_APAGAR, (1,))
+    depois = escrita.enfileirar(SQL_INSERIR, (3, 1, "c", 0), usuario_id=1)
+    escrita.descarregar(timeout=10)
+
+    assert bom.result() and depois.result()
+    with pytest.raises(sqlite3.IntegrityError):
+        ruim.result()
+    assert _avaliacoes(escrita) == [(3, 1, "c")]
@@ -0,0 +1,67 @@
+import math
+import random
+
+from estatisticas import TendenciaDecaida
+
+MEIA_VIDA_S = 3600.0
+
+
+def regressao_exata(amostras, meia_vida_s):
+    """Mínimos quadrados com pesos exp(-idade/tau), idade até a mais nova"""
+    tau = meia_vida_s / math.log(2)
+    t_max = max(t for _, t in amostras)
+    pesos = [math.exp(-(t_max - t) / tau) for _, t in amostras]
+    peso = sum(pesos)
+    media_t = sum(w * t for w, (_, t) in zip(pesos, amostras)) / peso
+    media_y = sum(w * y for w, (y, _) in zip(pesos, amostras)) / peso
+    m2_t = sum(w * (t - media_t) ** 2 for w, (_, t) in zip(pesos, amostras))
+    c_ty = sum(
+        w * (t - media_t) * (y - media_y)
+        for w, (y, t) in zip(pesos, amostras)
+    )
+    return peso, media_y, c_ty / m2_t
+
+
+def _amostras(n=2000, semente=7):
+    rng = random.Random(semente)
+    amostras = []
+    for i in range(n):
+        t = i * 10.0
+        amostras.append((0.5 + 1e-5 * t + rng.gauss(0, 0.05), t))
+    return amostras
+
+
+def _conferir(tendencia, amostras):
+    peso, nivel, inclinacao = regressao_exata(amostras, MEIA_VIDA_S)
+    assert math.isclose(tendencia.peso, peso, rel_tol=1e-9)
+    assert math.isclose(tendencia.nivel, nivel, rel_tol=1e-9)
+    assert math.isclose(tendencia.inclinacao, inclinacao, rel_tol=1e-6)
+
+
+def test_tendencia_em_ordem():
+    amostras = _amostras()
+    tendencia = TendenciaDecaida(MEIA_VIDA_S)
+    for y, t in amostras:
+        tendencia.adicionar(y, t)
+    _conferir(tendencia, amostras)
+
+
+def test_tendencia_fora_de_ordem():
+    # segunda metade primeiro, depois a primeira (gravações reprocessadas)
+    amostras = _amostras()
+    metade = len(amostras) // 2
+    tendencia = TendenciaDecaida(MEIA_VIDA_S)
+    for y, t in amostras[metade:] + amostras[:metade]:
+        tendencia.adicionar(y, t)
+    _conferir(tendencia, amostras)
+
+
+def test_tendencia_embaralhada_e_combinada():
+    amostras = _amostras()
+    embaralhadas = amostras[:]
+    random.Random(3).shuffle(embaralhadas)
+    a, b = TendenciaDecaida(MEIA_VIDA_S), TendenciaDecaida(MEIA_VIDA_S)
+    for i, (y, t) in enumerate(embaralhadas):
+        (a if i % 2 else b).adicionar(y, t)
+    a.combinar(b)
+    _conferir(a, amostras)